@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+""" Replay of the cassettes of the tests to profile the importers
+
+The imports of the tests are run in a loop on their cassette, kept in
+memory and replayed as many times as needed, so the measures do not
+depend on a network nor on a PrestaShop. The time of each importer is
+split in:
+
+* ``http``: requests, answered by the cassette
+* ``parse``: parsing of the XML or JSON responses
+* ``map``: mappers
+* ``orm``: creation, update and binding of the Odoo records, and
+  ``_after_import``
+* ``other``: the rest of the import (locks, dependencies lookups, ...)
+
+The time of the imports of the dependencies is counted in their own
+importer.
+"""
+
+import functools
+import time
+import unittest
+from collections import defaultdict
+from contextlib import contextmanager
+
+import mock
+
+from openerp.addons.connector.connector import Binder
+from openerp.addons.connector.unit.mapper import Mapper
+
+from ..tests.common import PrestashopTransactionCase, recorder
+from ..unit import backend_adapter
+from ..unit.cache import reference_cache
+from ..unit.importer import PrestashopImporter, import_record
+from ..unit.json_normalizer import JSONNormalizer
+
+try:
+    import prestapyt
+except ImportError:
+    pass
+
+PHASES = ('http', 'parse', 'map', 'orm', 'other')
+
+
+@contextmanager
+def _not_profiled():
+    yield
+
+
+class ImportProfiler(object):
+    """ Accumulate the time spent by the importers in each phase
+
+    The time of a phase excludes the time of the phases nested in it,
+    for instance the requests of an import made during the mapping.
+    """
+
+    def __init__(self):
+        # {importer: {phase: seconds}}
+        self.times = defaultdict(lambda: defaultdict(float))
+        self.runs = defaultdict(int)
+        # [owner, phase, start, time of the nested phases]
+        self._stack = []
+
+    def _owner(self):
+        for owner, phase, __, __ in reversed(self._stack):
+            if phase == 'other':
+                return owner
+        return None
+
+    def enter(self, phase, owner=None):
+        if owner is None:
+            owner = self._owner()
+        self._stack.append([owner, phase, time.time(), 0.])
+
+    def exit(self):
+        owner, phase, start, nested = self._stack.pop()
+        elapsed = time.time() - start
+        if owner is not None:
+            self.times[owner][phase] += elapsed - nested
+        if self._stack:
+            self._stack[-1][3] += elapsed
+
+    def _timed(self, func, phase):
+        profiler = self
+
+        @functools.wraps(func)
+        def timed(self, *args, **kwargs):
+            if phase == 'other':
+                owner = self.__class__.__name__
+                profiler.runs[owner] += 1
+                profiler.enter(phase, owner=owner)
+            else:
+                profiler.enter(phase)
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                profiler.exit()
+        return timed
+
+    def _targets(self):
+        webservice = prestapyt.PrestaShopWebService
+        return [
+            (PrestashopImporter, 'run', 'other'),
+            (webservice, '_execute', 'http'),
+            (backend_adapter.GenericAdapter, '_open_listing', 'http'),
+            (webservice, '_parse', 'parse'),
+            (prestapyt.PrestaShopWebServiceDict, '_parse', 'parse'),
+            (backend_adapter.PrestaShopWebServiceJSON, '_parse_json',
+             'parse'),
+            (JSONNormalizer, 'normalize', 'parse'),
+            (Mapper, '_apply', 'map'),
+            (PrestashopImporter, '_create', 'orm'),
+            (PrestashopImporter, '_update', 'orm'),
+            (PrestashopImporter, '_after_import', 'orm'),
+            (Binder, 'bind', 'orm'),
+        ]
+
+    @contextmanager
+    def profile(self):
+        """ Measure the importers during the context """
+        patches = [
+            mock.patch.object(cls, name,
+                              self._timed(getattr(cls, name), phase))
+            for cls, name, phase in self._targets()
+        ]
+        for patch in patches:
+            patch.start()
+        try:
+            yield
+        finally:
+            for patch in reversed(patches):
+                patch.stop()
+
+    def report(self):
+        """ Times of the importers, in milliseconds per run """
+        report = {}
+        for owner, times in self.times.iteritems():
+            runs = self.runs[owner] or 1
+            measures = {phase: round(times[phase] * 1000 / runs, 3)
+                        for phase in PHASES}
+            measures['total'] = round(sum(times.values()) * 1000 / runs, 3)
+            measures['runs'] = self.runs[owner]
+            report[owner] = measures
+        return report
+
+
+class CassetteReplay(PrestashopTransactionCase):
+    """ Imports of the tests replayed on their cassette
+
+    The replays are the methods starting with ``replay_``, each one
+    creates the records expected by its cassette like its test.
+    """
+
+    iterations = 20
+    profiler = None
+
+    def setUp(self):
+        super(CassetteReplay, self).setUp()
+        self.sync_metadata()
+        self.base_mapping()
+        self.shop_group = self.env['prestashop.shop.group'].search([])
+        self.shop = self.env['prestashop.shop'].search([])
+
+    def replay(self, cassette_name, model_name, prestashop_id, **kwargs):
+        """ Import a record on its cassette, the first time to warm up
+        the caches of the registry, then ``iterations`` times profiled
+
+        Every import is rolled back and the caches are cleared before
+        the next one.
+        """
+        with recorder.use_cassette(cassette_name, record_mode='none',
+                                   allow_playback_repeats=True):
+            for iteration in range(self.iterations + 1):
+                reference_cache.clear()
+                self.env['prestashop.record.cache'].clear()
+                self.env['prestashop.missing.record'].clear(
+                    self.backend_record.id
+                )
+                self.cr.execute('SAVEPOINT cassette_replay')
+                if iteration:
+                    profile = self.profiler.profile()
+                else:
+                    profile = _not_profiled()
+                with profile:
+                    import_record(self.conn_session, model_name,
+                                  self.backend_record.id, prestashop_id,
+                                  **kwargs)
+                self.cr.execute('ROLLBACK TO SAVEPOINT cassette_replay')
+                self.env.invalidate_all()
+
+    def replay_carrier(self):
+        self.replay('test_import_carrier_record_2',
+                    'prestashop.delivery.carrier', 2)
+
+    def replay_product_category(self):
+        self.replay('test_import_product_category_record_1',
+                    'prestashop.product.category', 5)
+
+    def replay_product_template(self):
+        for idx in range(1, 6):
+            category = self.env['product.category'].create(
+                {'name': 'ps_categ_%d' % idx}
+            )
+            self.create_binding_no_export(
+                'prestashop.product.category', category.id, idx,
+            )
+        self.replay('test_import_product_template_record_1',
+                    'prestashop.product.template', 1)
+
+    def replay_inventory(self):
+        self._create_product_binding(
+            name='Faded Short Sleeves T-shirt',
+            template_ps_id=1,
+            variant_ps_id=1,
+        )
+        self.replay('test_import_inventory_record_variant_1',
+                    '_import_stock_available', 1,
+                    record={'id_product_attribute': '1',
+                            'id': '1',
+                            'id_product': '1'})
+
+    def replay_partner_category(self):
+        self.replay('test_import_partner_category_record_1',
+                    'prestashop.res.partner.category', 3)
+
+    def replay_partner(self):
+        category = self.env['res.partner.category'].create(
+            {'name': 'Customer'}
+        )
+        self.create_binding_no_export(
+            'prestashop.res.partner.category', category.id, 3
+        )
+        self.replay('test_import_partner_record_1',
+                    'prestashop.res.partner', 1)
+
+    def replay_address(self):
+        partner = self.env['res.partner'].create({'name': 'Customer'})
+        self.create_binding_no_export(
+            'prestashop.res.partner', partner.id, 1,
+            shop_group_id=self.shop_group.id,
+            shop_id=self.shop.id,
+        )
+        self.replay('test_import_partner_address_record_1',
+                    'prestashop.address', 1)
+
+    def replay_sale_order(self):
+        self.env['account.payment.mode'].create({
+            'name': 'Bank wire',
+            'company_id': self.backend_record.company_id.id,
+            'bank_account_link': 'fixed',
+            'fixed_journal_id': self.env['account.journal'].search(
+                [], limit=1).id,
+            'payment_type': 'inbound',
+            'payment_method_id': self.env.ref(
+                'account.account_payment_method_manual_in').id,
+            # the order of the cassette has not been paid
+            'days_before_cancel': 0,
+        })
+        carrier = self.env['delivery.carrier'].create({
+            'name': 'My carrier',
+            'product_id': self.env.ref(
+                'connector_ecommerce.product_product_shipping').id,
+            'partner_id': self.env.ref('base.main_company').partner_id.id,
+        })
+        self.create_binding_no_export(
+            'prestashop.delivery.carrier', carrier.id, prestashop_id=2,
+        )
+        for name, template_ps_id, variant_ps_id in [
+                ('Faded Short Sleeve T-shirts', 1, 1),
+                ('Blouse', 2, 7),
+                ('Printed Dress', 3, 13)]:
+            self._create_product_binding(name=name,
+                                         template_ps_id=template_ps_id,
+                                         variant_ps_id=variant_ps_id)
+        partner = self.env['res.partner'].create({'name': 'John DOE'})
+        partner_binding = self.create_binding_no_export(
+            'prestashop.res.partner', partner.id, prestashop_id=1,
+            shop_group_id=self.shop.id,
+        )
+        address = self.env['res.partner'].create({
+            'name': 'John DOE',
+            'parent_id': partner.id,
+        })
+        self.create_binding_no_export(
+            'prestashop.address', address.id, prestashop_id=4,
+            prestashop_partner_id=partner_binding.id
+        )
+        self.replay('test_import_sale_record_5', 'prestashop.sale.order', 5)
+
+
+def replay_names():
+    return sorted(name for name in dir(CassetteReplay)
+                  if name.startswith('replay_'))
+
+
+def run_replays(names=None, iterations=20):
+    """ Run the replays and return the times of the importers
+
+    :param names: names of the replays without ``replay_``, all when
+                  empty
+    :param iterations: number of profiled imports of each replay
+    :return: ``(report, errors)``, errors is the number of replays which
+             failed
+    """
+    profiler = ImportProfiler()
+    CassetteReplay.profiler = profiler
+    CassetteReplay.iterations = iterations
+    suite = unittest.TestSuite()
+    for name in replay_names():
+        if names and name[len('replay_'):] not in names:
+            continue
+        suite.addTest(CassetteReplay(name))
+    result = unittest.TextTestRunner(verbosity=2).run(suite)
+    return profiler.report(), len(result.errors) + len(result.failures)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+""" Run the benchmarks of the synchronizations
+
+Usage::
+
+    python connector_prestashop/benchmarks/run.py -c odoo.cfg -d bench \\
+        --scenario small --output results.json \\
+        --baseline baseline.json --threshold 0.2
+
+The options not listed by ``--help`` are passed to Odoo. The database
+must have connector_prestashop installed and be dedicated to the
+benchmarks. The exit status is 1 when a measure is worse than in the
+baseline by more than the threshold.
+"""
+
+import argparse
+import json
+import sys
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Benchmarks of the PrestaShop synchronizations',
+    )
+    parser.add_argument('--flows',
+                        help='comma-separated names of the flows to run')
+    parser.add_argument('--scenario',
+                        help='scenario of the generated dataset')
+    parser.add_argument('--seed', type=int, default=0)
+    for option in ('products', 'combinations', 'languages', 'customers',
+                   'orders', 'order-lines'):
+        parser.add_argument('--%s' % option, type=int)
+    parser.add_argument('--latency', type=float, default=0,
+                        help='latency of the fake shop, in seconds')
+    parser.add_argument('--output', default='benchmark.json',
+                        help='file where the results are written')
+    parser.add_argument('--baseline',
+                        help='results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='tolerated degradation ratio of the measures')
+    return parser.parse_known_args(argv)
+
+
+def main(argv=None):
+    args, odoo_args = parse_args(argv if argv is not None else sys.argv[1:])
+    import openerp
+    openerp.tools.config.parse_config(odoo_args)
+    dbname = openerp.tools.config['db_name']
+    if not dbname:
+        sys.exit('A database is required (-d)')
+    with openerp.api.Environment.manage():
+        registry = openerp.modules.registry.RegistryManager.get(dbname)
+        from openerp.addons.connector_prestashop.benchmarks import sync
+        options = dict(
+            (name, value) for name, value in vars(args).iteritems()
+            if value is not None and name in (
+                'seed', 'products', 'combinations', 'languages',
+                'customers', 'orders', 'order_lines')
+        )
+        flows = args.flows.split(',') if args.flows else None
+        with registry.cursor() as cr:
+            results = sync.run_benchmarks(cr, flows=flows,
+                                          scenario=args.scenario,
+                                          latency=args.latency, **options)
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+    for name, measures in sorted(results['flows'].iteritems()):
+        print('%-26s %s' % (name, ', '.join(
+            '%s: %s' % (measure, measures[measure])
+            for measure, __ in sync.MEASURES
+        )))
+    if not args.baseline:
+        return
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    found = sync.regressions(results, baseline, args.threshold)
+    for name, measure, base_value, value in found:
+        print('REGRESSION %s %s: %s -> %s' % (name, measure, base_value,
+                                              value))
+    if found:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+""" Profile the importers on the cassettes of the tests
+
+Usage::
+
+    python connector_prestashop/benchmarks/run_replay.py -c odoo.cfg \\
+        -d test_db --iterations 50 --replays product_template,sale_order
+
+The options not listed by ``--help`` are passed to Odoo. The database
+must have connector_prestashop installed with its demo data, as for the
+tests; nothing is committed in it.
+"""
+
+import argparse
+import json
+import sys
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Profile the importers on the cassettes of the tests',
+    )
+    parser.add_argument('--replays',
+                        help='comma-separated names of the replays to run '
+                             '(carrier, product_template, sale_order, ...)')
+    parser.add_argument('--iterations', type=int, default=20,
+                        help='number of imports of each replay')
+    parser.add_argument('--output', default='replay.json',
+                        help='file where the results are written')
+    return parser.parse_known_args(argv)
+
+
+def main(argv=None):
+    args, odoo_args = parse_args(argv if argv is not None else sys.argv[1:])
+    import openerp
+    openerp.tools.config.parse_config(odoo_args)
+    dbname = openerp.tools.config['db_name']
+    if not dbname:
+        sys.exit('A database is required (-d)')
+    with openerp.api.Environment.manage():
+        openerp.modules.registry.RegistryManager.get(dbname)
+        from openerp.addons.connector_prestashop.benchmarks import replay
+        names = args.replays.split(',') if args.replays else None
+        report, errors = replay.run_replays(names=names,
+                                            iterations=args.iterations)
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+    print('%-36s %6s %s' % ('importer (ms per run)', 'runs',
+                            ' '.join('%9s' % phase for phase
+                                     in replay.PHASES + ('total',))))
+    for owner, measures in sorted(report.iteritems(),
+                                  key=lambda item: -item[1]['total']):
+        print('%-36s %6d %s' % (owner, measures['runs'], ' '.join(
+            '%9.2f' % measures[phase]
+            for phase in replay.PHASES + ('total',)
+        )))
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
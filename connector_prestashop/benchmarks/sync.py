@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+""" Benchmarks of the main synchronizations against a fake PrestaShop
+
+Each flow is started as the backend buttons and the scheduled actions
+do, then the jobs it delays are executed one after the other until
+none is left, committing after each job like the jobs runner. The
+measures of a flow are:
+
+* ``records_per_sec``: records synchronized per second
+* ``http_calls_per_record``: calls received by the fake shop
+* ``sql_queries_per_record``: queries executed by the jobs
+* ``peak_memory_mb``: peak resident memory of the process
+
+Use a database dedicated to the benchmarks: the records imported are
+committed.
+"""
+
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from openerp import SUPERUSER_ID, api, fields
+from openerp.addons.connector.queue.job import OpenERPJobStorage
+from openerp.addons.connector.session import ConnectorSession
+
+from ..models.product_template.exporter import export_product_quantities
+from ..models.product_template.importer import (
+    import_inventory,
+    import_products,
+)
+from ..models.res_partner.importer import import_customers_since
+from ..models.sale_order.importer import import_orders_since
+from ..tests.fake_prestashop.generator import generate
+from ..tests.fake_prestashop.webservice import FakePrestaShop, serve
+
+_logger = logging.getLogger(__name__)
+
+WEBSERVICE_KEY = 'BENCHMARKBENCHMARKBENCHMARKBENCH'
+
+# measures compared with the baseline, and whether a higher value is
+# a regression
+MEASURES = [
+    ('records_per_sec', False),
+    ('http_calls_per_record', True),
+    ('sql_queries_per_record', True),
+    ('peak_memory_mb', True),
+]
+
+
+def _count_product_bindings(env, backend, dataset):
+    return sum(env[model].search_count([('backend_id', '=', backend.id)])
+               for model in ('prestashop.product.template',
+                             'prestashop.product.combination'))
+
+
+# name, job started by the flow, number of records synchronized by the
+# flow; they run in this order as the orders need the products and the
+# quantities are exported after the inventory import
+FLOWS = [
+    ('import_products',
+     lambda session, backend: import_products(session, backend.id),
+     lambda env, backend, dataset: dataset.count('products')),
+    ('import_inventory',
+     lambda session, backend: import_inventory(session, backend.id),
+     lambda env, backend, dataset: dataset.count('stock_availables')),
+    ('import_customers_since',
+     lambda session, backend: import_customers_since(session, backend.id),
+     lambda env, backend, dataset: dataset.count('customers')),
+    ('import_orders_since',
+     lambda session, backend: import_orders_since(session, backend.id),
+     lambda env, backend, dataset: dataset.count('orders')),
+    ('export_product_quantities',
+     lambda session, backend: export_product_quantities(session,
+                                                         backend.id),
+     _count_product_bindings),
+]
+
+
+def _resident_memory():
+    """ Resident memory of the process in bytes """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        # no procfs: peak of the process (kilobytes on Linux, bytes on
+        # macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemorySampler(threading.Thread):
+    """ Sample the resident memory to keep its peak """
+
+    def __init__(self, interval=0.05):
+        super(MemorySampler, self).__init__()
+        self.daemon = True
+        self.interval = interval
+        self.peak = _resident_memory()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, _resident_memory())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, _resident_memory())
+        return self.peak
+
+
+def perform_jobs(session, after_id):
+    """ Execute the pending jobs created after the job ``after_id``,
+    including the ones they delay, in the order of their creation
+
+    The failed jobs are not retried.
+
+    :return: number of jobs done and failed
+    """
+    storage = OpenERPJobStorage(session)
+    cr = session.env.cr
+    done = failed = 0
+    while True:
+        job_records = session.env['queue.job'].search(
+            [('id', '>', after_id), ('state', '=', 'pending')],
+            order='id', limit=100,
+        )
+        if not job_records:
+            return done, failed
+        for job_record in job_records:
+            after_id = job_record.id
+            job = storage.load(job_record.uuid)
+            job.set_started()
+            storage.store(job)
+            cr.commit()
+            try:
+                result = job.perform(session)
+            except Exception:
+                cr.rollback()
+                session.env.invalidate_all()
+                job.set_failed(exc_info=traceback.format_exc())
+                _logger.debug('Job %s failed', job.uuid, exc_info=True)
+                failed += 1
+            else:
+                job.set_done(result=result)
+                done += 1
+            storage.store(job)
+            cr.commit()
+
+
+def run_flow(session, backend, shop, dataset, start, count_records):
+    """ Run a flow and its jobs, return its measures """
+    env = session.env
+    cr = env.cr
+    cr.execute('SELECT COALESCE(MAX(id), 0) FROM queue_job')
+    last_job_id = cr.fetchone()[0]
+    calls = sum(shop.calls.values())
+    queries = cr.sql_log_count
+    sampler = MemorySampler()
+    sampler.start()
+    started = time.time()
+    try:
+        start(session, backend)
+        cr.commit()
+        done, failed = perform_jobs(session, last_job_id)
+    finally:
+        peak_memory = sampler.stop()
+    seconds = time.time() - started
+    records = count_records(env, backend, dataset) or 1
+    http_calls = sum(shop.calls.values()) - calls
+    sql_queries = cr.sql_log_count - queries
+    return {
+        'records': records,
+        'seconds': round(seconds, 3),
+        'jobs_done': done,
+        'jobs_failed': failed,
+        'http_calls': http_calls,
+        'sql_queries': sql_queries,
+        'records_per_sec': round(records / seconds, 3),
+        'http_calls_per_record': round(float(http_calls) / records, 3),
+        'sql_queries_per_record': round(float(sql_queries) / records, 3),
+        'peak_memory_mb': round(peak_memory / 1024.0 / 1024.0, 1),
+    }
+
+
+def setup_backend(env, location):
+    """ Create a backend on the fake shop, with its metadata and base
+    data, and the configuration needed to import the orders """
+    env.ref('base.GBP').active = True
+    backend = env['prestashop.backend'].create({
+        'name': 'Benchmark %s' % fields.Datetime.now(),
+        'version': '1.6.1.2',
+        'location': location,
+        'webservice_key': WEBSERVICE_KEY,
+        'warehouse_id': env.ref('stock.warehouse0').id,
+        'discount_product_id': env.ref(
+            'connector_ecommerce.product_product_discount').id,
+        'shipping_product_id': env.ref(
+            'connector_ecommerce.product_product_shipping').id,
+    })
+    backend.synchronize_metadata()
+    backend.synchronize_basedata()
+    payment_modes = env['account.payment.mode'].search(
+        [('name', '=', 'Bank wire')]
+    )
+    if not payment_modes:
+        payment_modes = env['account.payment.mode'].create({
+            'name': 'Bank wire',
+            'company_id': backend.company_id.id,
+            'bank_account_link': 'fixed',
+            'fixed_journal_id': env['account.journal'].search(
+                [('type', '=', 'bank')], limit=1).id,
+            'payment_type': 'inbound',
+            'payment_method_id': env.ref(
+                'account.account_payment_method_manual_in').id,
+        })
+    payment_modes.write({'import_rule': 'always', 'days_before_cancel': 0})
+    return backend
+
+
+def run_benchmarks(cr, flows=None, scenario=None, latency=0, **options):
+    """ Run the benchmarks of the flows on a generated shop
+
+    :param cr: cursor of the database of the benchmarks
+    :param flows: names of the flows to run, all when empty
+    :param scenario: scenario of the dataset, see
+                     :data:`~..tests.fake_prestashop.generator.SCENARIOS`
+    :param latency: latency of the fake shop in seconds
+    :param options: options of the generation of the dataset
+    :return: the results, as written in the JSON file
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    dataset = generate(scenario, **options)
+    shop = FakePrestaShop(dataset, webservice_key=WEBSERVICE_KEY,
+                          latency=latency)
+    results = {
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'scenario': scenario,
+        'options': options,
+        'latency': latency,
+        'flows': {},
+    }
+    with serve(shop) as location:
+        backend = setup_backend(env, location)
+        cr.commit()
+        session = ConnectorSession.from_env(env)
+        for name, start, count_records in FLOWS:
+            if flows and name not in flows:
+                continue
+            _logger.info('Benchmark of %s', name)
+            results['flows'][name] = measures = run_flow(
+                session, backend, shop, dataset, start, count_records,
+            )
+            _logger.info('%s: %s', name, measures)
+    return results
+
+
+def regressions(results, baseline, threshold):
+    """ Measures worse than the baseline by more than ``threshold``
+
+    :param threshold: tolerated ratio, 0.2 tolerates 20% slower
+    :return: list of ``(flow, measure, baseline value, value)``
+    """
+    found = []
+    for name, measures in sorted(results['flows'].iteritems()):
+        base_measures = baseline.get('flows', {}).get(name)
+        if not base_measures:
+            continue
+        for measure, higher_is_worse in MEASURES:
+            base_value = base_measures.get(measure)
+            value = measures[measure]
+            if not base_value:
+                continue
+            if higher_is_worse:
+                worse = value > base_value * (1 + threshold)
+            else:
+                worse = value < base_value * (1 - threshold)
+            if worse:
+                found.append((name, measure, base_value, value))
+    return found
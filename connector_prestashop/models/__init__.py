@@ -7,7 +7,13 @@ from . import account_invoice
 from . import account_payment_mode
 from . import account_tax
 from . import account_tax_group
+from . import batch_cursor
+from . import call_stat
+from . import circuit_breaker
 from . import delivery_carrier
+from . import job_collapse
+from . import job_profiling
+from . import job_timing
 from . import mail_message
 from . import payment
 from . import prestashop_backend
@@ -17,6 +23,9 @@ from . import product_pricelist
 from . import product_product
 from . import product_supplierinfo
 from . import product_template
+from . import queue_job
+from . import rate_limit
+from . import record_cache
 from . import res_country
 from . import res_currency
 from . import res_lang
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
-from openerp import _, fields
+from openerp import _
 
 from openerp.addons.connector.exception import MappingError
 from openerp.addons.connector.queue.job import job
@@ -12,6 +12,7 @@ from openerp.addons.connector.unit.mapper import (
 )
 
 from ...backend import prestashop
+from ...unit.job_identity import backend_first_argument, related_backend
 from ...unit.importer import (
     PrestashopImporter,
     import_batch,
@@ -249,17 +250,21 @@ class RefundBatchImporter(DelayedBatchImporter):
     _model_name = 'prestashop.refund'
 
 
+@related_backend(backend_first_argument)
 @job(default_channel='root.prestashop')
 def import_refunds(session, backend_id, since_date, **kwargs):
     filters = None
     if since_date:
         filters = {'date': '1', 'filter[date_upd]': '>[%s]' % (since_date)}
-    now_fmt = fields.Datetime.now()
+    now_fmt = session.env['prestashop.batch.cursor'].watermark(
+        backend_id, ['prestashop.refund']
+    )
     result = import_batch(
         session,
         'prestashop.refund',
         backend_id,
         filters,
+        resumable=True,
         **kwargs
     )
     session.env['prestashop.backend'].browse(backend_id).write({
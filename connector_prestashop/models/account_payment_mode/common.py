@@ -13,7 +13,8 @@ class PaymentModeAdapter(GenericAdapter):
     _export_node_name = 'order'
 
     def search(self, filters=None):
-        res = self.client.get(self._prestashop_model, options=filters)
+        res = self._call_idempotent(self.client.get, self._prestashop_model,
+                                    options=filters)
         if not res['orders']:
             return []
         methods = res[self._prestashop_model][self._export_node_name]
@@ -39,3 +39,4 @@ class AccountTax(models.Model):
 class AccountTaxAdapter(GenericAdapter):
     _model_name = 'prestashop.account.tax'
     _prestashop_model = 'taxes'
+    _cache_ttl = 3600
@@ -47,3 +47,4 @@ class PrestashopAccountTaxGroup(models.Model):
 class TaxGroupAdapter(GenericAdapter):
     _model_name = 'prestashop.account.tax.group'
     _prestashop_model = 'tax_rule_groups'
+    _cache_ttl = 3600
@@ -6,6 +6,7 @@ from openerp.addons.connector.unit.mapper import (
     mapping,
     only_create,
 )
+from ...unit.mapper import source_fields
 from ...unit.importer import PrestashopImporter, DirectBatchImporter
 from ...backend import prestashop
 
@@ -18,14 +19,17 @@ class TaxGroupMapper(ImportMapper):
         ('name', 'name'),
     ]
 
+    @source_fields()
     @mapping
     def backend_id(self, record):
         return {'backend_id': self.backend_record.id}
 
+    @source_fields()
     @mapping
     def company_id(self, record):
         return {'company_id': self.backend_record.company_id.id}
 
+    @source_fields('name')
     @only_create
     @mapping
     def odoo_id(self, record):
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import json
+from datetime import datetime, timedelta
+
+from openerp import models, fields, api
+from openerp.tools import config, DEFAULT_SERVER_DATETIME_FORMAT
+
+# filters set by the pagination, not part of the identity of a run
+PAGING_FILTERS = ('limit', 'sort', 'filter[id]')
+
+
+def run_filters(filters):
+    """ Key of the run of a batch import with the filters """
+    return json.dumps(
+        dict((key, value) for key, value in (filters or {}).iteritems()
+             if key not in PAGING_FILTERS),
+        sort_keys=True,
+    )
+
+
+class PrestashopBatchCursor(models.Model):
+    """ Progress of the resumable batch imports not finished
+
+    A resumable batch import (see
+    :meth:`~..unit.importer.BatchImporter.run`) keeps here the last id
+    of its pages and commits each page with the imports it delayed. When
+    the job dies, its next run with the same filters starts after the
+    last id instead of the first page. The cursor is removed when the
+    last page is read.
+
+    A new run of a binding model with other filters replaces the cursor:
+    the import since a date has been moved forward meanwhile.
+    """
+    _name = 'prestashop.batch.cursor'
+    _description = 'PrestaShop Batch Import Cursor'
+    _order = 'date_start'
+
+    backend_id = fields.Many2one(
+        comodel_name='prestashop.backend',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+    model = fields.Char(string='Binding Model', required=True)
+    filters = fields.Char(required=True)
+    date_start = fields.Datetime(
+        string='Started At',
+        required=True,
+        help="Start of the run, the records modified since then are "
+             "imported by the next run.",
+    )
+    date_page = fields.Datetime(string='Last Page At')
+    last_id = fields.Integer(string='Last PrestaShop ID')
+    pages = fields.Integer(string='Pages Read')
+    records = fields.Integer(string='Records Read')
+
+    _sql_constraints = [
+        ('cursor_uniq', 'unique(backend_id, model)',
+         'A binding model can have only one batch import in progress.'),
+    ]
+
+    @api.model
+    def resume(self, backend_id, model, filters):
+        """ Return the cursor of the run interrupted with the same
+        filters, or a new cursor """
+        key = run_filters(filters)
+        cursor = self.search([('backend_id', '=', backend_id),
+                              ('model', '=', model)], limit=1)
+        if cursor and cursor.filters == key:
+            return cursor
+        cursor.unlink()
+        return self.create({
+            'backend_id': backend_id,
+            'model': model,
+            'filters': key,
+            'date_start': fields.Datetime.now(),
+        })
+
+    @api.multi
+    def advance(self, record_ids):
+        """ Move the cursor after a page """
+        self.ensure_one()
+        values = {
+            'date_page': fields.Datetime.now(),
+            'pages': self.pages + 1,
+            'records': self.records + len(record_ids),
+        }
+        if record_ids:
+            values['last_id'] = max(int(record_id)
+                                    for record_id in record_ids)
+        self.write(values)
+        return True
+
+    @api.model
+    def watermark(self, backend_id, models):
+        """ Date of the import since a date to store when the batch
+        imports of the binding models are complete
+
+        This is the current date, unless one of the imports resumes a
+        run: the records modified since the start of the interrupted
+        run may be in the pages it has already read.
+
+        To call before the batch imports.
+        """
+        cursors = self.search([('backend_id', '=', backend_id),
+                               ('model', 'in', models)])
+        return min(cursors.mapped('date_start') +
+                   [fields.Datetime.now()])
+
+    @api.model
+    def _scheduler_cleanup(self):
+        """ Remove the cursors of the runs started more than
+        ``prestashop_batch_cursors_retention`` days ago (default: 7) """
+        days = int(config.get('prestashop_batch_cursors_retention', 7))
+        since = (datetime.utcnow() - timedelta(days=days)).strftime(
+            DEFAULT_SERVER_DATETIME_FORMAT)
+        self.search([('date_start', '<', since)]).unlink()
+        return True
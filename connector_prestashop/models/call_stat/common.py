@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from openerp import models, fields, api
+from openerp.tools import config, DEFAULT_SERVER_DATETIME_FORMAT
+
+from ..record_cache.common import cache_cursor
+
+# upper bounds (milliseconds) of the latency buckets, the last bucket
+# holds the slower calls
+LATENCY_BUCKETS = (50, 100, 200, 500, 1000, 2000, 5000)
+
+# statistics of the calls not yet written in the database:
+# {(dbname, backend_id, minute, resource, method):
+#  [calls, errors, bytes, duration, bucket_0, ..., bucket_n]}
+_pending = {}
+_pending_lock = threading.Lock()
+_last_flush = [time.time()]
+
+
+def latency_bucket(duration):
+    """ Index of the latency bucket of a duration in seconds """
+    milliseconds = duration * 1000
+    for index, bound in enumerate(LATENCY_BUCKETS):
+        if milliseconds <= bound:
+            return index
+    return len(LATENCY_BUCKETS)
+
+
+def percentile(buckets, ratio):
+    """ Estimate a percentile (ms) from the counts of the latency buckets
+
+    The estimate is the upper bound of the bucket holding the
+    percentile, or the last bound when it is in the slowest bucket.
+    """
+    total = sum(buckets)
+    if not total:
+        return 0
+    cumulated = 0
+    for index, count in enumerate(buckets):
+        cumulated += count
+        if cumulated >= total * ratio:
+            break
+    return LATENCY_BUCKETS[min(index, len(LATENCY_BUCKETS) - 1)]
+
+
+class PrestashopCallStat(models.Model):
+    """ Statistics of the calls to the PrestaShop webservice
+
+    The calls sampled by the adapters (see the *Webservice Calls
+    Sampling* of the backends) are aggregated per minute, resource and
+    HTTP method in memory, and written in this table every
+    ``prestashop_call_stats_flush_interval`` seconds (default: 10). The
+    counters are weighted by the inverse of the sampling rate so they
+    estimate the total number of calls.
+
+    The calls of each job are counted in its job timings instead, see
+    ``prestashop.job.timing``.
+    """
+    _name = 'prestashop.call.stat'
+    _description = 'PrestaShop Webservice Calls'
+    _log_access = False
+    _order = 'minute desc, resource'
+
+    # not a Many2one: the rows are written in other transactions
+    # than the ones of the backends
+    backend_id = fields.Integer(required=True, index=True)
+    minute = fields.Datetime(required=True, index=True)
+    resource = fields.Char(required=True)
+    method = fields.Char(string='HTTP Method', required=True)
+    calls = fields.Float()
+    errors = fields.Float()
+    bytes = fields.Float(string='Bytes Received')
+    duration = fields.Float(string='Total Duration (s)')
+    avg_latency = fields.Integer(
+        string='Average Latency (ms)',
+        compute='_compute_avg_latency',
+    )
+    # one column per latency bucket, see LATENCY_BUCKETS
+    latency_0 = fields.Float(string='<= 50ms')
+    latency_1 = fields.Float(string='<= 100ms')
+    latency_2 = fields.Float(string='<= 200ms')
+    latency_3 = fields.Float(string='<= 500ms')
+    latency_4 = fields.Float(string='<= 1s')
+    latency_5 = fields.Float(string='<= 2s')
+    latency_6 = fields.Float(string='<= 5s')
+    latency_7 = fields.Float(string='> 5s')
+
+    _sql_constraints = [
+        ('stat_uniq',
+         'unique(backend_id, minute, resource, method)',
+         'The statistics are aggregated per minute, resource and '
+         'method.'),
+    ]
+
+    @api.depends('calls', 'duration')
+    def _compute_avg_latency(self):
+        for stat in self:
+            if stat.calls:
+                stat.avg_latency = int(stat.duration / stat.calls * 1000)
+
+    @api.model
+    def _flush_interval(self):
+        return int(config.get('prestashop_call_stats_flush_interval', 10))
+
+    @api.model
+    def record(self, backend_id, resource, method, status, size, duration,
+               weight=1.):
+        """ Count a call, the statistics are written in the database
+        every few seconds
+
+        :param status: HTTP status of the response, 0 when there is no
+                       response
+        :param size: number of bytes received
+        :param duration: duration of the call in seconds
+        :param weight: number of calls represented by this one, the
+                       inverse of the sampling rate
+        """
+        minute = datetime.utcnow().strftime('%Y-%m-%d %H:%M:00')
+        key = (self.env.cr.dbname, backend_id, minute, resource, method)
+        error = not 200 <= status < 400
+        with _pending_lock:
+            stat = _pending.get(key)
+            if stat is None:
+                stat = _pending[key] = [0.] * (5 + len(LATENCY_BUCKETS))
+            stat[0] += weight
+            stat[1] += weight if error else 0.
+            stat[2] += size * weight
+            stat[3] += duration * weight
+            stat[4 + latency_bucket(duration)] += weight
+            must_flush = time.time() - _last_flush[0] > \
+                self._flush_interval()
+        if must_flush:
+            self.flush()
+
+    @api.model
+    def flush(self):
+        """ Write the pending statistics of this database """
+        dbname = self.env.cr.dbname
+        with _pending_lock:
+            _last_flush[0] = time.time()
+            stats = dict((key, _pending.pop(key)) for key in _pending.keys()
+                         if key[0] == dbname)
+        if not stats:
+            return True
+        columns = ['calls', 'errors', 'bytes', 'duration'] + [
+            'latency_%d' % index for index in range(len(LATENCY_BUCKETS) + 1)
+        ]
+        update = ("UPDATE prestashop_call_stat SET %s "
+                  "WHERE backend_id = %%s AND minute = %%s "
+                  "AND resource = %%s AND method = %%s" %
+                  ', '.join('%s = %s + %%s' % (column, column)
+                            for column in columns))
+        insert = ("INSERT INTO prestashop_call_stat "
+                  "(backend_id, minute, resource, method, %s) "
+                  "VALUES (%s)" %
+                  (', '.join(columns),
+                   ', '.join(['%s'] * (4 + len(columns)))))
+        with cache_cursor(self.env) as cr:
+            for key, values in sorted(stats.iteritems()):
+                cr.execute(update, tuple(values) + key[1:])
+                if not cr.rowcount:
+                    cr.execute(insert, key[1:] + tuple(values))
+        return True
+
+    @api.model
+    def summary(self, backend_id, hours=24):
+        """ Return the statistics of a backend over the last hours
+
+        The pending statistics are written before, and the statistics
+        are read in a new transaction, which sees them.
+
+        :return: dict with the ``p50`` and ``p95`` latencies (ms), the
+                 average ``calls_per_job`` and ``bytes_per_job`` counted
+                 in the job timings
+        """
+        self.flush()
+        since = (datetime.utcnow() - timedelta(hours=hours)).strftime(
+            DEFAULT_SERVER_DATETIME_FORMAT)
+        columns = ', '.join('COALESCE(SUM(latency_%d), 0)' % index
+                            for index in range(len(LATENCY_BUCKETS) + 1))
+        buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        jobs, calls, size = 0, 0., 0.
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "SELECT %s FROM prestashop_call_stat "
+                "WHERE backend_id = %%s AND minute >= %%s" % columns,
+                (backend_id, since)
+            )
+            buckets = cr.fetchone()
+            cr.execute(
+                "SELECT COUNT(DISTINCT job_uuid), COALESCE(SUM(calls), 0), "
+                "       COALESCE(SUM(bytes), 0) "
+                "FROM prestashop_job_timing "
+                "WHERE backend_id = %s AND date >= %s AND job_uuid != ''",
+                (backend_id, since)
+            )
+            jobs, calls, size = cr.fetchone()
+        return {
+            'p50': percentile(buckets, 0.5),
+            'p95': percentile(buckets, 0.95),
+            'calls_per_job': calls / jobs if jobs else 0.,
+            'bytes_per_job': size / jobs if jobs else 0.,
+        }
+
+    @api.model
+    def _scheduler_cleanup(self):
+        """ Remove the statistics older than
+        ``prestashop_call_stats_retention`` days (default: 7) """
+        days = int(config.get('prestashop_call_stats_retention', 7))
+        since = (datetime.utcnow() - timedelta(days=days)).strftime(
+            DEFAULT_SERVER_DATETIME_FORMAT)
+        self.env.cr.execute(
+            "DELETE FROM prestashop_call_stat WHERE minute < %s", (since,)
+        )
+        return True
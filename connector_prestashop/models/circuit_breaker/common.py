@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import logging
+import threading
+import time
+
+from openerp import models, fields, api
+from openerp.tools import config
+from openerp.addons.connector.exception import NetworkRetryableError
+
+from ..record_cache.common import cache_cursor
+
+_logger = logging.getLogger(__name__)
+
+# state of the circuits seen by this process, refreshed from the database
+# every ``prestashop_circuit_breaker_refresh`` seconds:
+# {(dbname, backend_id): [refreshed_at, open_until, failures]}
+_circuits = {}
+_circuits_lock = threading.Lock()
+
+
+class PrestashopCircuitBreaker(models.Model):
+    """ Circuit breaker of the calls to PrestaShop, shared by the workers
+
+    The consecutive transient failures of the calls to a backend
+    (network errors, 502, 503, 504, 429) are counted. Once they reach
+    ``prestashop_circuit_breaker_threshold`` (default: 5), the circuit
+    opens for ``prestashop_circuit_breaker_cooldown`` seconds (default:
+    60): the calls fail at once with a
+    :class:`~openerp.addons.connector.exception.NetworkRetryableError`,
+    so the jobs are retried later instead of waiting for timeouts, and
+    the pending jobs of the backend are postponed after the cooldown.
+
+    After the cooldown, a single call is tried: the worker making it
+    keeps the circuit open for ``prestashop_circuit_breaker_probe``
+    seconds (default: 30) while the other calls are still postponed.
+    The circuit is closed when the call succeeds, and opens again at
+    once when it fails.
+    """
+    _name = 'prestashop.circuit.breaker'
+    _description = 'PrestaShop Circuit Breaker'
+    _log_access = False
+
+    # not a Many2one: the rows are written in other transactions
+    # than the ones of the backends
+    backend_id = fields.Integer(required=True)
+    failures = fields.Integer()
+    open_until = fields.Datetime()
+    opened = fields.Boolean(
+        help="The circuit has been opened and no call succeeded since"
+    )
+
+    _sql_constraints = [
+        ('backend_uniq', 'unique(backend_id)',
+         'A backend can have only one circuit breaker.'),
+    ]
+
+    @api.model
+    def _threshold(self):
+        return int(config.get('prestashop_circuit_breaker_threshold', 5))
+
+    @api.model
+    def _cooldown(self):
+        return int(config.get('prestashop_circuit_breaker_cooldown', 60))
+
+    @api.model
+    def _probe_delay(self):
+        return int(config.get('prestashop_circuit_breaker_probe', 30))
+
+    @api.model
+    def _refresh_delay(self):
+        return int(config.get('prestashop_circuit_breaker_refresh', 5))
+
+    def _key(self, backend_id):
+        return (self.env.cr.dbname, backend_id)
+
+    def _set_state(self, backend_id, open_until, failures):
+        with _circuits_lock:
+            _circuits[self._key(backend_id)] = [time.time(), open_until,
+                                                failures]
+
+    def _state(self, backend_id):
+        """ Return ``(open_until, failures)``, ``open_until`` being a
+        timestamp or None """
+        state = _circuits.get(self._key(backend_id))
+        if state and time.time() - state[0] < self._refresh_delay():
+            return state[1], state[2]
+        open_until, failures = None, 0
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "SELECT EXTRACT(EPOCH FROM open_until), failures "
+                "FROM prestashop_circuit_breaker WHERE backend_id = %s",
+                (backend_id,)
+            )
+            row = cr.fetchone()
+            if row:
+                open_until, failures = row
+        self._set_state(backend_id, open_until, failures)
+        return open_until, failures
+
+    def _probe(self, backend_id):
+        """ Take the call trying PrestaShop after the cooldown
+
+        :return: None when the call is taken by this worker or the
+                 circuit has been closed meanwhile, else the end of the
+                 suspension (timestamp)
+        """
+        open_until = None
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "UPDATE prestashop_circuit_breaker "
+                "SET open_until = now() at time zone 'UTC' + %s::interval "
+                "WHERE backend_id = %s "
+                "AND open_until <= now() at time zone 'UTC' "
+                "RETURNING EXTRACT(EPOCH FROM open_until)",
+                ('%d seconds' % self._probe_delay(), backend_id)
+            )
+            row = cr.fetchone()
+            if row:
+                # the other calls of this process wait for the probe too
+                self._set_state(backend_id, row[0], 0)
+                return None
+            cr.execute(
+                "SELECT EXTRACT(EPOCH FROM open_until) "
+                "FROM prestashop_circuit_breaker WHERE backend_id = %s",
+                (backend_id,)
+            )
+            row = cr.fetchone()
+            open_until = row and row[0]
+        self._set_state(backend_id, open_until, 0)
+        return open_until
+
+    @api.model
+    def check(self, backend_id):
+        """ Raise if the circuit of the backend is open """
+        open_until, __ = self._state(backend_id)
+        if open_until and open_until <= time.time():
+            # half-open: only one call tries PrestaShop
+            open_until = self._probe(backend_id)
+        if open_until and open_until > time.time():
+            delay = int(open_until - time.time()) + 1
+            # postponed without consuming the retries of the job
+            raise NetworkRetryableError(
+                'PrestaShop is unreachable, the calls are suspended '
+                'for %d seconds.' % delay,
+                seconds=delay,
+                ignore_retry=True,
+            )
+
+    @api.model
+    def success(self, backend_id):
+        """ Close the circuit after a successful call """
+        open_until, failures = self._state(backend_id)
+        if not open_until and not failures:
+            return
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "UPDATE prestashop_circuit_breaker "
+                "SET failures = 0, open_until = NULL, opened = false "
+                "WHERE backend_id = %s",
+                (backend_id,)
+            )
+        self._set_state(backend_id, None, 0)
+
+    @api.model
+    def failure(self, backend_id):
+        """ Count a transient failure, open the circuit if needed """
+        open_until = None
+        failures = 0
+        cooldown = '%d seconds' % self._cooldown()
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "UPDATE prestashop_circuit_breaker "
+                "SET failures = failures + 1 "
+                "WHERE backend_id = %s "
+                "RETURNING failures, opened",
+                (backend_id,)
+            )
+            row = cr.fetchone()
+            if not row:
+                cr.execute(
+                    "INSERT INTO prestashop_circuit_breaker "
+                    "(backend_id, failures, opened) VALUES (%s, 1, false)",
+                    (backend_id,)
+                )
+                row = (1, False)
+            failures, opened = row
+            if opened or failures >= self._threshold():
+                cr.execute(
+                    "UPDATE prestashop_circuit_breaker "
+                    "SET failures = 0, opened = true, "
+                    "open_until = now() at time zone 'UTC' + %s::interval "
+                    "WHERE backend_id = %s "
+                    "RETURNING EXTRACT(EPOCH FROM open_until)",
+                    (cooldown, backend_id)
+                )
+                open_until = cr.fetchone()[0]
+                failures = 0
+                self._postpone_jobs(cr, backend_id, cooldown)
+                _logger.warning('PrestaShop backend %s is unreachable, '
+                                'calls suspended for %s',
+                                backend_id, cooldown)
+        self._set_state(backend_id, open_until, failures)
+
+    def _postpone_jobs(self, cr, backend_id, delay):
+        """ Postpone the pending jobs of the backend
+
+        The backend of the jobs calling PrestaShop is stored when they
+        are delayed, see :func:`~..unit.job_identity.related_backend`.
+        """
+        cr.execute(
+            "UPDATE queue_job "
+            "SET eta = now() at time zone 'UTC' + %s::interval "
+            "WHERE state = 'pending' AND prestashop_backend_id = %s "
+            "AND (eta IS NULL "
+            "     OR eta < now() at time zone 'UTC' + %s::interval)",
+            (delay, backend_id, delay)
+        )
+
+    @api.model
+    def reset(self, backend_id):
+        """ Close the circuit of a backend """
+        with cache_cursor(self.env) as cr:
+            cr.execute("DELETE FROM prestashop_circuit_breaker "
+                       "WHERE backend_id = %s", (backend_id,))
+        with _circuits_lock:
+            _circuits.pop(self._key(backend_id), None)
+        return True
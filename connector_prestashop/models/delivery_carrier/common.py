@@ -60,6 +60,7 @@ class DeliveryCarrier(models.Model):
 class DeliveryCarrierAdapter(GenericAdapter):
     _model_name = 'prestashop.delivery.carrier'
     _prestashop_model = 'carriers'
+    _cache_ttl = 3600
 
     def search(self, filters=None):
         if filters is None:
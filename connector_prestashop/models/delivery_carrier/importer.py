@@ -6,12 +6,14 @@ from openerp.addons.connector.queue.job import job
 from openerp.addons.connector.unit.mapper import (mapping,
                                                   ImportMapper,
                                                   )
+from ...unit.mapper import source_fields
 from ...unit.importer import (
     DelayedBatchImporter,
     PrestashopImporter,
     import_batch,
 )
 from ...backend import prestashop
+from ...unit.job_identity import backend_first_argument, related_backend
 
 _logger = logging.getLogger(__name__)
 
@@ -30,10 +32,12 @@ class CarrierImportMapper(ImportMapper):
         ('id_reference', 'id_reference'),
     ]
 
+    @source_fields('active')
     @mapping
     def active(self, record):
         return {'active_ext': record['active'] == '1'}
 
+    @source_fields()
     @mapping
     def product_id(self, record):
         if self.backend_record.shipping_product_id:
@@ -41,15 +45,18 @@ class CarrierImportMapper(ImportMapper):
         product = self.env.ref('connector_ecommerce.product_product_shipping')
         return {'product_id': product.id}
 
+    @source_fields()
     @mapping
     def partner_id(self, record):
         default_partner = self.backend_record.company_id.partner_id
         return {'partner_id': default_partner.id}
 
+    @source_fields()
     @mapping
     def backend_id(self, record):
         return {'backend_id': self.backend_record.id}
 
+    @source_fields()
     @mapping
     def company_id(self, record):
         return {'company_id': self.backend_record.company_id.id}
@@ -70,6 +77,7 @@ class DeliveryCarrierBatchImporter(DelayedBatchImporter):
             self._import_record(record_id, **kwargs)
 
 
+@related_backend(backend_first_argument)
 @job(default_channel='root.prestashop')
 def import_carriers(session, backend_id, **kwargs):
     return import_batch(
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+from datetime import datetime, timedelta
+
+from openerp import models, fields, api
+from openerp.tools import config, DEFAULT_SERVER_DATETIME_FORMAT
+
+from ..record_cache.common import cache_cursor
+
+
+class PrestashopJobCollapse(models.Model):
+    """ Jobs not delayed because the same job was waiting to run
+
+    The imports and exports of records are not delayed again while the
+    same job (same function, backend, binding model and record) has not
+    started, see :func:`~..unit.job_identity.deduplicate`. They are
+    counted here per hour, function and binding model, in their own
+    transaction.
+    """
+    _name = 'prestashop.job.collapse'
+    _description = 'PrestaShop Collapsed Jobs'
+    _log_access = False
+    _order = 'hour desc, function, model'
+
+    # not a Many2one: the rows are written in other transactions
+    # than the ones of the backends
+    backend_id = fields.Integer(required=True, index=True)
+    hour = fields.Datetime(required=True, index=True)
+    function = fields.Char(string='Job Function', required=True)
+    model = fields.Char(string='Binding Model', required=True)
+    collapsed = fields.Integer(string='Collapsed Jobs')
+
+    _sql_constraints = [
+        ('collapse_uniq', 'unique(backend_id, hour, function, model)',
+         'The collapsed jobs are counted per hour, function and model.'),
+    ]
+
+    @api.model
+    def count(self, backend_id, function, model):
+        """ Count a job collapsed in a job waiting to run """
+        hour = datetime.utcnow().strftime('%Y-%m-%d %H:00:00')
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "UPDATE prestashop_job_collapse "
+                "SET collapsed = collapsed + 1 "
+                "WHERE backend_id = %s AND hour = %s "
+                "AND function = %s AND model = %s",
+                (backend_id, hour, function, model)
+            )
+            if not cr.rowcount:
+                cr.execute(
+                    "INSERT INTO prestashop_job_collapse "
+                    "(backend_id, hour, function, model, collapsed) "
+                    "VALUES (%s, %s, %s, %s, 1)",
+                    (backend_id, hour, function, model)
+                )
+        return True
+
+    @api.model
+    def total(self, backend_id, hours=24):
+        """ Number of jobs of a backend collapsed over the last hours """
+        since = (datetime.utcnow() - timedelta(hours=hours)).strftime(
+            DEFAULT_SERVER_DATETIME_FORMAT)
+        self.env.cr.execute(
+            "SELECT COALESCE(SUM(collapsed), 0) "
+            "FROM prestashop_job_collapse "
+            "WHERE backend_id = %s AND hour >= %s",
+            (backend_id, since)
+        )
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _scheduler_cleanup(self):
+        """ Remove the counters older than
+        ``prestashop_job_collapses_retention`` days (default: 7) """
+        days = int(config.get('prestashop_job_collapses_retention', 7))
+        since = (datetime.utcnow() - timedelta(days=days)).strftime(
+            DEFAULT_SERVER_DATETIME_FORMAT)
+        self.env.cr.execute(
+            "DELETE FROM prestashop_job_collapse WHERE hour < %s", (since,)
+        )
+        return True
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import base64
+import logging
+import marshal
+import pstats
+import random
+from cStringIO import StringIO
+
+from openerp import models, fields, api, SUPERUSER_ID
+
+from ..record_cache.common import cache_cursor
+
+_logger = logging.getLogger(__name__)
+
+# number of functions listed in the description of the profiles
+PROFILE_SUMMARY_SIZE = 40
+
+
+class PrestashopJobProfiling(models.Model):
+    """ Number of jobs still to profile per backend
+
+    The jobs profiled are selected with the *Profiling* settings of the
+    backends: a ratio of the jobs, or the next jobs, optionally only the
+    ones of a binding model. The count of the next jobs to profile is
+    kept here and decremented in its own transaction by the workers, so
+    concurrent jobs never profile more jobs than requested and the
+    backends are not written by the jobs.
+
+    The profile of a job is attached to it (``queue.job``), in the
+    format of :mod:`pstats`, with the slowest functions in the
+    description of the attachment.
+    """
+    _name = 'prestashop.job.profiling'
+    _description = 'PrestaShop Job Profiling'
+    _log_access = False
+
+    # not a Many2one: the rows are written in other transactions
+    # than the ones of the backends
+    backend_id = fields.Integer(required=True)
+    remaining = fields.Integer()
+
+    _sql_constraints = [
+        ('backend_uniq', 'unique(backend_id)',
+         'A backend can have only one profiling counter.'),
+    ]
+
+    @api.model
+    def remaining_jobs(self, backend_id):
+        self.env.cr.execute(
+            "SELECT remaining FROM prestashop_job_profiling "
+            "WHERE backend_id = %s", (backend_id,)
+        )
+        row = self.env.cr.fetchone()
+        return row[0] if row else 0
+
+    @api.model
+    def set_remaining_jobs(self, backend_id, remaining):
+        self.env.cr.execute(
+            "UPDATE prestashop_job_profiling SET remaining = %s "
+            "WHERE backend_id = %s", (remaining, backend_id)
+        )
+        if not self.env.cr.rowcount:
+            self.env.cr.execute(
+                "INSERT INTO prestashop_job_profiling "
+                "(backend_id, remaining) VALUES (%s, %s)",
+                (backend_id, remaining)
+            )
+
+    def _take(self, backend_id):
+        """ Count a job in the next jobs to profile, return False when
+        none is left """
+        taken = False
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "UPDATE prestashop_job_profiling "
+                "SET remaining = remaining - 1 "
+                "WHERE backend_id = %s AND remaining > 0 "
+                "RETURNING remaining",
+                (backend_id,)
+            )
+            taken = bool(cr.fetchone())
+        return taken
+
+    @api.model
+    def must_profile(self, backend, model_name):
+        """ Return True if a job of the backend on the binding model has
+        to be profiled """
+        profiled_model = backend.profile_model_id
+        if profiled_model and profiled_model.model != model_name:
+            return False
+        sampling = backend.profile_sampling
+        if sampling and random.random() < sampling:
+            return True
+        if self.remaining_jobs(backend.id) > 0:
+            return self._take(backend.id)
+        return False
+
+    @api.model
+    def save(self, profiler, backend_id, model_name, job_uuid=None):
+        """ Attach the profile of a job to the job
+
+        The attachment is created in its own transaction, so the profile
+        of a failed job is kept.
+
+        :param profiler: :class:`cProfile.Profile`, disabled
+        """
+        profiler.create_stats()
+        summary = StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats('cumulative').print_stats(PROFILE_SUMMARY_SIZE)
+        name = 'prestashop-%d-%s.prof' % (backend_id, job_uuid or 'no-job')
+        with cache_cursor(self.env) as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            job = env['queue.job'].search([('uuid', '=', job_uuid)],
+                                          limit=1) if job_uuid else None
+            env['ir.attachment'].create({
+                'name': name,
+                'datas_fname': name,
+                'datas': base64.b64encode(marshal.dumps(profiler.stats)),
+                'description': 'Profile of a job on %s\n\n%s' % (
+                    model_name, summary.getvalue()),
+                'res_model': 'queue.job' if job else False,
+                'res_id': job.id if job else False,
+            })
+        _logger.info('Profile of job %s saved in %s', job_uuid, name)
+        return True
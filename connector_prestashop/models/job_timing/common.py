@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+from datetime import datetime, timedelta
+
+from openerp import models, fields, api
+from openerp.tools import config, DEFAULT_SERVER_DATETIME_FORMAT
+
+from ...unit.job_timing import PHASES
+from ..record_cache.common import cache_cursor
+
+
+class PrestashopJobTiming(models.Model):
+    """ Time spent in the phases of the synchronizations of the records
+
+    When the *Job Timings* of a backend are enabled, its importers and
+    exporters write one row per synchronized record, in their own
+    transaction so the timings of the failed jobs are kept. The time of
+    the dependencies includes their whole synchronization, which has its
+    own row. The phases are averaged when the rows are grouped, so the
+    report per binding model shows where the time of a record goes.
+
+    The calls to PrestaShop sampled during a synchronization (see the
+    *Webservice Calls Sampling* of the backends) are counted in its row,
+    without the ones of its dependencies.
+    """
+    _name = 'prestashop.job.timing'
+    _description = 'PrestaShop Job Timings'
+    _log_access = False
+    _order = 'date desc, id desc'
+
+    # not a Many2one: the rows are written in other transactions
+    # than the ones of the backends
+    backend_id = fields.Integer(required=True, index=True)
+    date = fields.Datetime(required=True, index=True)
+    job_uuid = fields.Char(string='Job UUID', index=True)
+    model = fields.Char(string='Binding Model', required=True, index=True)
+    direction = fields.Selection(
+        selection=[('import', 'Import'), ('export', 'Export')],
+        required=True,
+    )
+    prestashop_id = fields.Char(string='PrestaShop ID')
+    binding_id = fields.Integer(string='Binding ID')
+    failed = fields.Boolean(help="The synchronization failed or has "
+                                 "been postponed.")
+    # one column per phase, see PHASES, in seconds
+    time_lock = fields.Float(string='Lock', digits=(16, 3),
+                             group_operator='avg')
+    time_fetch = fields.Float(string='Fetch', digits=(16, 3),
+                              group_operator='avg')
+    time_dependencies = fields.Float(string='Dependencies', digits=(16, 3),
+                                     group_operator='avg')
+    time_map = fields.Float(string='Mapping', digits=(16, 3),
+                            group_operator='avg')
+    time_validate = fields.Float(string='Validation', digits=(16, 3),
+                                 group_operator='avg')
+    time_write = fields.Float(string='Create/Write', digits=(16, 3),
+                              group_operator='avg')
+    time_bind = fields.Float(string='Binding', digits=(16, 3),
+                             group_operator='avg')
+    time_after = fields.Float(string='After Import/Export', digits=(16, 3),
+                              group_operator='avg')
+    time_total = fields.Float(string='Total', digits=(16, 3),
+                              group_operator='avg')
+    # estimated from the sampled calls
+    calls = fields.Float(string='Calls', digits=(16, 1))
+    bytes = fields.Float(string='Bytes Received', digits=(16, 0))
+
+    @api.model
+    def record(self, backend_id, model, direction, timer, failed=False,
+               prestashop_id=None, binding_id=None, job_uuid=None):
+        """ Write the durations of the synchronization of a record
+
+        :param timer: :class:`~..unit.job_timing.PhaseTimer` of the
+                      synchronization
+        :param failed: the synchronization raised an exception
+        """
+        columns = ['time_%s' % phase for phase in PHASES] + ['time_total']
+        values = [backend_id,
+                  datetime.utcnow().strftime(DEFAULT_SERVER_DATETIME_FORMAT),
+                  job_uuid or '', model, direction,
+                  str(prestashop_id) if prestashop_id else None,
+                  binding_id or None, failed]
+        values += [timer.durations[phase] for phase in PHASES]
+        values += [timer.total(), timer.calls, timer.bytes]
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "INSERT INTO prestashop_job_timing "
+                "(backend_id, date, job_uuid, model, direction, "
+                " prestashop_id, binding_id, failed, %s, calls, bytes) "
+                "VALUES (%s)" % (', '.join(columns),
+                                 ', '.join(['%s'] * len(values))),
+                values
+            )
+        return True
+
+    @api.model
+    def report(self, backend_id, hours=24):
+        """ Average durations (ms) of the phases per binding model over
+        the last hours
+
+        :return: ``{(model, direction): {phase: ms, 'total': ms,
+                 'count': synchronizations}}``
+        """
+        since = (datetime.utcnow() - timedelta(hours=hours)).strftime(
+            DEFAULT_SERVER_DATETIME_FORMAT)
+        columns = ['time_%s' % phase for phase in PHASES] + ['time_total']
+        self.env.cr.execute(
+            "SELECT model, direction, COUNT(*), %s "
+            "FROM prestashop_job_timing "
+            "WHERE backend_id = %%s AND date >= %%s "
+            "GROUP BY model, direction" %
+            ', '.join('AVG(%s)' % column for column in columns),
+            (backend_id, since)
+        )
+        report = {}
+        for row in self.env.cr.fetchall():
+            measures = dict(
+                (phase, round(value * 1000, 3))
+                for phase, value in zip(PHASES + ('total',), row[3:])
+            )
+            measures['count'] = row[2]
+            report[row[:2]] = measures
+        return report
+
+    @api.model
+    def _scheduler_cleanup(self):
+        """ Remove the timings older than
+        ``prestashop_job_timings_retention`` days (default: 7) """
+        days = int(config.get('prestashop_job_timings_retention', 7))
+        since = (datetime.utcnow() - timedelta(days=days)).strftime(
+            DEFAULT_SERVER_DATETIME_FORMAT)
+        self.env.cr.execute(
+            "DELETE FROM prestashop_job_timing WHERE date < %s", (since,)
+        )
+        return True
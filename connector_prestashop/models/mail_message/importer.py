@@ -2,6 +2,7 @@
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
 
 from openerp.addons.connector.unit.mapper import ImportMapper, mapping
+from ...unit.mapper import source_fields
 from ...unit.importer import PrestashopImporter, DelayedBatchImporter
 from ...backend import prestashop
 
@@ -14,14 +15,17 @@ class MailMessageMapper(ImportMapper):
         ('message', 'body'),
     ]
 
+    @source_fields()
     @mapping
     def backend_id(self, record):
         return {'backend_id': self.backend_record.id}
 
+    @source_fields()
     @mapping
     def type(self, record):
         return {'type': 'comment'}
 
+    @source_fields('id_order')
     @mapping
     def object_ref(self, record):
         binder = self.binder_for('prestashop.sale.order')
@@ -31,6 +35,7 @@ class MailMessageMapper(ImportMapper):
             'res_id': order.id,
         }
 
+    @source_fields('id_customer')
     @mapping
     def author_id(self, record):
         if record['id_customer'] != '0':
@@ -11,9 +11,11 @@ from ...unit.importer import import_batch, import_record
 from ...unit.auto_matching_importer import AutoMatchingImporter
 from ...unit.backend_adapter import GenericAdapter, api_handle_errors
 from ...unit.version_key import VersionKey
+from ...unit.cache import reference_cache
 from ...backend import prestashop
 
 from ..product_template.exporter import export_product_quantities
+from ..record_cache.common import cache_cursor
 from ..product_template.importer import import_inventory
 from ..res_partner.importer import import_customers_since
 from ..delivery_carrier.importer import import_carriers
@@ -55,6 +57,20 @@ class PrestashopBackend(models.Model):
         help="You have to put it in 'username' of the PrestaShop "
              "Webservice api path invite"
     )
+    webservice_json = fields.Boolean(
+        string='Read records in JSON',
+        help="Read the records with the JSON output format of the "
+             "webservice instead of XML, which is lighter to transfer "
+             "and to parse. Requires a version of PrestaShop supporting "
+             "the 'output_format' parameter.",
+    )
+    listed_records = fields.Boolean(
+        string='Read records in listings',
+        help="The batch imports of the customers, categories "
+             "and suppliers read the records in the listings and hand "
+             "them to the import jobs, instead of listing the ids and "
+             "reading each record in its job.",
+    )
     warehouse_id = fields.Many2one(
         comodel_name='stock.warehouse',
         string='Warehouse',
@@ -115,6 +131,226 @@ class PrestashopBackend(models.Model):
         required=True,
         string='Shipping Product',
     )
+    rate_limit = fields.Float(
+        string='Max Calls per Second',
+        help="Maximum number of calls per second to PrestaShop, shared "
+             "by all the workers. The rate is lowered automatically when "
+             "PrestaShop is slow or overloaded. 0 means no limit.",
+    )
+    max_concurrency = fields.Integer(
+        string='Max Concurrent Calls',
+        help="Maximum number of calls to PrestaShop running at the same "
+             "time, shared by all the workers. 0 means no limit.",
+    )
+    rate_limit_latency = fields.Float(
+        string='Target Latency',
+        default=2.0,
+        help="Duration in seconds above which a call is considered "
+             "slow, the rate is then lowered.",
+    )
+    call_stats_sampling = fields.Float(
+        string='Webservice Calls Sampling',
+        default=0.,
+        help="Ratio of the calls to PrestaShop recorded in the "
+             "statistics, between 0 (disabled) and 1 (every call).",
+    )
+    call_stats_p50 = fields.Integer(
+        string='Median Latency (ms)',
+        compute='_compute_call_stats',
+    )
+    call_stats_p95 = fields.Integer(
+        string='95th Percentile Latency (ms)',
+        compute='_compute_call_stats',
+    )
+    call_stats_calls_per_job = fields.Float(
+        string='Calls per Job',
+        compute='_compute_call_stats',
+        digits=(16, 1),
+        help="Counted in the job timings, which must be recorded.",
+    )
+    call_stats_bytes_per_job = fields.Integer(
+        string='Bytes per Job',
+        compute='_compute_call_stats',
+        help="Counted in the job timings, which must be recorded.",
+    )
+    job_timing = fields.Boolean(
+        string='Record Job Timings',
+        help="Record the time spent in each phase of the imports and "
+             "exports of the records.",
+    )
+    profile_sampling = fields.Float(
+        string='Jobs Profiling Sampling',
+        default=0.,
+        help="Ratio of the synchronization jobs profiled, between 0 "
+             "(disabled) and 1 (every job). The profiles are attached "
+             "to the jobs.",
+    )
+    profile_next_jobs = fields.Integer(
+        string='Profile Next Jobs',
+        compute='_compute_profile_next_jobs',
+        inverse='_inverse_profile_next_jobs',
+        help="Number of the next synchronization jobs to profile.",
+    )
+    profile_model_id = fields.Many2one(
+        comodel_name='ir.model',
+        string='Profiled Model',
+        domain=[('model', '=like', 'prestashop.%')],
+        help="Profile only the jobs of this binding model.",
+    )
+    batch_cursor_ids = fields.One2many(
+        comodel_name='prestashop.batch.cursor',
+        inverse_name='backend_id',
+        string='Batch Imports in Progress',
+        readonly=True,
+        help="Batch imports interrupted or running, the next run with "
+             "the same filters resumes after the last page read.",
+    )
+    jobs_collapsed = fields.Integer(
+        string='Jobs Collapsed (last 24 hours)',
+        compute='_compute_jobs_collapsed',
+        help="Imports and exports of records not delayed because the "
+             "same job was waiting to run.",
+    )
+    missing_record_saved_calls = fields.Integer(
+        string='Calls Saved on Missing Records',
+        compute='_compute_missing_record_saved_calls',
+        help="Number of calls to PrestaShop which have not been done "
+             "because the records were known to be missing.",
+    )
+    circuit_open_until = fields.Datetime(
+        string='Calls Suspended Until',
+        compute='_compute_circuit_open_until',
+        help="PrestaShop has been found unreachable, the calls are "
+             "suspended and the jobs postponed until this date.",
+    )
+    cache_generation = fields.Integer(
+        string='Cache Generation',
+        readonly=True,
+        copy=False,
+        help="Incremented when the cache of the reference data is "
+             "flushed, the cached data of the previous generations "
+             "are not used anymore by the workers.",
+    )
+
+    @api.multi
+    def _compute_missing_record_saved_calls(self):
+        self.env['prestashop.missing.record'].flush()
+        for backend in self:
+            saved_calls = 0
+            # the counters flushed are committed after the snapshot of
+            # the current transaction
+            with cache_cursor(self.env) as cr:
+                cr.execute(
+                    "SELECT COALESCE(SUM(saved_calls), 0) "
+                    "FROM prestashop_missing_record WHERE backend_id = %s",
+                    (backend.id,)
+                )
+                saved_calls = cr.fetchone()[0]
+            backend.missing_record_saved_calls = saved_calls
+
+    @api.multi
+    def _compute_circuit_open_until(self):
+        for backend in self:
+            self.env.cr.execute(
+                "SELECT open_until FROM prestashop_circuit_breaker "
+                "WHERE backend_id = %s "
+                "AND open_until > now() at time zone 'UTC'",
+                (backend.id,)
+            )
+            row = self.env.cr.fetchone()
+            backend.circuit_open_until = row and row[0]
+
+    @api.multi
+    def _compute_profile_next_jobs(self):
+        profiling = self.env['prestashop.job.profiling']
+        for backend in self:
+            backend.profile_next_jobs = profiling.remaining_jobs(backend.id)
+
+    @api.multi
+    def _inverse_profile_next_jobs(self):
+        profiling = self.env['prestashop.job.profiling']
+        for backend in self:
+            profiling.set_remaining_jobs(backend.id,
+                                         max(backend.profile_next_jobs, 0))
+
+    @api.multi
+    def _compute_jobs_collapsed(self):
+        collapse_model = self.env['prestashop.job.collapse']
+        for backend in self:
+            backend.jobs_collapsed = collapse_model.total(backend.id)
+
+    @api.multi
+    def _compute_call_stats(self):
+        # the pending statistics are written by ``summary``
+        for backend in self:
+            summary = self.env['prestashop.call.stat'].summary(backend.id)
+            backend.call_stats_p50 = summary['p50']
+            backend.call_stats_p95 = summary['p95']
+            backend.call_stats_calls_per_job = summary['calls_per_job']
+            backend.call_stats_bytes_per_job = int(summary['bytes_per_job'])
+
+    @api.constrains('profile_sampling')
+    def _check_profile_sampling(self):
+        for backend in self:
+            if not 0 <= backend.profile_sampling <= 1:
+                raise exceptions.ValidationError(
+                    _('The sampling of the profiled jobs must be '
+                      'between 0 and 1.')
+                )
+
+    @api.constrains('call_stats_sampling')
+    def _check_call_stats_sampling(self):
+        for backend in self:
+            if not 0 <= backend.call_stats_sampling <= 1:
+                raise exceptions.ValidationError(
+                    _('The sampling of the webservice calls must be '
+                      'between 0 and 1.')
+                )
+
+    @api.multi
+    def action_view_call_stats(self):
+        self.ensure_one()
+        self.env['prestashop.call.stat'].flush()
+        action = self.env.ref(
+            'connector_prestashop.action_prestashop_call_stat'
+        ).read()[0]
+        action['domain'] = [('backend_id', '=', self.id)]
+        return action
+
+    @api.multi
+    def action_view_job_timings(self):
+        self.ensure_one()
+        action = self.env.ref(
+            'connector_prestashop.action_prestashop_job_timing'
+        ).read()[0]
+        action['domain'] = [('backend_id', '=', self.id)]
+        return action
+
+    @api.multi
+    def action_view_job_profiles(self):
+        self.ensure_one()
+        action = self.env.ref('base.action_attachment').read()[0]
+        action['domain'] = [('res_model', '=', 'queue.job'),
+                            ('name', '=like', 'prestashop-%d-%%' % self.id)]
+        action['context'] = {}
+        return action
+
+    @api.multi
+    def action_view_job_collapses(self):
+        self.ensure_one()
+        action = self.env.ref(
+            'connector_prestashop.action_prestashop_job_collapse'
+        ).read()[0]
+        action['domain'] = [('backend_id', '=', self.id)]
+        return action
+
+    @api.multi
+    def button_reset_circuit(self):
+        """ Resume the calls to PrestaShop suspended by the circuit
+        breaker """
+        for backend in self:
+            self.env['prestashop.circuit.breaker'].reset(backend.id)
+        return True
 
     @api.model
     def _default_pricelist_id(self):
@@ -172,6 +408,17 @@ class PrestashopBackend(models.Model):
         self._check_connection()
         raise exceptions.UserError(_('Connection successful'))
 
+    @api.multi
+    def button_flush_cache(self):
+        """ Flush the cache of the reference data (languages,
+        countries, taxes, ...) and the records read from PrestaShop """
+        for backend in self:
+            backend.cache_generation += 1
+            reference_cache.clear(backend_id=backend.id)
+            self.env['prestashop.record.cache'].clear(backend_id=backend.id)
+            self.env['prestashop.missing.record'].clear(backend.id)
+        return True
+
     @api.multi
     def import_customers_since(self):
         session = ConnectorSession.from_env(self.env)
@@ -328,3 +575,4 @@ class NoModelAdapter(GenericAdapter):
 class ShopGroupAdapter(GenericAdapter):
     _model_name = 'prestashop.shop.group'
     _prestashop_model = 'shop_groups'
+    _cache_ttl = 3600
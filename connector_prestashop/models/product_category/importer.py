@@ -71,6 +71,7 @@ class ProductCategoryImporter(TranslatableRecordImporter):
     _model_name = [
         'prestashop.product.category',
     ]
+    _record_cache = True
 
     _translatable_fields = {
         'prestashop.product.category': [
@@ -115,3 +116,4 @@ class ProductCategoryImporter(TranslatableRecordImporter):
 @prestashop
 class ProductCategoryBatchImporter(DelayedBatchImporter):
     _model_name = 'prestashop.product.category'
+    _listed_records = True
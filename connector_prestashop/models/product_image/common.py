@@ -2,14 +2,23 @@
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
 
 import base64
+import hashlib
+import logging
+import os
+import tempfile
 
-from openerp import models, fields
+from openerp import models, fields, api
+from openerp.tools import config
 
 from ...unit.backend_adapter import (
     PrestaShopCRUDAdapter,
     PrestaShopWebServiceImage,
+    client_pool,
 )
 from ...backend import prestashop
+from ..record_cache.common import cache_cursor
+
+_logger = logging.getLogger(__name__)
 
 
 class ProductImage(models.Model):
@@ -36,6 +45,65 @@ class PrestashopProductImage(models.Model):
     )
 
 
+class PrestashopImageFile(models.Model):
+    """ Files written in the filestore by the downloads of the images
+
+    The images are written in the filestore before their attachment is
+    created (see :meth:`ProductImageAdapter.download`): when the
+    transaction of the job is rolled back, no attachment refers to the
+    file anymore. The files are listed here, in their own transaction,
+    and the ones without attachment ``prestashop_image_files_gc_delay``
+    hours (default: 24) after their last download are removed.
+    """
+    _name = 'prestashop.image.file'
+    _description = 'PrestaShop Downloaded Image File'
+    _log_access = False
+
+    store_fname = fields.Char(string='Stored Filename', required=True)
+    date = fields.Datetime(required=True, index=True)
+
+    @api.model
+    def mark(self, store_fname):
+        """ List a file before it is written in the filestore """
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "INSERT INTO prestashop_image_file (store_fname, date) "
+                "VALUES (%s, now() at time zone 'UTC')",
+                (store_fname,)
+            )
+        return True
+
+    @api.model
+    def _gc_delay(self):
+        return int(config.get('prestashop_image_files_gc_delay', 24))
+
+    @api.model
+    def _scheduler_cleanup(self):
+        """ Remove the files written by the jobs rolled back """
+        attachment_model = self.env['ir.attachment']
+        cr = self.env.cr
+        cr.execute(
+            "DELETE FROM prestashop_image_file "
+            "WHERE date <= now() at time zone 'UTC' - %s::interval "
+            "RETURNING store_fname",
+            ('%d hours' % self._gc_delay(),)
+        )
+        for fname in set(row[0] for row in cr.fetchall()):
+            # still referenced, or written again by a recent download
+            cr.execute("SELECT 1 FROM ir_attachment WHERE store_fname = %s "
+                       "UNION ALL "
+                       "SELECT 1 FROM prestashop_image_file "
+                       "WHERE store_fname = %s LIMIT 1", (fname, fname))
+            if cr.fetchone():
+                continue
+            full_path = attachment_model._full_path(fname)
+            if os.path.exists(full_path):
+                _logger.info('removing the image file %s without '
+                             'attachment', fname)
+                os.unlink(full_path)
+        return True
+
+
 @prestashop
 class ProductImageAdapter(PrestaShopCRUDAdapter):
     _model_name = 'prestashop.product.image'
@@ -44,39 +112,132 @@ class ProductImageAdapter(PrestaShopCRUDAdapter):
     _export_node_name = '/images/products'
     _export_node_name_res = 'image'
 
+    def _get_image_client(self):
+        return client_pool.get(
+            self.prestashop.api_url,
+            self.prestashop.webservice_key,
+            client_class=PrestaShopWebServiceImage,
+        )
+
     def read(self, product_tmpl_id, image_id, options=None):
-        api = PrestaShopWebServiceImage(self.prestashop.api_url,
-                                        self.prestashop.webservice_key)
-        return api.get_image(
+        api = self._get_image_client()
+        return self._call_idempotent(
+            api.get_image,
             self._prestashop_image_model,
             product_tmpl_id,
             image_id,
             options=options
         )
 
+    def download(self, product_tmpl_id, image_id):
+        """ Download an image in a new attachment
+
+        The image is written in the filestore while it is received and
+        its checksum is computed on the fly, so its content is never
+        held in memory whatever its size is.
+
+        :return: the metadata of the image (``type``, ``size``,
+                 ``checksum``, ``store_fname``, ``attachment_id``, ...)
+        :rtype: dict
+        """
+        api = self._get_image_client()
+        response = self._call_idempotent(
+            api.get_image_stream,
+            self._prestashop_image_model,
+            product_tmpl_id,
+            image_id,
+        )
+        try:
+            record = {
+                'type': response.headers['content-type'],
+                'id_product': product_tmpl_id,
+                'id_image': str(image_id),
+            }
+            record.update(self._store_image(response, record))
+        finally:
+            response.close()
+        record['full_public_url'] = api.get_image_public_url(record)
+        return record
+
+    def _store_image(self, response, record):
+        """ Create an attachment with the content of the response """
+        attachment_model = self.env['ir.attachment']
+        values = {
+            'name': '%s_%s' % (record['id_product'], record['id_image']),
+            'type': 'binary',
+            'mimetype': record['type'],
+            'index_content': 'image',
+        }
+        if attachment_model._storage() != 'file':
+            # the content is stored in the database, it has to be read
+            content = response.content
+            values['datas'] = base64.b64encode(content)
+            attachment = attachment_model.create(values)
+            return {'size': len(content),
+                    'checksum': hashlib.sha1(content).hexdigest(),
+                    'store_fname': False,
+                    'attachment_id': attachment.id}
+        filestore = attachment_model._filestore()
+        if not os.path.isdir(filestore):
+            os.makedirs(filestore)
+        sha = hashlib.sha1()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=filestore, prefix='.prestashop')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    sha.update(chunk)
+                    size += len(chunk)
+                    tmp_file.write(chunk)
+            checksum = sha.hexdigest()
+            fname, full_path = attachment_model._get_path(None, checksum)
+            # removed if the transaction is rolled back
+            self.env['prestashop.image.file'].mark(fname)
+            if os.path.exists(full_path):
+                # same content already in the filestore
+                os.unlink(tmp_path)
+            else:
+                os.rename(tmp_path, full_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        attachment = attachment_model.create(values)
+        # the file is already written, ``create`` would compute these
+        # fields from ``datas`` only
+        self.env.cr.execute(
+            "UPDATE ir_attachment "
+            "SET store_fname = %s, file_size = %s, checksum = %s "
+            "WHERE id = %s",
+            (fname, size, checksum, attachment.id)
+        )
+        attachment.invalidate_cache()
+        return {'size': size,
+                'checksum': checksum,
+                'store_fname': fname,
+                'attachment_id': attachment.id}
+
     def create(self, attributes=None):
-        api = PrestaShopWebServiceImage(
-            self.prestashop.api_url, self.prestashop.webservice_key)
+        api = self._get_image_client()
         # TODO: odoo logic in the adapter? :-(
         url = '{}/{}'.format(self._prestashop_model, attributes['id_product'])
-        return api.add(url, files=[(
+        return self._call(api.add, url, files=[(
             'image',
             attributes['filename'].encode('utf-8'),
             base64.b64decode(attributes['content'])
         )])
 
     def write(self, id, attributes=None):
-        api = PrestaShopWebServiceImage(
-            self.prestashop.api_url, self.prestashop.webservice_key)
+        api = self._get_image_client()
         # TODO: odoo logic in the adapter? :-(
         url = '{}/{}'.format(self._prestashop_model, attributes['id_product'])
         url_del = '{}/{}/{}/{}'.format(
             api._api_url, self._prestashop_model, attributes['id_product'], id)
         try:
-            api._execute(url_del, 'DELETE')
+            self._call(api._execute, url_del, 'DELETE')
         except:
             pass
-        return api.add(url, files=[(
+        return self._call(api.add, url, files=[(
             'image',
             attributes['filename'].encode('utf-8'),
             base64.b64decode(attributes['content'])
@@ -84,6 +245,5 @@ class ProductImageAdapter(PrestaShopCRUDAdapter):
 
     def delete(self, resource, id):
         """ Delete a record on the external system """
-        api = PrestaShopWebServiceImage(
-            self.prestashop.api_url, self.prestashop.webservice_key)
-        return api.delete(resource, resource_ids=id)
+        api = self._get_image_client()
+        return self._call(api.delete, resource, resource_ids=id)
@@ -7,6 +7,7 @@ from openerp.addons.connector.unit.mapper import (mapping,
                                                   ImportMapper)
 
 from ...backend import prestashop
+from ...unit.job_identity import backend_argument, related_backend
 from ...unit.importer import PrestashopImporter
 
 import mimetypes
@@ -54,8 +55,9 @@ class ProductImageMapper(ImportMapper):
 
     @mapping
     def storage(self, record):
-        return {'storage': 'url'}
-        # return {'storage': 'db'}
+        # the image has been downloaded in an attachment
+        return {'storage': 'filestore',
+                'attachment_id': record['attachment_id']}
 
     @mapping
     def owner_model(self, record):
@@ -69,8 +71,16 @@ class ProductImageImporter(PrestashopImporter):
     ]
 
     def _get_prestashop_data(self):
-        """ Return the raw PrestaShop data for ``self.prestashop_id`` """
-        return self.backend_adapter.read(self.template_id, self.image_id)
+        """ Return the metadata of the image ``self.image_id``, its
+        content is downloaded in an attachment """
+        return self.backend_adapter.download(self.template_id, self.image_id)
+
+    def _update(self, binding, data):
+        attachment = binding.attachment_id
+        super(ProductImageImporter, self)._update(binding, data)
+        if attachment and attachment != binding.attachment_id:
+            # replaced by the attachment of the new download
+            attachment.unlink()
 
     def run(self, template_id, image_id, **kwargs):
         self.template_id = template_id
@@ -99,6 +109,7 @@ class ProductImageImporter(PrestashopImporter):
                 self.backend_record.add_checkpoint(message=msg)
 
 
+@related_backend(backend_argument)
 @job(default_channel='root.prestashop')
 def import_product_image(session, model_name, backend_id, product_tmpl_id,
                          image_id, **kwargs):
@@ -111,6 +122,7 @@ def import_product_image(session, model_name, backend_id, product_tmpl_id,
         return importer.run(product_tmpl_id, image_id)
 
 
+@related_backend(backend_argument)
 @job(default_channel='root.prestashop')
 def set_product_image_variant(
         session, model_name, backend_id, combination_ids, **kwargs):
@@ -39,8 +39,14 @@ class ProductCombinationImporter(PrestashopImporter):
             option_values = [option_values]
         backend_adapter = self.unit_for(
             BackendAdapter, 'prestashop.product.combination.option.value')
+        option_value_records = backend_adapter.read_many(
+            [option_value['id'] for option_value in option_values]
+        )
         for option_value in option_values:
-            option_value = backend_adapter.read(option_value['id'])
+            option_value_id = option_value['id']
+            option_value = option_value_records.get(str(option_value_id))
+            if option_value is None:
+                option_value = backend_adapter.read(option_value_id)
             self._import_dependency(
                 option_value['id_attribute_group'],
                 'prestashop.product.combination.option')
@@ -84,7 +90,7 @@ class ProductCombinationImporter(PrestashopImporter):
                 pass
 
     def import_supplierinfo(self, binding):
-        ps_id = self._get_prestashop_data()['id']
+        ps_id = self.prestashop_record['id']
         filters = {
             # 'filter[id_product]': ps_id,
             'filter[id_product_attribute]': ps_id
@@ -7,6 +7,7 @@ from ...unit.backend_adapter import (
     PrestaShopCRUDAdapter,
     PrestaShopWebServiceImage,
     GenericAdapter,
+    client_pool,
 )
 from ...backend import prestashop
 
@@ -65,9 +66,13 @@ class SupplierImageAdapter(PrestaShopCRUDAdapter):
     _prestashop_image_model = 'suppliers'
 
     def read(self, supplier_id, options=None):
-        client = PrestaShopWebServiceImage(self.prestashop.api_url,
-                                           self.prestashop.webservice_key)
-        res = client.get_image(
+        client = client_pool.get(
+            self.prestashop.api_url,
+            self.prestashop.webservice_key,
+            client_class=PrestaShopWebServiceImage,
+        )
+        res = self._call_idempotent(
+            client.get_image,
             self._prestashop_image_model,
             supplier_id,
             options=options
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
 
-from openerp import fields
 from openerp.addons.connector.exception import FailedJobError
 from openerp.addons.connector.queue.job import job
 from openerp.addons.connector.unit.mapper import ImportMapper, mapping
@@ -13,6 +12,7 @@ from ...unit.importer import (
     DelayedBatchImporter,
 )
 from ...backend import prestashop
+from ...unit.job_identity import backend_first_argument, related_backend
 
 import logging
 _logger = logging.getLogger(__name__)
@@ -63,6 +63,7 @@ class SupplierMapper(ImportMapper):
 class SupplierImporter(PrestashopImporter):
     """ Import one simple record """
     _model_name = 'prestashop.supplier'
+    _record_cache = True
 
     def _create(self, record):
         try:
@@ -87,6 +88,7 @@ class SupplierImporter(PrestashopImporter):
 @prestashop
 class SupplierBatchImporter(DelayedBatchImporter):
     _model_name = 'prestashop.supplier'
+    _listed_records = True
 
 
 @prestashop
@@ -161,23 +163,29 @@ class SupplierInfoBatchImporter(DelayedBatchImporter):
     _model_name = 'prestashop.product.supplierinfo'
 
 
+@related_backend(backend_first_argument)
 @job(default_channel='root.prestashop')
 def import_suppliers(session, backend_id, since_date, **kwargs):
     filters = None
     if since_date:
         filters = {'date': '1', 'filter[date_upd]': '>[%s]' % (since_date)}
-    now_fmt = fields.Datetime.now()
+    now_fmt = session.env['prestashop.batch.cursor'].watermark(
+        backend_id,
+        ['prestashop.supplier', 'prestashop.product.supplierinfo'],
+    )
     result = import_batch(
         session,
         'prestashop.supplier',
         backend_id,
         filters,
+        resumable=True,
         **kwargs
     ) or ''
     result += import_batch(
         session,
         'prestashop.product.supplierinfo',
         backend_id,
+        resumable=True,
         **kwargs
     ) or ''
     session.env['prestashop.backend'].browse(backend_id).write({
@@ -2,20 +2,27 @@
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
 
 from openerp import api, fields, models
+from openerp.tools import config
+from openerp.addons.connector.exception import (
+    FailedJobError,
+    NetworkRetryableError,
+    RetryableJobError,
+)
 from openerp.addons.decimal_precision import decimal_precision as dp
 
-from ...unit.backend_adapter import GenericAdapter
+from ...unit.backend_adapter import (
+    GenericAdapter,
+    PrestaShopLocation,
+    client_pool,
+    is_transient_error,
+)
 from ...backend import prestashop
 
+from multiprocessing.pool import ThreadPool
 import logging
 
 _logger = logging.getLogger(__name__)
 
-try:
-    from prestapyt import PrestaShopWebServiceDict
-except:
-    _logger.debug('Cannot import from `prestapyt`')
-
 
 class ProductTemplate(models.Model):
     _inherit = 'product.template'
@@ -133,34 +140,86 @@ class ProductInventoryAdapter(GenericAdapter):
     _export_node_name = 'stock_available'
 
     def get(self, options=None):
-        return self.client.get(self._prestashop_model, options=options)
+        return self._call_idempotent(self.client.get, self._prestashop_model,
+                                     options=options)
 
-    def export_quantity(self, filters, quantity):
-        self.export_quantity_url(
-            filters,
-            quantity,
-        )
+    # maximum number of shops to which a quantity is exported at the
+    # same time
+    _export_quantity_workers = int(
+        config.get('prestashop_export_quantity_workers', 4)
+    )
 
+    def _shop_clients(self):
+        """ Return the clients of the main location and of the shops
+        having their own URL, keyed by URL """
+        clients = [(self.prestashop.api_url, self.client)]
         shops = self.env['prestashop.shop'].search([
             ('backend_id', '=', self.backend_record.id),
             ('default_url', '!=', False),
         ])
+        key = self.backend_record.webservice_key
         for shop in shops:
-            url = '%s/api' % shop.default_url
-            key = self.backend_record.webservice_key
-            client = PrestaShopWebServiceDict(url, key)
-            self.export_quantity_url(filters, quantity, client=client)
+            location = PrestaShopLocation(shop.default_url.encode(), key)
+            clients.append((location.api_url,
+                            client_pool.get(location.api_url, key)))
+        return clients
+
+    def export_quantity(self, filters, quantity):
+        """ Export the quantity to the main location and to each shop
+
+        The shops are updated concurrently. A shop failing does not
+        stop the export to the other ones, the failures are raised
+        together at the end.
+        """
+        clients = self._shop_clients()
+        if len(clients) == 1:
+            self.export_quantity_url(filters, quantity)
+            return
+        # the threads only call PrestaShop through :meth:`_call`, which
+        # uses the settings of the backend copied when the adapter is
+        # created, never the records of the job
+
+        def export(url_client):
+            url, client = url_client
+            try:
+                self.export_quantity_url(filters, quantity, client=client)
+            except Exception as err:
+                _logger.warning('quantity export to %s failed: %s',
+                                url, err)
+                return url, err
+            return url, None
+
+        pool = ThreadPool(min(len(clients), self._export_quantity_workers))
+        try:
+            results = pool.map(export, clients)
+        finally:
+            pool.close()
+            pool.join()
+        errors = [(url, err) for url, err in results if err is not None]
+        if not errors:
+            return
+        message = 'Export of the quantity failed on: %s' % (
+            ', '.join('%s (%s)' % (url, err) for url, err in errors)
+        )
+        if all(is_transient_error(err) or
+               isinstance(err, RetryableJobError) for __, err in errors):
+            # the job is retried, exporting again to the other shops
+            # does no harm
+            raise NetworkRetryableError(message)
+        raise FailedJobError(message)
 
     def export_quantity_url(self, filters, quantity, client=None):
         if client is None:
             client = self.client
-        response = client.search(self._prestashop_model, filters)
+        response = self._call_idempotent(client.search,
+                                         self._prestashop_model, filters)
         for stock_id in response:
-            res = client.get(self._prestashop_model, stock_id)
+            res = self._call_idempotent(client.get, self._prestashop_model,
+                                        stock_id)
             first_key = res.keys()[0]
             stock = res[first_key]
             stock['quantity'] = int(quantity)
-            client.edit(self._prestashop_model, {
+            self._call(client.edit, self._prestashop_model, {
                 self._export_node_name: stock
             })
 
@@ -172,7 +231,8 @@ class PrestashopProductTags(GenericAdapter):
     _export_node_name = 'tag'
 
     def search(self, filters=None):
-        res = self.client.get(self._prestashop_model, options=filters)
+        res = self._call_idempotent(self.client.get, self._prestashop_model,
+                                    options=filters)
         tags = res[self._prestashop_model]
         if not tags:
             return []
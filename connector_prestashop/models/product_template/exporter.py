@@ -6,6 +6,14 @@ from openerp.addons.connector.queue.job import job
 from openerp.addons.connector.unit.synchronizer import Exporter
 
 from ...unit.backend_adapter import GenericAdapter
+from ...unit.job_identity import (
+    backend_first_argument,
+    binding_backend,
+    deduplicate,
+    export_identity,
+    related_backend,
+)
+from ...unit.job_profiler import job_profiler
 from ...backend import prestashop
 
 
@@ -29,6 +37,8 @@ class ProductInventoryExporter(Exporter):
         adapter.export_quantity(filter, int(template.quantity))
 
 
+@related_backend(binding_backend)
+@deduplicate(export_identity, transaction_only=True)
 @job(default_channel='root.prestashop')
 def export_inventory(session, model_name, record_id, fields=None, **kwargs):
     """ Export the inventory configuration and quantity of a product. """
@@ -36,9 +46,11 @@ def export_inventory(session, model_name, record_id, fields=None, **kwargs):
     backend = binding.backend_id
     env = backend.get_environment(model_name, session=session)
     inventory_exporter = env.get_connector_unit(ProductInventoryExporter)
-    return inventory_exporter.run(record_id, fields, **kwargs)
+    with job_profiler(backend, model_name):
+        return inventory_exporter.run(record_id, fields, **kwargs)
 
 
+@related_backend(backend_first_argument)
 @job(default_channel='root.prestashop')
 def export_product_quantities(session, ids):
     for model in ['template', 'combination']:
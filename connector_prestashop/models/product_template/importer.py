@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
 
-from openerp import _, models, fields
+from openerp import _, models
 from openerp.addons.connector.queue.job import job
 from openerp.addons.connector.unit.mapper import (
     mapping,
@@ -11,7 +11,6 @@ from openerp.addons.connector.unit.mapper import (
 
 from ...unit.importer import (
     DelayedBatchImporter,
-    import_record,
     import_batch,
     PrestashopImporter,
     PrestashopBaseImporter,
@@ -20,6 +19,7 @@ from ...unit.importer import (
 from openerp.addons.connector.unit.mapper import backend_to_m2o
 from ...unit.backend_adapter import GenericAdapter
 from ...backend import prestashop
+from ...unit.job_identity import backend_first_argument, related_backend
 from ..product_image.importer import (
     import_product_image,
     set_product_image_variant,
@@ -326,30 +326,10 @@ class ImportInventory(models.TransientModel):
 class ProductInventoryBatchImporter(DelayedBatchImporter):
     _model_name = ['_import_stock_available']
 
-    def run(self, filters=None, **kwargs):
-        if filters is None:
-            filters = {}
-        filters['display'] = '[id,id_product,id_product_attribute]'
-        _super = super(ProductInventoryBatchImporter, self)
-        return _super.run(filters, **kwargs)
-
-    def _run_page(self, filters, **kwargs):
-        records = self.backend_adapter.get(filters)
-        for record in records['stock_availables']['stock_available']:
-            self._import_record(record['id'], record=record, **kwargs)
-        return records['stock_availables']['stock_available']
-
-    def _import_record(self, record_id, record=None, **kwargs):
-        """ Delay the import of the records"""
-        assert record
-        import_record.delay(
-            self.session,
-            '_import_stock_available',
-            self.backend_record.id,
-            record_id,
-            record=record,
-            **kwargs
-        )
+    def _listing_display(self):
+        # the importer needs the records of the listing, it does not
+        # read the stocks again
+        return '[id,id_product,id_product_attribute]'
 
 
 @prestashop
@@ -397,9 +377,8 @@ class ProductInventoryImporter(PrestashopImporter):
 
     def run(self, prestashop_id, record=None, **kwargs):
         assert record
-        self.prestashop_record = record
         return super(ProductInventoryImporter, self).run(
-            prestashop_id, **kwargs
+            prestashop_id, record=record, **kwargs
         )
 
     def _import(self, binding, **kwargs):
@@ -414,17 +393,20 @@ class ProductInventoryImporter(PrestashopImporter):
 
         location = (self.backend_record.stock_location_id or
                     self.backend_record.warehouse_id.lot_stock_id)
-        for product in products:
-            vals = {
-                'location_id': location.id,
-                'product_id': product.id,
-                'new_quantity': qty,
-            }
-            template_qty = self.env['stock.change.product.qty'].create(vals)
-            template_qty.with_context(
-                active_id=product.id,
-                connector_no_export=True,
-            ).change_product_qty()
+        with self.timer.phase('write'):
+            for product in products:
+                vals = {
+                    'location_id': location.id,
+                    'product_id': product.id,
+                    'new_quantity': qty,
+                }
+                template_qty = self.env['stock.change.product.qty'].create(
+                    vals
+                )
+                template_qty.with_context(
+                    active_id=product.id,
+                    connector_no_export=True,
+                ).change_product_qty()
 
 
 @prestashop
@@ -433,6 +415,7 @@ class ProductTemplateImporter(TranslatableRecordImporter):
     _model_name = [
         'prestashop.product.template',
     ]
+    _record_cache = True
 
     _base_mapper = TemplateMapper
 
@@ -527,7 +510,7 @@ class ProductTemplateImporter(TranslatableRecordImporter):
         )
 
     def import_combinations(self):
-        prestashop_record = self._get_prestashop_data()
+        prestashop_record = self.prestashop_record
         associations = prestashop_record.get('associations', {})
 
         ps_key = self.backend_record.get_version_ps_key('combinations')
@@ -561,7 +544,7 @@ class ProductTemplateImporter(TranslatableRecordImporter):
         )
 
     def import_images(self, binding):
-        prestashop_record = self._get_prestashop_data()
+        prestashop_record = self.prestashop_record
         associations = prestashop_record.get('associations', {})
         images = associations.get('images', {}).get(
             self.backend_record.get_version_ps_key('image'), {})
@@ -572,7 +555,7 @@ class ProductTemplateImporter(TranslatableRecordImporter):
                 self._delay_import_product_image(prestashop_record, image)
 
     def import_supplierinfo(self, binding):
-        ps_id = self._get_prestashop_data()['id']
+        ps_id = self.prestashop_record['id']
         filters = {
             'filter[id_product]': ps_id,
             'filter[id_product_attribute]': 0
@@ -631,6 +614,7 @@ class ProductTemplateImporter(TranslatableRecordImporter):
                                     'prestashop.product.category')
 
 
+@related_backend(backend_first_argument)
 @job(default_channel='root.prestashop')
 def import_inventory(session, backend_id):
     backend = session.env['prestashop.backend'].browse(backend_id)
@@ -639,19 +623,24 @@ def import_inventory(session, backend_id):
     return inventory_importer.run()
 
 
+@related_backend(backend_first_argument)
 @job(default_channel='root.prestashop')
 def import_products(
         session, backend_id, since_date=None, **kwargs):
     filters = None
     if since_date:
         filters = {'date': '1', 'filter[date_upd]': '>[%s]' % (since_date)}
-    now_fmt = fields.Datetime.now()
+    now_fmt = session.env['prestashop.batch.cursor'].watermark(
+        backend_id,
+        ['prestashop.product.category', 'prestashop.product.template'],
+    )
     result = import_batch(
         session,
         'prestashop.product.category',
         backend_id,
         filters,
         priority=15,
+        resumable=True,
         **kwargs
     ) or ''
     result += import_batch(
@@ -660,6 +649,7 @@ def import_products(
         backend_id,
         filters,
         priority=15,
+        resumable=True,
         **kwargs
     ) or ''
     session.env['prestashop.backend'].browse(backend_id).write({
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+from openerp import models, fields
+
+
+class QueueJob(models.Model):
+    _inherit = 'queue.job'
+
+    # see unit.job_identity.deduplicate
+    prestashop_identity_key = fields.Char(
+        string='PrestaShop Identity Key',
+        index=True,
+        readonly=True,
+        help="Function, backend, binding model and record of the job: "
+             "the same job is not delayed again while this one has not "
+             "started.",
+    )
+    # see unit.job_identity.deduplicate
+    prestashop_collapsed = fields.Boolean(
+        string='PrestaShop Jobs Collapsed',
+        default=False,
+        readonly=True,
+        help="Other jobs with the same identity have been collapsed in "
+             "this one.",
+    )
+    # see unit.job_identity.related_backend
+    prestashop_backend_id = fields.Integer(
+        string='PrestaShop Backend ID',
+        index=True,
+        readonly=True,
+    )
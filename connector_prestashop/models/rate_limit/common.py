@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import logging
+import time
+from collections import namedtuple
+from contextlib import closing, contextmanager
+
+import psycopg2
+from requests.exceptions import RequestException
+
+from openerp import models, fields, api
+from openerp.tools import config
+from openerp.addons.connector.exception import NetworkRetryableError
+
+_logger = logging.getLogger(__name__)
+try:
+    from prestapyt import PrestaShopWebServiceError
+except:
+    _logger.debug('Cannot import from `prestapyt`')
+
+# namespace of the advisory locks used as concurrency slots
+SLOT_LOCK_NAMESPACE = 0x5053 << 48
+# responses meaning that PrestaShop is overloaded
+THROTTLED_STATUS = (429, 503)
+
+# settings of a backend used by the rate limiter, copied from the backend
+# so the calls do not read it, they can be made from threads
+RateLimits = namedtuple(
+    'RateLimits',
+    'backend_id rate_limit max_concurrency rate_limit_latency'
+)
+
+
+class PrestashopRateLimit(models.Model):
+    """ Rate limiter of the calls to PrestaShop, shared by the workers
+
+    Each backend has a token bucket stored in this table: a call takes a
+    token, the tokens are refilled at ``rate`` per second up to the
+    maximum rate of the backend. When no token is left, the caller waits
+    until its token is available. The number of concurrent calls is
+    limited with PostgreSQL advisory locks used as slots, which are
+    released at the end of the transaction or if the worker dies.
+
+    The rate adapts to the health of PrestaShop: it is halved when
+    PrestaShop answers 429 or 503 or does not answer, reduced when the
+    calls are slower than the target latency and increased step by step
+    up to the maximum rate otherwise.
+    """
+    _name = 'prestashop.rate.limit'
+    _description = 'PrestaShop Rate Limit'
+    _log_access = False
+
+    # not a Many2one: the rows are written in other transactions
+    # than the ones of the backends
+    backend_id = fields.Integer(required=True)
+    rate = fields.Float(help="Current number of calls per second")
+    tokens = fields.Float()
+    last_refill = fields.Datetime()
+
+    _sql_constraints = [
+        ('backend_uniq', 'unique(backend_id)',
+         'A backend can have only one rate limit.'),
+    ]
+
+    @api.model
+    def limits(self, backend):
+        """ Return the :class:`RateLimits` of a backend """
+        return RateLimits(backend.id, backend.rate_limit,
+                          backend.max_concurrency, backend.rate_limit_latency)
+
+    @api.model
+    def _max_wait(self):
+        """ Number of seconds a call can wait before the job is retried """
+        return int(config.get('prestashop_rate_limit_max_wait', 60))
+
+    def _create_bucket(self, cr, limits):
+        try:
+            with cr.savepoint():
+                cr.execute(
+                    "INSERT INTO prestashop_rate_limit "
+                    "(backend_id, rate, tokens, last_refill) "
+                    "VALUES (%s, %s, %s, "
+                    "        clock_timestamp() at time zone 'UTC')",
+                    (limits.backend_id, limits.rate_limit,
+                     max(1., limits.rate_limit))
+                )
+        except psycopg2.IntegrityError:
+            # created concurrently
+            pass
+
+    def _take_token(self, cr, limits):
+        """ Take a token, return the number of seconds to wait for it """
+        query = (
+            "UPDATE prestashop_rate_limit "
+            "SET tokens = LEAST(%(burst)s, tokens + rate * EXTRACT(EPOCH "
+            "    FROM clock_timestamp() at time zone 'UTC' - last_refill)"
+            "    ) - 1, "
+            "    last_refill = clock_timestamp() at time zone 'UTC', "
+            "    rate = LEAST(rate, %(max_rate)s) "
+            "WHERE backend_id = %(backend_id)s "
+            "RETURNING tokens, rate"
+        )
+        params = {'burst': max(1., limits.rate_limit),
+                  'max_rate': limits.rate_limit,
+                  'backend_id': limits.backend_id}
+        cr.execute(query, params)
+        row = cr.fetchone()
+        if not row:
+            self._create_bucket(cr, limits)
+            cr.execute(query, params)
+            row = cr.fetchone()
+        cr.commit()
+        tokens, rate = row
+        if tokens >= 0:
+            return 0
+        # the token is borrowed from the next refills
+        return -tokens / rate
+
+    def _give_back_token(self, cr, limits):
+        cr.execute("UPDATE prestashop_rate_limit SET tokens = tokens + 1 "
+                   "WHERE backend_id = %s", (limits.backend_id,))
+        cr.commit()
+
+    def _take_slot(self, cr, limits):
+        """ Try to take a concurrency slot, held until the transaction
+        of the cursor ends """
+        base = SLOT_LOCK_NAMESPACE + (limits.backend_id << 16)
+        for slot in range(limits.max_concurrency):
+            cr.execute("SELECT pg_try_advisory_xact_lock(%s)",
+                       (base + slot,))
+            if cr.fetchone()[0]:
+                return True
+        return False
+
+    def _adapt_rate(self, cr, limits, duration, status):
+        """ Adapt the rate according to the outcome of a call """
+        max_rate = limits.rate_limit
+        if status in THROTTLED_STATUS:
+            factor, step = 0.5, 0.
+        elif duration > limits.rate_limit_latency:
+            factor, step = 0.9, 0.
+        else:
+            factor, step = 1., max_rate * 0.05
+        cr.execute(
+            "UPDATE prestashop_rate_limit "
+            "SET rate = GREATEST(%s, LEAST(%s, rate * %s + %s)) "
+            "WHERE backend_id = %s",
+            (max_rate * 0.1, max_rate, factor, step, limits.backend_id)
+        )
+
+    @contextmanager
+    def limit(self, limits):
+        """ Context manager wrapping a call to PrestaShop
+
+        Wait for a token and a concurrency slot, then report the
+        duration and outcome of the call to adapt the rate. Raise a
+        :class:`~openerp.addons.connector.exception.NetworkRetryableError`
+        when the call would have to wait more than
+        ``prestashop_rate_limit_max_wait`` seconds.
+        """
+        if not limits.rate_limit and not limits.max_concurrency:
+            yield
+            return
+        with closing(self.env.registry.cursor()) as cr:
+            deadline = time.time() + self._max_wait()
+            if limits.rate_limit:
+                wait = self._take_token(cr, limits)
+                if time.time() + wait > deadline:
+                    self._give_back_token(cr, limits)
+                    raise NetworkRetryableError(
+                        'Too many calls to PrestaShop, retry later.'
+                    )
+                if wait:
+                    _logger.debug('rate limit: waiting %.2fs', wait)
+                    time.sleep(wait)
+            if limits.max_concurrency:
+                while not self._take_slot(cr, limits):
+                    if time.time() > deadline:
+                        raise NetworkRetryableError(
+                            'Too many concurrent calls to PrestaShop, '
+                            'retry later.'
+                        )
+                    time.sleep(0.1)
+            start = time.time()
+            status = None
+            try:
+                yield
+            except PrestaShopWebServiceError as err:
+                status = err.error_code
+                raise
+            except RequestException:
+                # timeouts, refused connections
+                status = 503
+                raise
+            finally:
+                if limits.rate_limit:
+                    self._adapt_rate(cr, limits, time.time() - start,
+                                     status)
+                # releases the concurrency slot
+                cr.commit()
@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+from openerp import models, fields, api
+from openerp.tools import config
+
+_logger = logging.getLogger(__name__)
+
+# (dbname, backend_id, resource) for which PrestaShop has answered with
+# validators (ETag, Last-Modified) in this process, the validators of the
+# other resources are not looked up
+_validated_resources = set()
+_validated_resources_lock = threading.Lock()
+
+# records known to be missing by this process, refreshed from the
+# database every ``prestashop_missing_record_refresh`` seconds:
+# {(dbname, backend_id): [refreshed_at,
+#                         {(resource, prestashop_id): (expire_at, error)}]}
+_missing_records = {}
+# calls saved not yet counted in the database:
+# {(dbname, backend_id, resource, prestashop_id): saved_calls}
+_saved_calls = {}
+_missing_records_lock = threading.Lock()
+_last_saved_calls_flush = [time.time()]
+
+
+@contextmanager
+def cache_cursor(env):
+    """ Yield a cursor in a new transaction
+
+    The caches are read and written in their own transactions so the
+    entries are visible at once by all the workers. Errors are logged
+    and swallowed, the caches must never make an import fail.
+    """
+    cr = env.registry.cursor()
+    try:
+        yield cr
+        cr.commit()
+    except psycopg2.IntegrityError:
+        # the same entry has been stored concurrently
+        cr.rollback()
+    except Exception:
+        cr.rollback()
+        _logger.exception('Error in the PrestaShop cache')
+    finally:
+        cr.close()
+
+
+class PrestashopRecordCache(models.Model):
+    """ Raw PrestaShop records shared between the jobs
+
+    The records read by an importer are stored so the other jobs
+    needing the same record shortly after (typically as a dependency)
+    do not have to read it again. The entries are validated against
+    the ``date_upd`` of the records on PrestaShop by the importers,
+    see :meth:`~connector_prestashop.unit.importer.PrestashopImporter.\
+_get_prestashop_data`.
+
+    The entries are read and written in their own transactions so they
+    are visible at once by all the workers. The least recently used
+    entries are removed by a scheduled action when the total size goes
+    over ``prestashop_record_cache_size`` (bytes).
+
+    The ``ETag`` and ``Last-Modified`` headers of the responses are
+    stored with the records, they are sent back by
+    :meth:`~connector_prestashop.unit.backend_adapter.GenericAdapter.read`
+    so PrestaShop can answer that a record is unchanged without sending
+    it again.
+    """
+    _name = 'prestashop.record.cache'
+    _description = 'PrestaShop Record Cache'
+    _log_access = False
+    _order = 'last_used desc'
+
+    # not a Many2one: the entries are written in other transactions
+    # than the ones of the backends
+    backend_id = fields.Integer(required=True, index=True)
+    resource = fields.Char(required=True)
+    prestashop_id = fields.Char(string='PrestaShop ID', required=True)
+    date_upd = fields.Char(string='Updated on PrestaShop')
+    data = fields.Text()
+    size = fields.Integer()
+    fetch_date = fields.Datetime(string='Read on')
+    last_used = fields.Datetime(string='Last Used', index=True)
+    etag = fields.Char(string='ETag')
+    last_modified = fields.Char(string='Last Modified')
+
+    _sql_constraints = [
+        ('record_uniq', 'unique(backend_id, resource, prestashop_id)',
+         'A record can be cached only once.'),
+    ]
+
+    @api.model
+    def _trust_delay(self):
+        """ Number of seconds a record read by a job is used by the
+        dependency imports without checking its ``date_upd`` """
+        return int(config.get('prestashop_record_cache_trust_delay', 60))
+
+    @api.model
+    def get_record(self, backend_id, resource, prestashop_id):
+        """ Return the cached record and the number of seconds since
+        it has been read from PrestaShop
+
+        :return: ``(record, age)``, ``(None, None)`` when not cached
+        """
+        result = None
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "UPDATE prestashop_record_cache "
+                "SET last_used = now() at time zone 'UTC' "
+                "WHERE backend_id = %s AND resource = %s "
+                "AND prestashop_id = %s "
+                "RETURNING data, "
+                "EXTRACT(EPOCH FROM now() at time zone 'UTC' - fetch_date)",
+                (backend_id, resource, str(prestashop_id))
+            )
+            result = cr.fetchone()
+        if not result:
+            return None, None
+        data, age = result
+        return json.loads(data), age
+
+    def _validated_key(self, backend_id, resource):
+        return (self.env.cr.dbname, backend_id, resource)
+
+    @api.model
+    def get_validators(self, backend_id, resource, prestashop_id):
+        """ Return the cached record with the validators of the response
+        it comes from
+
+        :return: ``(record, validators)``, ``validators`` being a dict
+                 with the keys ``etag`` and ``last_modified``,
+                 ``(None, None)`` when the record has no validators
+        """
+        key = self._validated_key(backend_id, resource)
+        if key not in _validated_resources:
+            return None, None
+        result = None
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "UPDATE prestashop_record_cache "
+                "SET last_used = now() at time zone 'UTC' "
+                "WHERE backend_id = %s AND resource = %s "
+                "AND prestashop_id = %s "
+                "AND (etag IS NOT NULL OR last_modified IS NOT NULL) "
+                "RETURNING data, etag, last_modified",
+                (backend_id, resource, str(prestashop_id))
+            )
+            result = cr.fetchone()
+        if not result:
+            return None, None
+        data, etag, last_modified = result
+        return json.loads(data), {'etag': etag,
+                                  'last_modified': last_modified}
+
+    @api.model
+    def store_record(self, backend_id, resource, prestashop_id, record,
+                     validators=None):
+        """ Store a record just read from PrestaShop
+
+        :param validators: dict with the ``etag`` and ``last_modified``
+                           of the response, when None, the validators
+                           already stored are kept
+        """
+        data = json.dumps(record)
+        etag = last_modified = None
+        if validators is not None:
+            etag = validators.get('etag')
+            last_modified = validators.get('last_modified')
+            if etag or last_modified:
+                with _validated_resources_lock:
+                    _validated_resources.add(
+                        self._validated_key(backend_id, resource)
+                    )
+        keep = validators is None
+        values = (data, len(data), record.get('date_upd'),
+                  keep, etag, keep, last_modified,
+                  backend_id, resource, str(prestashop_id))
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "UPDATE prestashop_record_cache "
+                "SET data = %s, size = %s, date_upd = %s, "
+                "etag = CASE WHEN %s THEN etag ELSE %s END, "
+                "last_modified = CASE WHEN %s THEN last_modified "
+                "                ELSE %s END, "
+                "fetch_date = now() at time zone 'UTC', "
+                "last_used = now() at time zone 'UTC' "
+                "WHERE backend_id = %s AND resource = %s "
+                "AND prestashop_id = %s",
+                values
+            )
+            if not cr.rowcount:
+                cr.execute(
+                    "INSERT INTO prestashop_record_cache "
+                    "(data, size, date_upd, etag, last_modified, "
+                    " backend_id, resource, prestashop_id, "
+                    " fetch_date, last_used) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, "
+                    "        now() at time zone 'UTC', "
+                    "        now() at time zone 'UTC')",
+                    (data, len(data), record.get('date_upd'),
+                     etag, last_modified,
+                     backend_id, resource, str(prestashop_id))
+                )
+
+    @api.model
+    def clear(self, backend_id=None):
+        """ Remove the records of a backend, or all of them """
+        with cache_cursor(self.env) as cr:
+            if backend_id is None:
+                cr.execute("DELETE FROM prestashop_record_cache")
+            else:
+                cr.execute("DELETE FROM prestashop_record_cache "
+                           "WHERE backend_id = %s", (backend_id,))
+        return True
+
+    @api.model
+    def prune(self, max_size=None):
+        """ Remove the least recently used records exceeding the size """
+        if max_size is None:
+            max_size = int(config.get('prestashop_record_cache_size',
+                                      50 * 1024 * 1024))
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "DELETE FROM prestashop_record_cache WHERE id IN ("
+                "  SELECT id FROM ("
+                "    SELECT id, SUM(size) OVER (ORDER BY last_used DESC, id)"
+                "           AS total_size"
+                "    FROM prestashop_record_cache"
+                "  ) AS entries WHERE total_size > %s"
+                ")",
+                (max_size,)
+            )
+        return True
+
+    @api.model
+    def _scheduler_prune(self):
+        return self.prune()
+
+
+class PrestashopMissingRecord(models.Model):
+    """ Records known to be missing on PrestaShop
+
+    When PrestaShop answers that a record does not exist, the answer is
+    kept for ``prestashop_missing_record_ttl`` seconds (default: 3600)
+    so the next reads of the record fail at once instead of calling
+    PrestaShop again, see
+    :meth:`~connector_prestashop.unit.backend_adapter.GenericAdapter.read`.
+
+    Each process keeps the missing records of the backends in memory,
+    read again every ``prestashop_missing_record_refresh`` seconds
+    (default: 60), so the reads of the existing records do not query
+    the table. The number of calls saved is counted for each record in
+    memory and written every ``prestashop_missing_record_flush_interval``
+    seconds (default: 10).
+    """
+    _name = 'prestashop.missing.record'
+    _description = 'PrestaShop Missing Record'
+    _log_access = False
+    _order = 'expire_date desc'
+
+    # not a Many2one: the entries are written in other transactions
+    # than the ones of the backends
+    backend_id = fields.Integer(required=True, index=True)
+    resource = fields.Char(required=True)
+    prestashop_id = fields.Char(string='PrestaShop ID', required=True)
+    error = fields.Text()
+    expire_date = fields.Datetime(string='Expires on')
+    saved_calls = fields.Integer(string='Saved Calls')
+
+    _sql_constraints = [
+        ('record_uniq', 'unique(backend_id, resource, prestashop_id)',
+         'A missing record can be registered only once.'),
+    ]
+
+    @api.model
+    def _ttl(self):
+        return int(config.get('prestashop_missing_record_ttl', 3600))
+
+    @api.model
+    def _refresh_delay(self):
+        return int(config.get('prestashop_missing_record_refresh', 60))
+
+    @api.model
+    def _flush_interval(self):
+        return int(config.get('prestashop_missing_record_flush_interval',
+                              10))
+
+    def _records(self, backend_id):
+        """ Return the missing records of a backend:
+        ``{(resource, prestashop_id): (expire_at, error)}`` """
+        key = (self.env.cr.dbname, backend_id)
+        state = _missing_records.get(key)
+        if state and time.time() - state[0] < self._refresh_delay():
+            return state[1]
+        records = {}
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "SELECT resource, prestashop_id, "
+                "       EXTRACT(EPOCH FROM expire_date), error "
+                "FROM prestashop_missing_record "
+                "WHERE backend_id = %s "
+                "AND expire_date > now() at time zone 'UTC'",
+                (backend_id,)
+            )
+            for resource, prestashop_id, expire_at, error in cr.fetchall():
+                records[(resource, prestashop_id)] = (expire_at, error)
+        with _missing_records_lock:
+            _missing_records[key] = [time.time(), records]
+        return records
+
+    @api.model
+    def get_error(self, backend_id, resource, prestashop_id):
+        """ Return the error of a record known to be missing
+
+        Count a saved call when the record is known to be missing.
+
+        :return: the error message or None
+        """
+        prestashop_id = str(prestashop_id)
+        entry = self._records(backend_id).get((resource, prestashop_id))
+        if not entry or entry[0] <= time.time():
+            return None
+        key = (self.env.cr.dbname, backend_id, resource, prestashop_id)
+        with _missing_records_lock:
+            _saved_calls[key] = _saved_calls.get(key, 0) + 1
+            must_flush = time.time() - _last_saved_calls_flush[0] > \
+                self._flush_interval()
+        if must_flush:
+            self.flush()
+        return entry[1] or ''
+
+    @api.model
+    def flush(self):
+        """ Write the calls saved of this database """
+        dbname = self.env.cr.dbname
+        with _missing_records_lock:
+            _last_saved_calls_flush[0] = time.time()
+            saved_calls = dict((key, _saved_calls.pop(key))
+                               for key in _saved_calls.keys()
+                               if key[0] == dbname)
+        if not saved_calls:
+            return True
+        with cache_cursor(self.env) as cr:
+            for key, count in sorted(saved_calls.iteritems()):
+                cr.execute(
+                    "UPDATE prestashop_missing_record "
+                    "SET saved_calls = saved_calls + %s "
+                    "WHERE backend_id = %s AND resource = %s "
+                    "AND prestashop_id = %s",
+                    (count,) + key[1:]
+                )
+        return True
+
+    @api.model
+    def register(self, backend_id, resource, prestashop_id, error):
+        """ Register a record which does not exist on PrestaShop """
+        records = self._records(backend_id)
+        with _missing_records_lock:
+            records[(resource, str(prestashop_id))] = (
+                time.time() + self._ttl(), unicode(error)
+            )
+        values = (unicode(error), '%d seconds' % self._ttl(),
+                  backend_id, resource, str(prestashop_id))
+        with cache_cursor(self.env) as cr:
+            cr.execute(
+                "UPDATE prestashop_missing_record "
+                "SET error = %s, "
+                "expire_date = now() at time zone 'UTC' + %s::interval "
+                "WHERE backend_id = %s AND resource = %s "
+                "AND prestashop_id = %s",
+                values
+            )
+            if not cr.rowcount:
+                cr.execute(
+                    "INSERT INTO prestashop_missing_record "
+                    "(error, expire_date, backend_id, resource, "
+                    " prestashop_id, saved_calls) "
+                    "VALUES (%s, now() at time zone 'UTC' + %s::interval, "
+                    "        %s, %s, %s, 0)",
+                    values
+                )
+
+    @api.model
+    def clear(self, backend_id):
+        """ Forget the missing records of a backend, they will be read
+        again from PrestaShop """
+        with _missing_records_lock:
+            _missing_records.pop((self.env.cr.dbname, backend_id), None)
+        with cache_cursor(self.env) as cr:
+            cr.execute("UPDATE prestashop_missing_record "
+                       "SET expire_date = NULL WHERE backend_id = %s",
+                       (backend_id,))
+        return True
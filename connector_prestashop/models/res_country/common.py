@@ -37,3 +37,4 @@ class ResCountry(models.Model):
 class ResCountryAdapter(GenericAdapter):
     _model_name = 'prestashop.res.country'
     _prestashop_model = 'countries'
+    _cache_ttl = 86400
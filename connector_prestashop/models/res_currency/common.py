@@ -37,3 +37,4 @@ class ResCurrency(models.Model):
 class ResCurrencyAdapter(GenericAdapter):
     _model_name = 'prestashop.res.currency'
     _prestashop_model = 'currencies'
+    _cache_ttl = 86400
@@ -41,3 +41,4 @@ class ResLang(models.Model):
 class ResLangAdapter(GenericAdapter):
     _model_name = 'prestashop.res.lang'
     _prestashop_model = 'languages'
+    _cache_ttl = 86400
@@ -3,7 +3,7 @@
 
 import re
 
-from openerp import fields, _
+from openerp import _
 from openerp.addons.connector.queue.job import job
 from openerp.addons.connector.unit.mapper import (
     ImportMapper,
@@ -16,6 +16,7 @@ from ...unit.importer import (
     DelayedBatchImporter,
 )
 from ...backend import prestashop
+from ...unit.job_identity import backend_first_argument, related_backend
 from openerp.addons.connector.unit.mapper import backend_to_m2o
 
 
@@ -107,6 +108,7 @@ class PartnerImportMapper(ImportMapper):
 @prestashop
 class ResPartnerImporter(PrestashopImporter):
     _model_name = 'prestashop.res.partner'
+    _record_cache = True
 
     def _import_dependencies(self):
         groups = self.prestashop_record.get('associations', {}) \
@@ -134,6 +136,7 @@ class ResPartnerImporter(PrestashopImporter):
 @prestashop
 class PartnerBatchImporter(DelayedBatchImporter):
     _model_name = 'prestashop.res.partner'
+    _listed_records = True
 
 
 @prestashop
@@ -198,6 +201,7 @@ class AddressImportMapper(ImportMapper):
 @prestashop
 class AddressImporter(PrestashopImporter):
     _model_name = 'prestashop.address'
+    _record_cache = True
 
     def _check_vat(self, vat):
         vat_country, vat_number = vat[:2].lower(), vat[2:]
@@ -234,6 +238,7 @@ class AddressBatchImporter(DelayedBatchImporter):
     _model_name = 'prestashop.address'
 
 
+@related_backend(backend_first_argument)
 @job(default_channel='root.prestashop')
 def import_customers_since(
         session, backend_id, since_date=None, **kwargs):
@@ -243,12 +248,16 @@ def import_customers_since(
         filters = {
             'date': '1',
             'filter[date_upd]': '>[%s]' % since_date}
-    now_fmt = fields.Datetime.now()
+    now_fmt = session.env['prestashop.batch.cursor'].watermark(
+        backend_id,
+        ['prestashop.res.partner.category', 'prestashop.res.partner'],
+    )
     result = import_batch(
         session,
         'prestashop.res.partner.category',
         backend_id,
         filters,
+        resumable=True,
         **kwargs
     ) or ''
     result += import_batch(
@@ -257,6 +266,7 @@ def import_customers_since(
         backend_id,
         filters,
         priority=15,
+        resumable=True,
         **kwargs
     ) or ''
 
@@ -35,6 +35,7 @@ class PartnerCategoryImporter(TranslatableRecordImporter):
     _model_name = [
         'prestashop.res.partner.category',
     ]
+    _record_cache = True
 
     _translatable_fields = {
         'prestashop.res.partner.category': ['name'],
@@ -148,7 +148,7 @@ class SaleOrderAdapter(GenericAdapter):
     _export_node_name = 'order'
 
     def update_sale_state(self, prestashop_id, datas):
-        return self.client.add('order_histories', datas)
+        return self._call(self.client.add, 'order_histories', datas)
 
 
 @prestashop
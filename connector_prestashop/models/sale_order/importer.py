@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
 
-from openerp import _, fields
+from openerp import _
 from openerp.addons.connector.queue.job import job
 from openerp.addons.connector.connector import ConnectorUnit
 from openerp.addons.connector.exception import FailedJobError, NothingToDoJob
@@ -17,6 +17,7 @@ from ...unit.importer import (
 )
 from ...unit.exception import OrderImportRuleRetry
 from ...backend import prestashop
+from ...unit.job_identity import backend_first_argument, related_backend
 
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -62,9 +63,9 @@ class SaleImportRule(ConnectorUnit):
         payment_ids = payment_adapter.search({
             'filter[order_reference]': record['reference']
         })
+        payments = payment_adapter.read_many(payment_ids)
         paid_amount = 0.0
-        for payment_id in payment_ids:
-            payment = payment_adapter.read(payment_id)
+        for payment in payments.itervalues():
             paid_amount += float(payment['amount'])
         return paid_amount
 
@@ -165,10 +166,17 @@ class SaleOrderMapper(ImportMapper):
         else:
             child_records = source[from_attr]
 
+        adapter = self.unit_for(GenericAdapter, model_name)
+        detail_records = adapter.read_many(
+            [child_record['id'] for child_record in child_records]
+        )
         children = []
         for child_record in child_records:
-            adapter = self.unit_for(GenericAdapter, model_name)
-            detail_record = adapter.read(child_record['id'])
+            detail_record = detail_records.get(str(child_record['id']))
+            if detail_record is None:
+                # not returned by the listing, read it alone so we get
+                # the error from PrestaShop
+                detail_record = adapter.read(child_record['id'])
 
             mapper = self._get_map_child_unit(model_name)
             items = mapper.get_items(
@@ -344,6 +352,9 @@ class SaleOrderImporter(PrestashopImporter):
 @prestashop
 class SaleOrderBatchImporter(DelayedBatchImporter):
     _model_name = 'prestashop.sale.order'
+    # the orders are not handed to their jobs: the import rules retry
+    # the jobs of the orders not paid yet, which must read the state and
+    # the totals of the order again
 
 
 @prestashop
@@ -468,6 +479,7 @@ class SaleOrderLineDiscountMapper(ImportMapper):
         return {'prestashop_id': record['id']}
 
 
+@related_backend(backend_first_argument)
 @job(default_channel='root.prestashop')
 def import_orders_since(session, backend_id, since_date=None, **kwargs):
     """ Prepare the import of orders modified on PrestaShop """
@@ -475,6 +487,10 @@ def import_orders_since(session, backend_id, since_date=None, **kwargs):
     filters = None
     if since_date:
         filters = {'date': '1', 'filter[date_upd]': '>[%s]' % (since_date)}
+    # the orders modified while they are read are imported by the next run
+    now_fmt = session.env['prestashop.batch.cursor'].watermark(
+        backend_id, ['prestashop.sale.order']
+    )
     result = import_batch(
         session,
         'prestashop.sale.order',
@@ -482,6 +498,7 @@ def import_orders_since(session, backend_id, since_date=None, **kwargs):
         filters,
         priority=10,
         max_retries=0,
+        resumable=True,
         **kwargs
     )
     if since_date:
@@ -497,7 +514,6 @@ def import_orders_since(session, backend_id, since_date=None, **kwargs):
             message=msg
         )
 
-    now_fmt = fields.Datetime.now()
     backend_record.write({
         'import_orders_since': now_fmt
     })
@@ -74,3 +74,4 @@ class SaleOrderStateList(models.Model):
 class SaleOrderStateAdapter(GenericAdapter):
     _model_name = 'prestashop.sale.order.state'
     _prestashop_model = 'order_states'
+    _cache_ttl = 3600
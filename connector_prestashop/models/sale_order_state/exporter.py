@@ -5,6 +5,7 @@
 from openerp.addons.connector.queue.job import job
 from openerp.addons.connector.unit.synchronizer import Exporter
 from ...backend import prestashop
+from ...unit.job_identity import odoo_record_backend, related_backend
 
 
 @prestashop
@@ -32,6 +33,7 @@ def find_prestashop_state(session, sale_state, backend):
     return None
 
 
+@related_backend(odoo_record_backend)
 @job
 def export_sale_state(session, model_name, record_id):
     binding_model = session.env[model_name]
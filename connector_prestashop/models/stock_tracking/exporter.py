@@ -7,6 +7,7 @@ from openerp.addons.connector.unit.synchronizer import Exporter
 from openerp.exceptions import UserError
 from openerp.addons.connector.queue.job import job
 from ...backend import prestashop
+from ...unit.job_identity import binding_backend, related_backend
 from ...unit.backend_adapter import PrestaShopCRUDAdapter
 
 _logger = logging.getLogger(__name__)
@@ -51,6 +52,7 @@ class PrestashopTrackingExporter(Exporter):
             return "No tracking to export"
 
 
+@related_backend(binding_backend)
 @job
 def export_tracking_number(session, model_name, record_id):
     """ Export the tracking number of a delivery order. """
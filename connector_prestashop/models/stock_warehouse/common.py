@@ -60,3 +60,4 @@ class PrestashopShop(models.Model):
 class ShopAdapter(GenericAdapter):
     _model_name = 'prestashop.shop'
     _prestashop_model = 'shops'
+    _cache_ttl = 3600
@@ -15,6 +15,8 @@ class ShopImportMapper(ImportMapper):
         ('name', 'name'),
         (backend_to_m2o('id_shop_group'), 'shop_group_id'),
     ]
+    # the modifier of ``direct`` hides its field
+    _source_fields = ('name', 'id_shop_group')
 
     @mapping
     def backend_id(self, record):
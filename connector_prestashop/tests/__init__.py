@@ -1,12 +1,25 @@
 # -*- coding: utf-8 -*-
 
 from . import test_auth
+from . import test_backend_adapter
+from . import test_batch_importer
+from . import test_benchmark
+from . import test_call_stat
+from . import test_circuit_breaker
 from . import test_export_stock_qty
 from . import test_export_stock_qty_job
 from . import test_export_tracking
+from . import test_fake_prestashop
 from . import test_import_carrier
 from . import test_import_backend_data
 from . import test_import_inventory
 from . import test_import_partner
 from . import test_import_products
 from . import test_import_sale
+from . import test_job_identity
+from . import test_job_profiling
+from . import test_job_timing
+from . import test_json_format
+from . import test_product_image
+from . import test_rate_limit
+from . import test_record_cache
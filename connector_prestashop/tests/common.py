@@ -6,6 +6,7 @@ import functools
 
 import openerp.tests.common as common
 from openerp.addons.connector.session import ConnectorSession
+from openerp.addons.connector_prestashop.unit.cache import reference_cache
 
 from contextlib import contextmanager
 from os.path import dirname, exists, join
@@ -90,6 +91,11 @@ class PrestashopTransactionCase(common.TransactionCase):
             'location': prestashop_url,
             'webservice_key': token,
         })
+        # the caches outlive the test transactions
+        reference_cache.clear()
+        self.env['prestashop.record.cache'].clear()
+        self.env['prestashop.missing.record'].clear(self.backend_record.id)
+        self.env['prestashop.circuit.breaker'].reset(self.backend_record.id)
         self.configure()
 
     def configure(self):
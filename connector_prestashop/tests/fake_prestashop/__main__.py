@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+""" Serve a generated shop until interrupted
+
+Usage, from the ``tests`` directory::
+
+    python -m fake_prestashop --products 50000 --combinations 8 \\
+        --languages 5 --port 8069
+
+The location and the key to configure on the backend are printed once
+the dataset is generated.
+"""
+
+import argparse
+import time
+
+from .generator import SCENARIOS, generate
+from .webservice import FakePrestaShop, serve
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='fake_prestashop',
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS),
+                        help='preset of the options of the generation')
+    parser.add_argument('--seed', type=int)
+    for option in ('products', 'combinations', 'option-groups',
+                   'option-values', 'languages', 'category-depth',
+                   'category-children', 'images', 'customers', 'addresses',
+                   'orders', 'order-lines'):
+        parser.add_argument('--%s' % option, type=int)
+    parser.add_argument('--discount-ratio', type=float)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--key', default='FAKEPRESTASHOPKEY',
+                        help='key of the webservice')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='latency of the responses, in seconds')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='ratio of the responses failing with a 503')
+    args = parser.parse_args()
+
+    options = dict((name, value) for name, value in vars(args).iteritems()
+                   if value is not None and name not in (
+                       'scenario', 'host', 'port', 'key', 'latency',
+                       'error_rate'))
+    started = time.time()
+    dataset = generate(args.scenario, **options)
+    print('Generated in %.1fs: %s' % (
+        time.time() - started,
+        ', '.join('%d %s' % (dataset.count(resource), resource)
+                  for resource in sorted(dataset.resources())
+                  if dataset.count(resource))))
+    shop = FakePrestaShop(dataset, webservice_key=args.key,
+                          latency=args.latency, error_rate=args.error_rate)
+    with serve(shop, host=args.host, port=args.port) as location:
+        print('Serving on %s with the key %s' % (location, args.key))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+""" Records served by the fake PrestaShop webservice """
+
+import bisect
+import struct
+import zlib
+
+# name of the node of a record when it is not the name of the resource
+# without its final 's'
+NODES = {
+    'addresses': 'address',
+    'categories': 'category',
+    'countries': 'country',
+    'currencies': 'currency',
+    'order_discounts': 'order_cart_rule',
+    'order_histories': 'order_history',
+    'taxes': 'tax',
+}
+
+# name of the node of the listings when it is not the name of the
+# resource
+LISTING_NODES = {
+    'order_discounts': 'order_cart_rules',
+}
+
+
+class Dataset(object):
+    """ Records of a fake shop, by resource
+
+    The records have the structure returned by ``xml2dict`` for the
+    records of PrestaShop: the values are strings, the translatable
+    fields are ``{'language': [{'attrs': {'id': '1'}, 'value': ...}]}``
+    and the associations are in an ``associations`` field.
+
+    The images are stored in :attr:`images`, by path after ``images/``,
+    for instance ``('products', '1', '2')`` for the image 2 of the
+    product 1, with their mimetype and their content.
+    """
+
+    def __init__(self):
+        self._records = {}
+        # sorted ids of the records of each resource, as int
+        self._ids = {}
+        self._fields = {}
+        self.images = {}
+
+    def resources(self):
+        return self._records.keys()
+
+    def node(self, resource):
+        return NODES.get(resource, resource[:-1])
+
+    def listing_node(self, resource):
+        return LISTING_NODES.get(resource, resource)
+
+    def fields(self, resource):
+        """ Fields of the records of a resource, in the order of the
+        responses """
+        return self._fields.get(resource, [])
+
+    def count(self, resource):
+        return len(self._records.get(resource, ()))
+
+    def records(self, resource):
+        """ Records of a resource ordered by id """
+        records = self._records.get(resource, {})
+        return [records[record_id] for record_id in self._ids[resource]]
+
+    def records_from(self, resource, record_id):
+        """ Records of a resource having an id greater than ``record_id``
+        """
+        ids = self._ids.get(resource, [])
+        records = self._records[resource]
+        return [records[other_id] for other_id
+                in ids[bisect.bisect_right(ids, int(record_id)):]]
+
+    def get(self, resource, record_id):
+        try:
+            return self._records.get(resource, {}).get(int(record_id))
+        except ValueError:
+            return None
+
+    def next_id(self, resource):
+        ids = self._ids.get(resource)
+        return ids[-1] + 1 if ids else 1
+
+    def declare(self, resource, fields):
+        """ Declare the fields of a resource which may have no records,
+        so it can be listed and filtered """
+        self._records.setdefault(resource, {})
+        self._ids.setdefault(resource, [])
+        known = self._fields.setdefault(resource, ['id'])
+        known.extend(field for field in fields if field not in known)
+
+    def add(self, resource, values):
+        """ Add a record, with the next id when it has none
+
+        :param values: values of the record, as a dict or as a list of
+                       ``(field, value)`` giving the order of the fields
+                       in the responses
+        :return: the record added
+        """
+        records = self._records.setdefault(resource, {})
+        ids = self._ids.setdefault(resource, [])
+        fields = self._fields.setdefault(resource, ['id'])
+        if isinstance(values, dict):
+            values = values.items()
+        record = dict(values)
+        record['id'] = str(record.get('id') or self.next_id(resource))
+        if len(record) > len(fields):
+            for field, __ in values:
+                if field not in fields:
+                    fields.append(field)
+        record_id = int(record['id'])
+        if record_id not in records:
+            bisect.insort(ids, record_id)
+        records[record_id] = record
+        return record
+
+    def update(self, resource, record_id, values):
+        """ Update the fields of a record given in ``values`` """
+        record = self.get(resource, record_id)
+        fields = self._fields[resource]
+        for field, value in values.iteritems():
+            if field != 'id':
+                record[field] = value
+                if field not in fields:
+                    fields.append(field)
+        return record
+
+    def delete(self, resource, record_id):
+        del self._records[resource][int(record_id)]
+        self._ids[resource].remove(int(record_id))
+
+
+def png(width, height, rgb):
+    """ Content of a PNG image of one color """
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+    row = '\x00' + struct.pack('BBB', *rgb) * width
+    return ('\x89PNG\r\n\x1a\n' +
+            chunk('IHDR', struct.pack('>IIBBBBB', width, height,
+                                      8, 2, 0, 0, 0)) +
+            chunk('IDAT', zlib.compress(row * height)) +
+            chunk('IEND', ''))
+
+
+def association(api, node, ids):
+    """ Association of a record with the records of ``ids`` """
+    attrs = {'api': api, 'nodeType': node}
+    if not ids:
+        return {'attrs': attrs, 'value': ''}
+    return {'attrs': attrs,
+            node: [{'id': str(record_id)} for record_id in ids]}
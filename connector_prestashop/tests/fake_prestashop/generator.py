@@ -0,0 +1,836 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+""" Generation of the dataset of a fake shop
+
+The records have the structure of PrestaShop 1.6 and reference each
+other consistently: the products belong to a category tree and have
+combinations of option values, the orders are placed by the customers on
+their addresses for combinations in stock, etc. The dataset is generated
+from a seed, so the same options always give the same dataset.
+"""
+
+import datetime
+import itertools
+import random
+
+from .dataset import Dataset, association, png
+
+# code, name, language code and words used in the texts of each language
+LANGUAGES = [
+    ('en', u'English (English)', 'en-us',
+     u'soft cotton shirt summer dress blue classic elegant light fabric '
+     u'comfortable style collection wear casual fit modern'),
+    ('fr', u'Français (French)', 'fr-fr',
+     u'robe été légère coton élégant tissu confortable chemise bleu '
+     u'classique collection style décontracté moderne coupe'),
+    ('de', u'Deutsch (German)', 'de-de',
+     u'weiches Baumwolle Hemd Sommer Kleid blau klassisch elegant leicht '
+     u'Stoff bequem Stil Kollektion lässig modern Größe'),
+    ('es', u'Español (Spanish)', 'es-es',
+     u'suave algodón camisa verano vestido azul clásico elegante ligero '
+     u'tejido cómodo estilo colección informal moderno talla'),
+    ('it', u'Italiano (Italian)', 'it-it',
+     u'morbido cotone camicia estate vestito blu classico elegante '
+     u'leggero tessuto comodo stile collezione moderno taglia'),
+    ('nl', u'Nederlands (Dutch)', 'nl-nl',
+     u'zacht katoen overhemd zomer jurk blauw klassiek elegant licht '
+     u'stof comfortabel stijl collectie modern maat'),
+    ('pt', u'Português (Portuguese)', 'pt-pt',
+     u'macio algodão camisa verão vestido azul clássico elegante leve '
+     u'tecido confortável estilo coleção moderno tamanho'),
+    ('pl', u'Polski (Polish)', 'pl-pl',
+     u'miękka bawełna koszula lato sukienka niebieski klasyczny elegancki '
+     u'lekki tkanina wygodny styl kolekcja nowoczesny rozmiar'),
+    ('ru', u'Русский (Russian)', 'ru-ru',
+     u'мягкий хлопок рубашка лето платье синий классический элегантный '
+     u'лёгкий ткань удобный стиль коллекция современный размер'),
+    ('ja', u'日本語 (Japanese)', 'ja-jp',
+     u'柔らかい 綿 シャツ 夏 ドレス 青 クラシック エレガント 軽い 生地 '
+     u'快適 スタイル コレクション モダン サイズ'),
+]
+
+# countries of the addresses, with the ids of the demo data of PrestaShop
+COUNTRIES = [(8, 'FR', u'France'), (17, 'GB', u'United Kingdom'),
+             (19, 'CH', u'Switzerland'), (21, 'US', u'United States')]
+
+ORDER_STATES = [
+    (1, u'Awaiting check payment', '0'), (2, u'Payment accepted', '1'),
+    (3, u'Processing in progress', '1'), (4, u'Shipped', '1'),
+    (5, u'Delivered', '1'), (6, u'Canceled', '0'), (7, u'Refunded', '1'),
+    (8, u'Payment error', '0'), (10, u'Awaiting bank wire payment', '0'),
+]
+
+OPTION_GROUPS = [u'Size', u'Color', u'Material', u'Length', u'Style',
+                 u'Pattern']
+
+# resources read by the connector which are generated empty
+EMPTY_RESOURCES = {
+    'customer_messages': ['id_customer_thread', 'id_employee', 'message',
+                          'date_add'],
+    'messages': ['id_cart', 'id_order', 'id_customer', 'message',
+                 'date_add'],
+    'order_carriers': ['id_order', 'id_carrier', 'tracking_number'],
+    'product_suppliers': ['id_product', 'id_product_attribute',
+                          'id_supplier', 'product_supplier_reference'],
+    'suppliers': ['name', 'active', 'date_add', 'date_upd'],
+    'tags': ['id_lang', 'name'],
+}
+
+# options of the generation for common cases, used with ``scenario``
+SCENARIOS = {
+    'small': dict(products=20, combinations=2, customers=10, orders=10),
+    'catalog': dict(products=50000, combinations=8, languages=5,
+                    option_groups=3, option_values=8, category_depth=4),
+    'orders': dict(products=2000, combinations=4, customers=20000,
+                   orders=50000, order_lines=5),
+}
+
+
+class DatasetGenerator(object):
+    """ Generate the dataset of a fake shop
+
+    :param seed: seed of the random values
+    :param products: number of products
+    :param combinations: number of combinations per product, each one
+                         having a value of each option group
+    :param option_groups: number of option groups (size, color, ...)
+    :param option_values: number of values per option group
+    :param languages: number of languages of the translatable fields
+    :param category_depth: depth of the tree of categories under the
+                           home category
+    :param category_children: number of sub-categories of a category
+    :param description_paragraphs: number of HTML paragraphs of the
+                                   descriptions
+    :param images: number of images per product
+    :param customers: number of customers
+    :param addresses: number of addresses per customer
+    :param orders: number of orders
+    :param order_lines: number of lines per order
+    :param discount_ratio: ratio of the orders having a discount
+    :param paid_ratio: ratio of the orders having a payment
+    :param max_stock: maximum quantity in stock of a product
+    :param start_date: date of the first record, the next records are
+                       added and updated in the following days
+    """
+
+    def __init__(self, seed=0, products=10, combinations=2, option_groups=2,
+                 option_values=4, languages=1, category_depth=2,
+                 category_children=3, description_paragraphs=3, images=1,
+                 customers=10, addresses=1, orders=10, order_lines=3,
+                 discount_ratio=0.2, paid_ratio=0.9, max_stock=100,
+                 start_date=datetime.datetime(2016, 1, 1)):
+        if not 1 <= languages <= len(LANGUAGES):
+            raise ValueError('languages must be between 1 and %d' %
+                             len(LANGUAGES))
+        if not 1 <= option_groups <= len(OPTION_GROUPS):
+            raise ValueError('option_groups must be between 1 and %d' %
+                             len(OPTION_GROUPS))
+        self.random = random.Random(seed)
+        self.products = products
+        # a combination has a distinct set of option values
+        self.combinations = min(combinations,
+                                option_values ** option_groups)
+        self.option_groups = option_groups
+        self.option_values = option_values
+        self.languages = LANGUAGES[:languages]
+        self.category_depth = category_depth
+        self.category_children = category_children
+        self.description_paragraphs = description_paragraphs
+        self.images = images
+        self.customers = customers
+        self.addresses = addresses
+        self.orders = orders
+        self.order_lines = order_lines
+        self.discount_ratio = discount_ratio
+        self.paid_ratio = paid_ratio
+        self.max_stock = max_stock
+        self.start_date = start_date
+        self.words = [words.split() for __, __, __, words in self.languages]
+        self.dataset = None
+
+    def generate(self):
+        """ Generate the dataset
+
+        :rtype: :class:`~.dataset.Dataset`
+        """
+        self.dataset = Dataset()
+        self.reference_data()
+        self.categories()
+        self.options()
+        self.catalog()
+        self.customers_addresses()
+        self.sale_orders()
+        for resource, fields in EMPTY_RESOURCES.iteritems():
+            self.dataset.declare(resource, fields)
+        return self.dataset
+
+    # values
+
+    def date(self, index, count):
+        """ Date of the record ``index`` of ``count`` records, the records
+        are spread over a year in the order of their ids """
+        seconds = 365 * 86400 * index // max(count, 1)
+        seconds += self.random.randint(0, 3600)
+        date = self.start_date + datetime.timedelta(seconds=seconds)
+        return date.strftime('%Y-%m-%d %H:%M:%S')
+
+    def text(self, lang_index, words):
+        return u' '.join(self.random.choice(self.words[lang_index])
+                         for __ in range(words))
+
+    def translated(self, value_func):
+        """ Value of a translatable field, ``value_func`` gives the value
+        from the index of the language """
+        return {'language': [
+            {'attrs': {'id': str(lang_index + 1)},
+             'value': value_func(lang_index)}
+            for lang_index in range(len(self.languages))
+        ]}
+
+    def html(self, lang_index):
+        """ Description in HTML as written in the editor of PrestaShop """
+        paragraphs = []
+        for index in range(self.description_paragraphs):
+            kind = self.random.random()
+            if kind < 0.2:
+                paragraphs.append(u'<ul>%s</ul>' % u''.join(
+                    u'<li>%s</li>' % self.text(lang_index, 3)
+                    for __ in range(self.random.randint(2, 5))
+                ))
+            elif kind < 0.4:
+                paragraphs.append(u'<p><strong>%s</strong><br />%s</p>' % (
+                    self.text(lang_index, 3), self.text(lang_index, 20)))
+            else:
+                paragraphs.append(
+                    u'<p>%s <em>%s</em> %s&nbsp;!</p>' % (
+                        self.text(lang_index, 12), self.text(lang_index, 2),
+                        self.text(lang_index, 12))
+                )
+        return u'\n'.join(paragraphs)
+
+    def ean13(self, number):
+        digits = [int(digit) for digit in '%012d' % number]
+        check = (10 - sum(digit * (3 if index % 2 else 1)
+                          for index, digit in enumerate(digits)) % 10) % 10
+        return '%012d%d' % (number, check)
+
+    def amount(self, value):
+        return '%.6f' % value
+
+    # records
+
+    def reference_data(self):
+        """ Languages, countries, currencies, shops, groups, carriers,
+        order states and taxes """
+        add = self.dataset.add
+        for lang_index, (code, name, language_code, __) in enumerate(
+                self.languages):
+            add('languages', [
+                ('id', lang_index + 1), ('name', name), ('iso_code', code),
+                ('language_code', language_code), ('active', '1'),
+                ('is_rtl', '0'), ('date_format_lite', 'm/d/Y'),
+                ('date_format_full', 'm/d/Y H:i:s'),
+            ])
+        for country_id, code, name in COUNTRIES:
+            add('countries', [
+                ('id', country_id), ('id_zone', '1'), ('id_currency', '0'),
+                ('call_prefix', '0'), ('iso_code', code), ('active', '1'),
+                ('contains_states', '0'),
+                ('need_identification_number', '0'),
+                ('need_zip_code', '1'), ('zip_code_format', ''),
+                ('display_tax_label', '1'),
+                ('name', self.translated(lambda __: name)),
+            ])
+        add('currencies', [
+            ('id', 1), ('name', u'Pound'), ('iso_code', 'GBP'),
+            ('iso_code_num', '826'), ('blank', '1'), ('sign', u'£'),
+            ('format', '1'), ('decimals', '1'),
+            ('conversion_rate', '1.000000'), ('deleted', '0'),
+            ('active', '1'),
+        ])
+        add('shop_groups', [
+            ('id', 1), ('name', u'Default'), ('share_customer', '0'),
+            ('share_order', '0'), ('share_stock', '0'), ('active', '1'),
+            ('deleted', '0'),
+        ])
+        add('shops', [
+            ('id', 1), ('id_shop_group', '1'), ('id_category', '2'),
+            ('id_theme', '1'), ('active', '1'), ('deleted', '0'),
+            ('name', u'PrestaShop'),
+        ])
+        for group_id, name in ((1, u'Visitor'), (2, u'Guest'),
+                               (3, u'Customer')):
+            add('groups', [
+                ('id', group_id), ('reduction', '0.00'),
+                ('price_display_method', '0'), ('show_prices', '1'),
+                ('date_add', self.date(0, 1)), ('date_upd', self.date(0, 1)),
+                ('name', self.translated(lambda __: name)),
+            ])
+        add('carriers', [
+            ('id', 2), ('deleted', '0'), ('is_module', '0'),
+            ('id_tax_rules_group', '1'), ('id_reference', '2'),
+            ('name', u'My carrier'), ('active', '1'), ('is_free', '0'),
+            ('url', ''), ('shipping_handling', '1'),
+            ('shipping_external', '0'), ('range_behavior', '0'),
+            ('shipping_method', '1'), ('max_width', '0'),
+            ('max_height', '0'), ('max_depth', '0'),
+            ('max_weight', '0.000000'), ('grade', '0'),
+            ('external_module_name', ''), ('need_range', '0'),
+            ('position', '1'),
+            ('delay', self.translated(lambda __: u'Delivery next day!')),
+        ])
+        for state_id, name, paid in ORDER_STATES:
+            add('order_states', [
+                ('id', state_id), ('unremovable', '1'), ('delivery', '0'),
+                ('hidden', '0'), ('send_email', '0'), ('module_name', ''),
+                ('invoice', paid), ('color', '#32CD32'), ('logable', paid),
+                ('shipped', '0'), ('paid', paid), ('pdf_delivery', '0'),
+                ('pdf_invoice', paid), ('deleted', '0'),
+                ('name', self.translated(lambda __: name)),
+                ('template', self.translated(lambda __: u'')),
+            ])
+        add('taxes', [
+            ('id', 1), ('rate', '20.000'), ('active', '1'), ('deleted', '0'),
+            ('name', self.translated(lambda __: u'VAT 20%')),
+        ])
+        add('tax_rule_groups', [
+            ('id', 1), ('name', u'Standard Rate (20%)'), ('active', '1'),
+            ('deleted', '0'), ('date_add', self.date(0, 1)),
+            ('date_upd', self.date(0, 1)),
+        ])
+
+    def categories(self):
+        """ Tree of categories: root (1), home (2) and the generated
+        levels below the home """
+        self.leaf_categories = []
+        self.category_parents = {}
+        children = {}
+        levels = [[(1, 0)], [(2, 1)]]
+        next_id = 3
+        for __ in range(self.category_depth):
+            level = []
+            for parent_id, __ in levels[-1]:
+                for __ in range(self.category_children):
+                    level.append((next_id, parent_id))
+                    next_id += 1
+            levels.append(level)
+        count = next_id - 1
+        self.category_products = {}
+        for depth, level in enumerate(levels):
+            for category_id, parent_id in level:
+                self.category_parents[category_id] = parent_id
+                children.setdefault(parent_id, []).append(category_id)
+                self.category_products[category_id] = []
+                if depth == len(levels) - 1 and depth > 1:
+                    self.leaf_categories.append(category_id)
+        if not self.leaf_categories:
+            self.leaf_categories = [2]
+        self.category_levels = levels
+        self.category_children_ids = children
+        self.category_count = count
+
+    def add_categories(self):
+        """ Add the categories once their products are known """
+        for depth, level in enumerate(self.category_levels):
+            for category_id, parent_id in level:
+                name = self.translated(
+                    lambda lang_index: self.text(lang_index, 2).title())
+                self.dataset.add('categories', [
+                    ('id', category_id),
+                    ('id_parent', str(parent_id)),
+                    ('level_depth', str(depth)),
+                    ('nb_products_recursive',
+                     {'attrs': {'notFilterable': 'true'}, 'value': '0'}),
+                    ('active', '1'),
+                    ('id_shop_default', '1'),
+                    ('is_root_category', '1' if category_id == 2 else '0'),
+                    ('position', '0'),
+                    ('date_add', self.date(category_id, self.category_count)),
+                    ('date_upd', self.date(category_id, self.category_count)),
+                    ('name', name),
+                    ('link_rewrite', self.translated(
+                        lambda lang_index, name=name: '%s-%d' % (
+                            name['language'][lang_index]['value'].lower()
+                            .replace(' ', '-'), category_id))),
+                    ('description', self.translated(self.html)),
+                    ('meta_title', self.translated(lambda __: u'')),
+                    ('meta_description', self.translated(lambda __: u'')),
+                    ('meta_keywords', self.translated(lambda __: u'')),
+                    ('associations', {
+                        'categories': association(
+                            'categories', 'category',
+                            self.category_children_ids.get(category_id, [])),
+                        'products': association(
+                            'products', 'product',
+                            self.category_products[category_id]),
+                    }),
+                ])
+
+    def options(self):
+        """ Option groups and their values """
+        self.option_value_ids = []
+        for group_index in range(self.option_groups):
+            group_id = group_index + 1
+            group_name = OPTION_GROUPS[group_index]
+            is_color = group_name == u'Color'
+            value_ids = []
+            for position in range(self.option_values):
+                value = self.dataset.add('product_option_values', [
+                    ('id_attribute_group', str(group_id)),
+                    ('color', '#%06x' % self.random.randrange(1 << 24)
+                     if is_color else ''),
+                    ('position', str(position)),
+                    ('name', self.translated(
+                        lambda __, position=position: u'%s %d' % (
+                            group_name, position + 1))),
+                ])
+                value_ids.append(value['id'])
+            self.option_value_ids.append(value_ids)
+            self.dataset.add('product_options', [
+                ('id', group_id),
+                ('is_color_group', '1' if is_color else '0'),
+                ('group_type', 'color' if is_color else 'select'),
+                ('position', str(group_index)),
+                ('name', self.translated(lambda __: group_name)),
+                ('public_name', self.translated(lambda __: group_name)),
+                ('associations', {'product_option_values': association(
+                    'product_option_values', 'product_option_value',
+                    value_ids)}),
+            ])
+
+    def stock(self, product_id, combination_id):
+        return self.dataset.add('stock_availables', [
+            ('id_product', str(product_id)),
+            ('id_product_attribute', str(combination_id)),
+            ('id_shop', '1'),
+            ('id_shop_group', '0'),
+            ('quantity', str(self.random.randint(0, self.max_stock))),
+            ('depends_on_stock', '0'),
+            ('out_of_stock', '2'),
+        ])
+
+    def catalog(self):
+        """ Products with their combinations, images and stock """
+        rnd = self.random
+        all_values = list(itertools.product(*self.option_value_ids))
+        self.product_combinations = {}
+        for product_id in range(1, self.products + 1):
+            date = self.date(product_id, self.products)
+            category_id = rnd.choice(self.leaf_categories)
+            category_ids = [category_id]
+            while self.category_parents[category_ids[0]] > 1:
+                category_ids.insert(0, self.category_parents[category_ids[0]])
+            self.category_products[category_id].append(product_id)
+            image_ids = []
+            for __ in range(self.images):
+                image_id = len(self.dataset.images) + 1
+                self.dataset.images[('products', str(product_id),
+                                     str(image_id))] = (
+                    'image/jpeg' if image_id % 2 else 'image/png',
+                    png(16, 16, (rnd.randrange(256), rnd.randrange(256),
+                                 rnd.randrange(256))),
+                )
+                image_ids.append(image_id)
+            price = rnd.uniform(5, 300)
+            stock_ids = [(self.stock(product_id, 0)['id'], '0')]
+            combination_ids = []
+            option_values = set()
+            for index, values in enumerate(
+                    rnd.sample(all_values, self.combinations)):
+                option_values.update(values)
+                combination = self.dataset.add('combinations', [
+                    ('id_product', str(product_id)),
+                    ('location', ''),
+                    ('ean13', self.ean13(product_id * 1000 + index + 1)),
+                    ('upc', ''),
+                    ('quantity', '0'),
+                    ('reference', 'REF%d-%d' % (product_id, index + 1)),
+                    ('supplier_reference', ''),
+                    ('wholesale_price', '0.000000'),
+                    ('price', self.amount(rnd.choice((0, 0, 1, 2.5, 5)))),
+                    ('ecotax', '0.000000'),
+                    ('weight', self.amount(rnd.choice((0, 0.1, 0.2)))),
+                    ('unit_price_impact', '0.000000'),
+                    ('minimal_quantity', '1'),
+                    ('default_on', '1' if index == 0 else '0'),
+                    ('available_date', '0000-00-00'),
+                    ('associations', {
+                        'product_option_values': association(
+                            'product_option_values', 'product_option_value',
+                            values),
+                        'images': association(
+                            'images/products', 'image',
+                            image_ids[index % len(image_ids):][:1]
+                            if image_ids else []),
+                    }),
+                ])
+                combination_ids.append(combination['id'])
+                stock_ids.append((self.stock(product_id,
+                                             combination['id'])['id'],
+                                  combination['id']))
+            self.product_combinations[product_id] = combination_ids or ['0']
+            name = self.translated(
+                lambda lang_index: self.text(lang_index, 3).capitalize())
+            default_combination = (combination_ids[0] if combination_ids
+                                   else '0')
+            self.dataset.add('products', [
+                ('id', product_id),
+                ('id_manufacturer', '0'),
+                ('id_supplier', '0'),
+                ('id_category_default', str(category_id)),
+                ('new', ''),
+                ('cache_default_attribute', default_combination),
+                ('id_default_image',
+                 {'attrs': {'notFilterable': 'true'},
+                  'value': str(image_ids[0]) if image_ids else ''}),
+                ('id_default_combination',
+                 {'attrs': {'notFilterable': 'true'},
+                  'value': default_combination}),
+                ('id_tax_rules_group', '1'),
+                ('type', {'attrs': {'notFilterable': 'true'},
+                          'value': 'simple'}),
+                ('id_shop_default', '1'),
+                ('reference', 'REF%d' % product_id),
+                ('supplier_reference', ''),
+                ('location', ''),
+                ('width', '0.000000'),
+                ('height', '0.000000'),
+                ('depth', '0.000000'),
+                ('weight', self.amount(rnd.uniform(0.1, 5))),
+                ('quantity_discount', '0'),
+                ('ean13', self.ean13(product_id * 1000)),
+                ('upc', ''),
+                ('cache_is_pack', '0'),
+                ('cache_has_attachments', '0'),
+                ('is_virtual', '0'),
+                ('on_sale', '1' if rnd.random() < 0.1 else '0'),
+                ('online_only', '0'),
+                ('ecotax', '0.000000'),
+                ('minimal_quantity', '1'),
+                ('price', self.amount(price)),
+                ('wholesale_price', self.amount(price * 0.4)),
+                ('unity', ''),
+                ('unit_price_ratio', '0.000000'),
+                ('additional_shipping_cost', '0.00'),
+                ('customizable', '0'),
+                ('text_fields', '0'),
+                ('uploadable_files', '0'),
+                ('active', '1' if rnd.random() < 0.95 else '0'),
+                ('redirect_type', '404'),
+                ('id_product_redirected', '0'),
+                ('available_for_order', '1'),
+                ('available_date', '0000-00-00'),
+                ('condition', 'new'),
+                ('show_price', '1'),
+                ('indexed', '1'),
+                ('visibility', 'both'),
+                ('advanced_stock_management', '0'),
+                ('date_add', date),
+                ('date_upd', date),
+                ('pack_stock_type', '3'),
+                ('meta_description', self.translated(lambda __: u'')),
+                ('meta_keywords', self.translated(lambda __: u'')),
+                ('meta_title', self.translated(lambda __: u'')),
+                ('link_rewrite', self.translated(
+                    lambda lang_index: u'product-%d' % product_id)),
+                ('name', name),
+                ('description', self.translated(self.html)),
+                ('description_short', self.translated(
+                    lambda lang_index: u'<p>%s</p>' % self.text(lang_index,
+                                                                15))),
+                ('available_now', self.translated(
+                    lambda lang_index: self.text(lang_index, 2))),
+                ('available_later', self.translated(lambda __: u'')),
+                ('associations', {
+                    'categories': association('categories', 'category',
+                                              category_ids),
+                    'images': association('images', 'image', image_ids),
+                    'combinations': association('combinations',
+                                                'combination',
+                                                combination_ids),
+                    'product_option_values': association(
+                        'product_option_values', 'product_option_value',
+                        sorted(option_values, key=int)),
+                    'product_features': association(
+                        'product_features', 'product_feature', []),
+                    'tags': association('tags', 'tag', []),
+                    'stock_availables': {
+                        'attrs': {'api': 'stock_availables',
+                                  'nodeType': 'stock_available'},
+                        'stock_available': [
+                            {'id': stock_id,
+                             'id_product_attribute': attribute_id}
+                            for stock_id, attribute_id in stock_ids
+                        ],
+                    },
+                    'accessories': association('products', 'product', []),
+                    'product_bundle': association('products', 'product',
+                                                  []),
+                }),
+            ])
+        self.add_categories()
+
+    def customers_addresses(self):
+        """ Customers with their addresses """
+        rnd = self.random
+        self.customer_addresses = {}
+        for customer_id in range(1, self.customers + 1):
+            date = self.date(customer_id, self.customers)
+            firstname = self.text(0, 1).capitalize()
+            lastname = self.text(0, 1).upper()
+            self.dataset.add('customers', [
+                ('id', customer_id),
+                ('id_default_group', '3'),
+                ('id_lang', str(rnd.randint(1, len(self.languages)))),
+                ('newsletter_date_add', '0000-00-00 00:00:00'),
+                ('ip_registration_newsletter', ''),
+                ('last_passwd_gen', date),
+                ('secure_key', '%032x' % rnd.getrandbits(128)),
+                ('deleted', '0'),
+                ('passwd', '%032x' % rnd.getrandbits(128)),
+                ('lastname', lastname),
+                ('firstname', firstname),
+                ('email', 'customer%d@example.com' % customer_id),
+                ('id_gender', str(rnd.randint(1, 2))),
+                ('birthday', '19%02d-%02d-%02d' % (rnd.randint(40, 99),
+                                                   rnd.randint(1, 12),
+                                                   rnd.randint(1, 28))),
+                ('newsletter', str(rnd.randint(0, 1))),
+                ('optin', '0'),
+                ('website', ''),
+                ('company', ''),
+                ('siret', ''),
+                ('ape', ''),
+                ('outstanding_allow_amount', '0.000000'),
+                ('show_public_prices', '0'),
+                ('id_risk', '0'),
+                ('max_payment_days', '0'),
+                ('active', '1'),
+                ('note', ''),
+                ('is_guest', '0'),
+                ('id_shop', '1'),
+                ('id_shop_group', '1'),
+                ('date_add', date),
+                ('date_upd', date),
+                ('associations', {'groups': association('groups', 'group',
+                                                        [3])}),
+            ])
+            address_ids = []
+            for index in range(self.addresses):
+                country_id = rnd.choice(COUNTRIES)[0]
+                address = self.dataset.add('addresses', [
+                    ('id_customer', str(customer_id)),
+                    ('id_manufacturer', '0'),
+                    ('id_supplier', '0'),
+                    ('id_warehouse', '0'),
+                    ('id_country', str(country_id)),
+                    ('id_state', '0'),
+                    ('alias', u'Address %d' % (index + 1)),
+                    ('company', ''),
+                    ('lastname', lastname),
+                    ('firstname', firstname),
+                    ('vat_number', ''),
+                    ('address1', u'%d, %s' % (rnd.randint(1, 200),
+                                              self.text(0, 2).title())),
+                    ('address2', ''),
+                    ('postcode', '%05d' % rnd.randint(1000, 99999)),
+                    ('city', self.text(0, 1).capitalize()),
+                    ('other', ''),
+                    ('phone', '0%09d' % rnd.randint(0, 10 ** 9 - 1)),
+                    ('phone_mobile', ''),
+                    ('dni', ''),
+                    ('deleted', '0'),
+                    ('date_add', date),
+                    ('date_upd', date),
+                ])
+                address_ids.append(address['id'])
+            self.customer_addresses[customer_id] = address_ids
+
+    def sale_orders(self):
+        """ Orders with their details, discounts and payments """
+        rnd = self.random
+        add = self.dataset.add
+        products = self.dataset.records('products')
+        if not products or not self.customers:
+            return
+        for order_id in range(1, self.orders + 1):
+            date = self.date(order_id, self.orders)
+            customer_id = rnd.randint(1, self.customers)
+            address_id = rnd.choice(self.customer_addresses[customer_id])
+            lang_id = rnd.randint(1, len(self.languages))
+            reference = ''.join(rnd.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+                                for __ in range(9))
+            rows = []
+            total = 0.0
+            for product in rnd.sample(products,
+                                      min(self.order_lines, len(products))):
+                product_id = int(product['id'])
+                attribute_id = rnd.choice(
+                    self.product_combinations[product_id])
+                quantity = rnd.randint(1, 3)
+                unit_price = float(product['price'])
+                total += unit_price * quantity
+                product_name = product['name']['language'][
+                    lang_id - 1]['value']
+                detail = add('order_details', [
+                    ('id_order', str(order_id)),
+                    ('product_id', product['id']),
+                    ('product_attribute_id', str(attribute_id)),
+                    ('product_quantity_reinjected', '0'),
+                    ('group_reduction', '0.00'),
+                    ('discount_quantity_applied', '0'),
+                    ('download_hash', ''),
+                    ('download_deadline', '0000-00-00 00:00:00'),
+                    ('id_order_invoice', '0'),
+                    ('id_warehouse', '0'),
+                    ('id_shop', '1'),
+                    ('product_name', product_name),
+                    ('product_quantity', str(quantity)),
+                    ('product_quantity_in_stock', str(quantity)),
+                    ('product_quantity_return', '0'),
+                    ('product_quantity_refunded', '0'),
+                    ('product_price', product['price']),
+                    ('reduction_percent', '0.00'),
+                    ('reduction_amount', '0.000000'),
+                    ('reduction_amount_tax_incl', '0.000000'),
+                    ('reduction_amount_tax_excl', '0.000000'),
+                    ('product_quantity_discount', '0.000000'),
+                    ('product_ean13', product['ean13']),
+                    ('product_upc', ''),
+                    ('product_reference', product['reference']),
+                    ('product_supplier_reference', ''),
+                    ('product_weight', product['weight']),
+                    ('tax_computation_method', '0'),
+                    ('id_tax_rules_group', '1'),
+                    ('ecotax', '0.000000'),
+                    ('ecotax_tax_rate', '0.000'),
+                    ('download_nb', '0'),
+                    ('unit_price_tax_incl', product['price']),
+                    ('unit_price_tax_excl', product['price']),
+                    ('total_price_tax_incl',
+                     self.amount(unit_price * quantity)),
+                    ('total_price_tax_excl',
+                     self.amount(unit_price * quantity)),
+                    ('total_shipping_price_tax_excl', '0.000000'),
+                    ('total_shipping_price_tax_incl', '0.000000'),
+                    ('purchase_supplier_price', '0.000000'),
+                    ('original_product_price', product['price']),
+                    ('original_wholesale_price', product['wholesale_price']),
+                ])
+                rows.append({
+                    'id': detail['id'],
+                    'product_id': product['id'],
+                    'product_attribute_id': str(attribute_id),
+                    'product_quantity': str(quantity),
+                    'product_name': product_name,
+                    'product_reference': product['reference'],
+                    'product_ean13': product['ean13'],
+                    'product_upc': '',
+                    'product_price': product['price'],
+                    'unit_price_tax_incl': product['price'],
+                    'unit_price_tax_excl': product['price'],
+                })
+            discount = 0.0
+            if rnd.random() < self.discount_ratio:
+                discount = round(total * rnd.choice((0.05, 0.1, 0.2)), 2)
+                add('order_discounts', [
+                    ('id_order', str(order_id)),
+                    ('id_cart_rule', str(rnd.randint(1, 5))),
+                    ('id_order_invoice', '0'),
+                    ('name', u'Voucher %d%%' % round(discount * 100 / total)),
+                    ('value', self.amount(discount)),
+                    ('value_tax_excl', self.amount(discount)),
+                    ('free_shipping', '0'),
+                ])
+            shipping = rnd.choice((0.0, 2.0, 7.0))
+            paid = total - discount + shipping
+            state = rnd.choice(ORDER_STATES)
+            if rnd.random() < self.paid_ratio:
+                add('order_payments', [
+                    ('order_reference', reference),
+                    ('id_currency', '1'),
+                    ('amount', self.amount(paid)),
+                    ('payment_method', u'Bank wire'),
+                    ('conversion_rate', '1.000000'),
+                    ('transaction_id', ''),
+                    ('card_number', ''),
+                    ('card_brand', ''),
+                    ('card_expiration', ''),
+                    ('card_holder', ''),
+                    ('date_add', date),
+                ])
+            add('orders', [
+                ('id', order_id),
+                ('id_address_delivery', address_id),
+                ('id_address_invoice', address_id),
+                ('id_cart', str(order_id)),
+                ('id_currency', '1'),
+                ('id_lang', str(lang_id)),
+                ('id_customer', str(customer_id)),
+                ('id_carrier', '2'),
+                ('current_state', str(state[0])),
+                ('module', 'bankwire'),
+                ('invoice_number', '0'),
+                ('invoice_date', '0000-00-00 00:00:00'),
+                ('delivery_number', '0'),
+                ('delivery_date', '0000-00-00 00:00:00'),
+                ('valid', state[2]),
+                ('date_add', date),
+                ('date_upd', date),
+                ('shipping_number',
+                 {'attrs': {'notFilterable': 'true'}, 'value': ''}),
+                ('id_shop_group', '1'),
+                ('id_shop', '1'),
+                ('secure_key', '%032x' % rnd.getrandbits(128)),
+                ('payment', u'Bank wire'),
+                ('recyclable', '0'),
+                ('gift', '0'),
+                ('gift_message', ''),
+                ('mobile_theme', '0'),
+                ('total_discounts', self.amount(discount)),
+                ('total_discounts_tax_incl', self.amount(discount)),
+                ('total_discounts_tax_excl', self.amount(discount)),
+                ('total_paid', self.amount(paid)),
+                ('total_paid_tax_incl', self.amount(paid)),
+                ('total_paid_tax_excl', self.amount(paid)),
+                ('total_paid_real', '0.000000'),
+                ('total_products', self.amount(total)),
+                ('total_products_wt', self.amount(total)),
+                ('total_shipping', self.amount(shipping)),
+                ('total_shipping_tax_incl', self.amount(shipping)),
+                ('total_shipping_tax_excl', self.amount(shipping)),
+                ('carrier_tax_rate', '0.000'),
+                ('total_wrapping', '0.000000'),
+                ('total_wrapping_tax_incl', '0.000000'),
+                ('total_wrapping_tax_excl', '0.000000'),
+                ('round_mode', '0'),
+                ('round_type', '0'),
+                ('conversion_rate', '1.000000'),
+                ('reference', reference),
+                ('associations', {'order_rows': {
+                    'attrs': {'nodeType': 'order_row',
+                              'virtualEntity': 'true'},
+                    'order_row': rows,
+                }}),
+            ])
+        if not self.dataset.count('order_discounts'):
+            self.dataset.declare('order_discounts', [
+                'id_order', 'id_cart_rule', 'id_order_invoice', 'name',
+                'value', 'value_tax_excl', 'free_shipping'])
+        if not self.dataset.count('order_payments'):
+            self.dataset.declare('order_payments', [
+                'order_reference', 'id_currency', 'amount',
+                'payment_method', 'date_add'])
+
+
+def generate(scenario=None, **options):
+    """ Generate a dataset
+
+    :param scenario: name of a scenario of :data:`SCENARIOS` giving the
+                     default options
+    :param options: options of :class:`DatasetGenerator`
+    """
+    if scenario:
+        options = dict(SCENARIOS[scenario], **options)
+    return DatasetGenerator(**options).generate()
@@ -0,0 +1,628 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+""" WSGI application behaving like the webservice of PrestaShop
+
+The records are served from a :class:`~.dataset.Dataset`, the listings
+honour ``filter[...]``, ``display``, ``sort`` and ``limit`` as PrestaShop
+does, and the records can be modified with PUT, POST and DELETE. The
+latency of the responses and errors can be injected to reproduce a slow
+or overloaded shop.
+"""
+
+import collections
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urlparse
+from contextlib import contextmanager
+from SocketServer import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+from xml.sax.saxutils import quoteattr
+
+try:
+    from prestapyt.xml2dict import xml2dict
+except ImportError:
+    pass
+
+PSWS_VERSION = '1.6.1.9'
+
+XML_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+              '<prestashop xmlns:xlink="http://www.w3.org/1999/xlink">\n')
+XML_FOOTER = '</prestashop>\n'
+
+HTTP_STATUS = {
+    200: '200 OK',
+    201: '201 Created',
+    304: '304 Not Modified',
+    400: '400 Bad Request',
+    401: '401 Unauthorized',
+    404: '404 Not Found',
+    405: '405 Method Not Allowed',
+    429: '429 Too Many Requests',
+    500: '500 Internal Server Error',
+    502: '502 Bad Gateway',
+    503: '503 Service Unavailable',
+    504: '504 Gateway Timeout',
+}
+
+
+class WebserviceError(Exception):
+    """ Error answered to the client with the format of PrestaShop """
+
+    def __init__(self, status, code, message):
+        super(WebserviceError, self).__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def _cdata(value):
+    if not value:
+        return ''
+    return '<![CDATA[%s]]>' % value.replace(']]>', ']]]]><![CDATA[>')
+
+
+def _xml_node(tag, value, indent):
+    """ XML of a value having the structure given by ``xml2dict`` """
+    if isinstance(value, list):
+        return ''.join(_xml_node(tag, item, indent) for item in value)
+    attrs = ''
+    if isinstance(value, dict):
+        attrs = ''.join(' %s=%s' % (name, quoteattr(attr_value))
+                        for name, attr_value
+                        in sorted(value.get('attrs', {}).iteritems()))
+        children = [(key, child) for key, child in value.iteritems()
+                    if key not in ('attrs', 'value')]
+        if children:
+            inner = ''.join(_xml_node(key, child, indent + '\t')
+                            for key, child in children)
+            return '%s<%s%s>\n%s%s</%s>\n' % (indent, tag, attrs, inner,
+                                              indent, tag)
+        value = value.get('value', '')
+    if not isinstance(value, basestring):
+        value = unicode(value)
+    return '%s<%s%s>%s</%s>\n' % (indent, tag, attrs, _cdata(value), tag)
+
+
+def record_xml(node, record, fields):
+    """ XML of the ``fields`` of a record """
+    inner = ''.join(_xml_node(field, record[field], '\t')
+                    for field in fields if field in record)
+    return '<%s>\n%s</%s>\n' % (node, inner, node)
+
+
+def _json_value(value):
+    """ Value of a field as in the JSON output of PrestaShop """
+    if isinstance(value, basestring):
+        return value
+    if 'language' in value:
+        languages = value['language']
+        if isinstance(languages, dict):
+            languages = [languages]
+        return [{'id': language['attrs']['id'],
+                 'value': language.get('value', '')}
+                for language in languages]
+    if 'value' in value:
+        return value['value']
+    # associations
+    result = {}
+    for name, association in value.iteritems():
+        elements = [elements for key, elements in association.iteritems()
+                    if key not in ('attrs', 'value')]
+        elements = elements[0] if elements else []
+        if isinstance(elements, dict):
+            elements = [elements]
+        result[name] = elements
+    return result
+
+
+def record_json(record, fields):
+    return collections.OrderedDict(
+        (field, _json_value(record[field])) for field in fields
+        if field in record
+    )
+
+
+def field_values(record, field):
+    """ Values of a field of a record compared by the filters
+
+    The values of a translatable field are its values in every language.
+    """
+    value = record.get(field, '')
+    if isinstance(value, basestring):
+        return [value]
+    if 'language' in value:
+        languages = value['language']
+        if isinstance(languages, dict):
+            languages = [languages]
+        return [language.get('value', '') for language in languages]
+    return [value.get('value', '')]
+
+
+def _sort_key(value):
+    """ Compare numbers as numbers and texts without case, as MySQL """
+    try:
+        return (0, float(value), '')
+    except ValueError:
+        return (1, 0, value.lower())
+
+
+def _like_matcher(pattern):
+    regex = ''.join('.*' if char == '%' else '.' if char == '_'
+                    else re.escape(char) for char in pattern)
+    regex = re.compile('^%s$' % regex, re.I | re.S)
+    return lambda value: bool(regex.match(value))
+
+
+def parse_filter(expression):
+    """ Return a function telling if a value matches a filter
+
+    The filters have the syntax of PrestaShop:
+
+    * ``[1|5]``: one of the values
+    * ``[1,10]``: interval
+    * ``>[5]``, ``<[5]``: greater or lower than the value
+    * ``[John]%``, ``%[John]``, ``%[John]%``: begins, ends with or
+      contains the value
+    * ``John``: SQL ``LIKE`` expression
+    """
+    match = re.match(r'^([<>]?)(%?)\[(.*)\](%?)$', expression, re.S)
+    if not match:
+        return _like_matcher(expression)
+    operator, before, inner, after = match.groups()
+    if operator == '>':
+        key = _sort_key(inner)
+        return lambda value: _sort_key(value) > key
+    if operator == '<':
+        key = _sort_key(inner)
+        return lambda value: _sort_key(value) < key
+    if before or after:
+        regex = re.compile('%s%s%s' % ('' if before else '^',
+                                       re.escape(inner),
+                                       '' if after else '$'), re.I | re.S)
+        return lambda value: bool(regex.search(value))
+    if '|' in inner:
+        keys = set(_sort_key(item) for item in inner.split('|'))
+        return lambda value: _sort_key(value) in keys
+    if ',' in inner:
+        low, high = [_sort_key(item) for item in inner.split(',', 1)]
+        return lambda value: low <= _sort_key(value) <= high
+    key = _sort_key(inner)
+    return lambda value: _sort_key(value) == key
+
+
+def parse_limit(limit):
+    """ Return the offset and the number of records of a ``limit`` """
+    try:
+        parts = [int(part) for part in limit.split(',')]
+    except ValueError:
+        raise WebserviceError(400, 33, 'Invalid limit: %s' % limit)
+    if len(parts) == 1:
+        return 0, parts[0]
+    return parts[0], parts[1]
+
+
+def parse_display(display):
+    """ Return the fields to display, None for all the fields """
+    if display == 'full':
+        return None
+    match = re.match(r'^\[(.*)\]$', display)
+    if not match:
+        raise WebserviceError(400, 35, 'Invalid display: %s' % display)
+    return [field.strip() for field in match.group(1).split(',')]
+
+
+def parse_sort(sort):
+    """ Return the list of (field, descending) of a ``sort`` """
+    match = re.match(r'^\[(.*)\]$', sort)
+    if not match:
+        raise WebserviceError(400, 37, 'Invalid sort: %s' % sort)
+    orders = []
+    for item in match.group(1).split(','):
+        field, __, direction = item.strip().rpartition('_')
+        if direction not in ('ASC', 'DESC') or not field:
+            raise WebserviceError(400, 37, 'Invalid sort: %s' % sort)
+        orders.append((field, direction == 'DESC'))
+    return orders
+
+
+class FakePrestaShop(object):
+    """ WSGI application serving a dataset like the PrestaShop webservice
+
+    :param dataset: records served, see :class:`~.dataset.Dataset`
+    :param webservice_key: key expected in the basic authentication,
+                           any key is accepted when None
+    :param latency: number of seconds added to each response
+    :param latency_jitter: maximum number of seconds randomly added to
+                           the latency
+    :param error_rate: ratio of the requests answering an error
+    :param error_codes: HTTP status codes of the injected errors
+    :param etags: whether the records are sent with an ``ETag`` and the
+                  conditional requests are honoured, as done by a cache
+                  in front of PrestaShop
+    :param seed: seed of the random latency and errors
+    """
+
+    def __init__(self, dataset, webservice_key=None, latency=0,
+                 latency_jitter=0, error_rate=0, error_codes=(503,),
+                 etags=False, seed=None):
+        self.dataset = dataset
+        self.webservice_key = webservice_key
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_codes = error_codes
+        self.etags = etags
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        # number of requests per (method, resource)
+        self.calls = collections.Counter()
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO', '')
+        query = urlparse.parse_qs(environ.get('QUERY_STRING', ''),
+                                  keep_blank_values=True)
+        query = dict((key, values[-1]) for key, values in query.iteritems())
+        parts = [part for part in path.split('/') if part]
+        if parts and parts[0] == 'api':
+            parts = parts[1:]
+        with self.lock:
+            self.calls[(method, parts[0] if parts else '')] += 1
+            delay = self.latency
+            if self.latency_jitter:
+                delay += self.random.uniform(0, self.latency_jitter)
+            error = (self.error_rate and
+                     self.random.random() < self.error_rate)
+            error_code = self.random.choice(self.error_codes)
+        if delay:
+            time.sleep(delay)
+        headers = [('psws-version', PSWS_VERSION),
+                   ('x-powered-by', 'PrestaShop Webservice')]
+        try:
+            if error:
+                raise WebserviceError(error_code, 0, 'Injected error')
+            if not self._authorized(environ):
+                raise WebserviceError(401, 17, 'Unauthorized')
+            status, content_type, body = self.dispatch(
+                method, parts, query, environ, headers)
+        except WebserviceError as err:
+            status = err.status
+            content_type = 'text/xml;charset=utf-8'
+            body = self._error_body(err, query)
+        if isinstance(body, unicode):
+            body = body.encode('utf-8')
+        if status != 304:
+            headers.append(('Content-Type', content_type))
+            headers.append(('Content-Length', str(len(body))))
+        start_response(HTTP_STATUS.get(status, str(status)), headers)
+        if method == 'HEAD' or status == 304:
+            return []
+        return [body]
+
+    def _authorized(self, environ):
+        if self.webservice_key is None:
+            return True
+        auth = environ.get('HTTP_AUTHORIZATION', '')
+        if not auth.startswith('Basic '):
+            return False
+        key = auth[6:].strip().decode('base64').split(':', 1)[0]
+        return key == self.webservice_key
+
+    @staticmethod
+    def _json_output(query):
+        return query.get('output_format', '').upper() == 'JSON'
+
+    def _error_body(self, err, query):
+        if self._json_output(query):
+            return json.dumps({'errors': [{'code': err.code,
+                                           'message': err.message}]})
+        return (XML_HEADER +
+                '<errors>\n<error>\n<code>%s</code>\n'
+                '<message>%s</message>\n</error>\n</errors>\n' % (
+                    _cdata(str(err.code)), _cdata(err.message)) +
+                XML_FOOTER)
+
+    def _body(self, query, data):
+        """ Body of a response in XML or JSON, ``data`` is a function
+        returning the content for the requested output """
+        if self._json_output(query):
+            return 'application/json', json.dumps(data(True))
+        return 'text/xml;charset=utf-8', XML_HEADER + data(False) + XML_FOOTER
+
+    def dispatch(self, method, parts, query, environ, headers):
+        """ Answer a request, return the status, content type and body """
+        if method not in ('GET', 'HEAD', 'PUT', 'POST', 'DELETE'):
+            raise WebserviceError(405, 22, 'Method not allowed')
+        if not parts:
+            return self.api_root(environ)
+        resource = parts[0]
+        if resource == 'images':
+            if method not in ('GET', 'HEAD'):
+                raise WebserviceError(405, 22, 'Method not allowed')
+            return self.image(parts[1:], environ)
+        if resource not in self.dataset.resources():
+            raise WebserviceError(
+                400, 20, 'Resource of type "%s" not found' % resource)
+        if len(parts) > 2:
+            raise WebserviceError(400, 21, 'Invalid URL')
+        record_id = parts[1] if len(parts) == 2 else None
+        if method in ('GET', 'HEAD'):
+            if record_id is None:
+                return self.listing(resource, query, environ)
+            return self.read(resource, record_id, query, environ, headers)
+        if method == 'DELETE':
+            return self.delete(resource, record_id, query)
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        content = environ['wsgi.input'].read(length)
+        if not content and 'xml' in query:
+            content = query['xml']
+        return self.write(method, resource, record_id, content, query)
+
+    def _url(self, environ, *parts):
+        return '%s://%s/api/%s' % (environ['wsgi.url_scheme'],
+                                   environ['HTTP_HOST'] if 'HTTP_HOST'
+                                   in environ else environ['SERVER_NAME'],
+                                   '/'.join(str(part) for part in parts))
+
+    def api_root(self, environ):
+        inner = ''.join(
+            '<%s xlink:href=%s get="true" put="true" post="true" '
+            'delete="true" head="true">\n'
+            '<description xlink:href=%s get="true" put="true" '
+            'post="true" delete="true" head="true">%s</description>\n'
+            '</%s>\n' % (resource,
+                         quoteattr(self._url(environ, resource)),
+                         quoteattr(self._url(environ, resource)),
+                         resource, resource)
+            for resource in sorted(self.dataset.resources())
+        )
+        body = (XML_HEADER + '<api shopName="Fake PrestaShop">\n' + inner +
+                '</api>\n' + XML_FOOTER)
+        return 200, 'text/xml;charset=utf-8', body
+
+    def _check_fields(self, resource, fields, purpose):
+        known = self.dataset.fields(resource)
+        for field in fields:
+            if field not in known:
+                raise WebserviceError(
+                    400, 34 if purpose == 'filter' else 35,
+                    'Unable to %s by this field. However, these are '
+                    'available: %s' % (purpose, ', '.join(known)))
+
+    def search(self, resource, query):
+        """ Return the records of a listing matching its options """
+        filters = []
+        for key, expression in query.iteritems():
+            match = re.match(r'^filter\[(\w+)\]$', key)
+            if match:
+                filters.append((match.group(1), parse_filter(expression)))
+        self._check_fields(resource, [field for field, __ in filters],
+                           'filter')
+        with self.lock:
+            records = [
+                record for record in self._candidates(resource, query)
+                if all(any(matcher(value)
+                           for value in field_values(record, field))
+                       for field, matcher in filters)
+            ]
+        if 'sort' in query:
+            orders = parse_sort(query['sort'])
+            self._check_fields(resource, [field for field, __ in orders],
+                               'sort')
+            # successive stable sorts, from the last criteria
+            for field, descending in reversed(orders):
+                records.sort(
+                    key=lambda record: _sort_key(
+                        field_values(record, field)[0]),
+                    reverse=descending,
+                )
+        if 'limit' in query:
+            offset, count = parse_limit(query['limit'])
+            records = records[offset:offset + count]
+        return records
+
+    def _candidates(self, resource, query):
+        """ Records possibly matching the filters, the filters on the
+        ids are resolved with the index of the ids """
+        expression = query.get('filter[id]', '')
+        match = re.match(r'^\[([\d|]+)\]$', expression)
+        if match:
+            ids = sorted(set(int(record_id) for record_id
+                             in match.group(1).split('|')))
+            records = [self.dataset.get(resource, record_id)
+                       for record_id in ids]
+            return [record for record in records if record is not None]
+        match = re.match(r'^>\[(\d+)\]$', expression)
+        if match:
+            return self.dataset.records_from(resource, match.group(1))
+        return self.dataset.records(resource)
+
+    def listing(self, resource, query, environ):
+        if query.get('schema'):
+            return self.schema(resource, query)
+        records = self.search(resource, query)
+        node = self.dataset.node(resource)
+        listing_node = self.dataset.listing_node(resource)
+        fields = self.dataset.fields(resource)
+        display = query.get('display')
+        if display:
+            displayed = parse_display(display)
+            if displayed is not None:
+                self._check_fields(resource, displayed, 'display')
+                fields = [field for field in fields if field in displayed]
+
+        def data(json_output):
+            if json_output:
+                if not records:
+                    return []
+                if not display:
+                    return {listing_node: [{'id': int(record['id'])}
+                                           for record in records]}
+                return {listing_node: [record_json(record, fields)
+                                       for record in records]}
+            if not display:
+                inner = ''.join(
+                    '<%s id="%s" xlink:href=%s/>\n' % (
+                        node, record['id'],
+                        quoteattr(self._url(environ, resource,
+                                            record['id'])))
+                    for record in records
+                )
+            else:
+                inner = ''.join(record_xml(node, record, fields)
+                                for record in records)
+            return '<%s>\n%s</%s>\n' % (listing_node, inner, listing_node)
+
+        content_type, body = self._body(query, data)
+        return 200, content_type, body
+
+    def schema(self, resource, query):
+        """ Empty record, as ``schema=blank`` """
+        node = self.dataset.node(resource)
+        fields = self.dataset.fields(resource)
+        blank = dict.fromkeys(fields, '')
+        content_type, body = self._body(
+            query,
+            lambda json_output: ({node: record_json(blank, fields)}
+                                 if json_output
+                                 else record_xml(node, blank, fields)),
+        )
+        return 200, content_type, body
+
+    def read(self, resource, record_id, query, environ, headers):
+        with self.lock:
+            record = self.dataset.get(resource, record_id)
+        if record is None:
+            raise WebserviceError(404, 90,
+                                  'Id(s) not exists: %s' % record_id)
+        node = self.dataset.node(resource)
+        fields = self.dataset.fields(resource)
+        content_type, body = self._body(
+            query,
+            lambda json_output: ({node: record_json(record, fields)}
+                                 if json_output
+                                 else record_xml(node, record, fields)),
+        )
+        if self.etags:
+            etag = '"%s"' % hashlib.sha1(body.encode('utf-8')).hexdigest()
+            headers.append(('ETag', etag))
+            if environ.get('HTTP_IF_NONE_MATCH') == etag:
+                return 304, content_type, ''
+        return 200, content_type, body
+
+    def write(self, method, resource, record_id, content, query):
+        """ Create (POST) or update (PUT) a record from its XML """
+        try:
+            values = xml2dict(content)['prestashop']
+        except Exception:
+            raise WebserviceError(400, 85, 'Invalid XML')
+        node = self.dataset.node(resource)
+        if node not in values:
+            raise WebserviceError(400, 85, 'Invalid XML')
+        values = values[node]
+        fields = self.dataset.fields(resource)
+        with self.lock:
+            if method == 'POST':
+                if record_id is not None:
+                    raise WebserviceError(400, 21, 'Invalid URL')
+                values.pop('id', None)
+                record = self.dataset.add(resource, values)
+                status = 201
+            else:
+                record_id = record_id or values.get('id')
+                if not record_id or \
+                        self.dataset.get(resource, record_id) is None:
+                    raise WebserviceError(
+                        404, 90, 'Id(s) not exists: %s' % record_id)
+                record = self.dataset.update(resource, record_id, values)
+                status = 200
+        content_type, body = self._body(
+            query,
+            lambda json_output: ({node: record_json(record, fields)}
+                                 if json_output
+                                 else record_xml(node, record, fields)),
+        )
+        return status, content_type, body
+
+    def delete(self, resource, record_id, query):
+        if record_id is not None:
+            ids = [record_id]
+        else:
+            match = re.match(r'^\[(.*)\]$', query.get('id', ''))
+            if not match:
+                raise WebserviceError(400, 21, 'Invalid URL')
+            ids = match.group(1).split(',')
+        with self.lock:
+            missing = [record_id for record_id in ids
+                       if self.dataset.get(resource, record_id) is None]
+            if missing:
+                raise WebserviceError(404, 90, 'Id(s) not exists: %s' %
+                                      ', '.join(missing))
+            for record_id in ids:
+                self.dataset.delete(resource, record_id)
+        return 200, 'text/xml;charset=utf-8', XML_HEADER + XML_FOOTER
+
+    def image(self, parts, environ):
+        """ Content of an image, or the images of a product """
+        key = tuple(parts)
+        with self.lock:
+            image = self.dataset.images.get(key)
+            declinations = [image_key[-1] for image_key
+                            in sorted(self.dataset.images)
+                            if image_key[:-1] == key]
+        if image is not None:
+            mimetype, content = image
+            return 200, mimetype, content
+        if not declinations:
+            raise WebserviceError(404, 66, 'Image not found')
+        inner = ''.join(
+            '<declination id="%s" xlink:href=%s/>\n' % (
+                image_id,
+                quoteattr(self._url(environ, 'images', *(key + (image_id,))))
+            )
+            for image_id in declinations
+        )
+        body = (XML_HEADER + '<image id="%s">\n%s</image>\n' % (key[-1],
+                                                                 inner) +
+                XML_FOOTER)
+        return 200, 'text/xml;charset=utf-8', body
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve(app, host='127.0.0.1', port=0):
+    """ Serve a WSGI application in a thread during the context
+
+    Usage::
+
+        with serve(FakePrestaShop(dataset)) as location:
+            backend.location = location
+
+    :param port: port to listen on, a free port when 0
+    :return: the location of the shop, to use on the backend
+    """
+    server = make_server(host, port, app,
+                         server_class=_ThreadingWSGIServer,
+                         handler_class=_QuietHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield 'http://%s:%s' % server.server_address[:2]
+    finally:
+        server.shutdown()
+        server.server_close()
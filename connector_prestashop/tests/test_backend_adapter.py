@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import mock
+from StringIO import StringIO
+from prestapyt import PrestaShopWebServiceError
+
+from openerp.addons.connector.unit.mapper import ImportMapper
+from openerp.addons.connector_prestashop.unit.backend_adapter import (
+    GenericAdapter,
+    PrestaShopClientPool,
+    client_pool,
+    iter_listing_records,
+)
+from openerp.addons.connector_prestashop.unit.importer import (
+    PrestashopImporter,
+)
+from openerp.addons.connector_prestashop.unit.mapper import (
+    mapper_source_fields,
+)
+
+from .common import PrestashopTransactionCase
+
+
+class TestClientPool(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestClientPool, self).setUp()
+        client_pool.clear()
+
+    def _get_adapter(self, model_name):
+        env = self.backend_record.get_environment(model_name)
+        return env.get_connector_unit(GenericAdapter)
+
+    def test_adapters_share_client(self):
+        """ Adapters of a backend use the same webservice client """
+        template_adapter = self._get_adapter('prestashop.product.template')
+        order_adapter = self._get_adapter('prestashop.sale.order')
+        self.assertIs(template_adapter.client, order_adapter.client)
+
+    def test_client_per_key(self):
+        """ A different webservice key gets its own client """
+        adapter = self._get_adapter('prestashop.product.template')
+        self.backend_record.webservice_key = 'other'
+        other_adapter = self._get_adapter('prestashop.product.template')
+        self.assertIsNot(adapter.client, other_adapter.client)
+
+    def test_idle_eviction(self):
+        """ Clients unused for longer than the idle timeout are closed """
+        pool = PrestaShopClientPool(pool_size=2, idle_timeout=60)
+        path = ('openerp.addons.connector_prestashop.unit.'
+                'backend_adapter.time.time')
+        with mock.patch(path) as time_mock:
+            time_mock.return_value = 1000
+            client = pool.get('http://localhost/api', 'xxx')
+            time_mock.return_value = 1030
+            self.assertIs(client, pool.get('http://localhost/api', 'xxx'))
+            time_mock.return_value = 1100
+            self.assertIsNot(client, pool.get('http://localhost/api', 'xxx'))
+
+
+class TestReadMany(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestReadMany, self).setUp()
+        env = self.backend_record.get_environment(
+            'prestashop.sale.order.line'
+        )
+        self.adapter = env.get_connector_unit(GenericAdapter)
+
+    def test_read_many(self):
+        """ Records are read in one listing and returned by id """
+        response = {'order_details': {'order_detail': [
+            {'id': '13', 'product_name': 'T-shirt'},
+            {'id': '14', 'product_name': 'Blouse'},
+        ]}}
+        with mock.patch.object(self.adapter.client, 'get') as get_mock:
+            get_mock.return_value = response
+            records = self.adapter.read_many([13, '14', 13])
+            get_mock.assert_called_once_with(
+                'order_details',
+                options={'filter[id]': '[13|14]', 'display': 'full'},
+            )
+        self.assertEqual(['13', '14'], sorted(records))
+        self.assertEqual('Blouse', records['14']['product_name'])
+
+    def test_read_many_single_and_empty(self):
+        """ Listings with one record or none are handled """
+        with mock.patch.object(self.adapter.client, 'get') as get_mock:
+            get_mock.return_value = {
+                'order_details': {'order_detail': {'id': '13'}}
+            }
+            self.assertEqual(['13'], self.adapter.read_many([13]).keys())
+            get_mock.return_value = {'order_details': ''}
+            self.assertEqual({}, self.adapter.read_many([12]))
+            get_mock.reset_mock()
+            self.assertEqual({}, self.adapter.read_many([]))
+            self.assertFalse(get_mock.called)
+
+    def test_read_many_split(self):
+        """ Long lists of ids are split in several requests """
+        self.adapter._read_many_max_filter_length = 10
+        with mock.patch.object(self.adapter.client, 'get') as get_mock:
+            get_mock.return_value = {'order_details': ''}
+            self.adapter.read_many(range(1000, 1005))
+            filters = [call[1]['options']['filter[id]']
+                       for call in get_mock.call_args_list]
+        self.assertEqual(
+            ['[1000|1001]', '[1002|1003]', '[1004]'], filters
+        )
+
+
+class TestIterListing(PrestashopTransactionCase):
+
+    def test_ids(self):
+        """ Elements of a listing are parsed one by one """
+        xml = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<prestashop xmlns:xlink="http://www.w3.org/1999/xlink">'
+               '<products>'
+               '<product id="1" xlink:href="http://localhost/api/products/1"/>'
+               '<product id="2" xlink:href="http://localhost/api/products/2"/>'
+               '</products></prestashop>')
+        records = iter_listing_records(StringIO(xml))
+        self.assertEqual({'attrs': {'id': '1'}, 'value': ''}, next(records))
+        self.assertEqual({'attrs': {'id': '2'}, 'value': ''}, next(records))
+        self.assertEqual([], list(records))
+
+    def test_display(self):
+        """ A listing with one element gives it as a dict """
+        xml = ('<prestashop><stock_availables><stock_available>'
+               '<id>3</id><quantity>4</quantity>'
+               '</stock_available></stock_availables></prestashop>')
+        self.assertEqual(
+            [{'id': '3', 'quantity': '4'}],
+            list(iter_listing_records(StringIO(xml))),
+        )
+
+    def test_empty(self):
+        """ An empty listing yields nothing """
+        xml = '<prestashop><products/></prestashop>'
+        self.assertEqual([], list(iter_listing_records(StringIO(xml))))
+
+
+class TestReferenceCache(PrestashopTransactionCase):
+
+    def _get_adapter(self, model_name):
+        env = self.backend_record.get_environment(model_name)
+        return env.get_connector_unit(GenericAdapter)
+
+    def test_cached(self):
+        """ Reference data are read once until the cache is flushed """
+        adapter = self._get_adapter('prestashop.res.country')
+        with mock.patch.object(adapter.client, 'get') as get_mock:
+            get_mock.return_value = {'country': {'id': '8', 'iso_code': 'FR'}}
+            record = adapter.read(8)
+            record['iso_code'] = 'XX'
+            self.assertEqual('FR', adapter.read(8)['iso_code'])
+            self.assertEqual(1, get_mock.call_count)
+            adapter.read(9)
+            self.assertEqual(2, get_mock.call_count)
+            self.backend_record.button_flush_cache()
+            adapter.read(8)
+            self.assertEqual(3, get_mock.call_count)
+
+    def test_not_cached(self):
+        """ Other records are always read from PrestaShop """
+        adapter = self._get_adapter('prestashop.sale.order')
+        with mock.patch.object(adapter.client, 'get') as get_mock:
+            get_mock.return_value = {'order': {'id': '1'}}
+            adapter.read(1)
+            adapter.read(1)
+            self.assertEqual(2, get_mock.call_count)
+
+
+class TestSourceFields(PrestashopTransactionCase):
+
+    def _get_unit(self, model_name, unit_class):
+        env = self.backend_record.get_environment(model_name)
+        return env.get_connector_unit(unit_class)
+
+    def test_mapper_fields(self):
+        """ The fields used by a mapper are declared or derived """
+        mapper = self._get_unit('prestashop.delivery.carrier', ImportMapper)
+        self.assertEqual(set(['active', 'id_reference', 'name']),
+                         mapper_source_fields(mapper))
+        mapper = self._get_unit('prestashop.shop', ImportMapper)
+        self.assertEqual(set(['id_shop_group', 'name']),
+                         mapper_source_fields(mapper))
+        # mappings without declared fields
+        mapper = self._get_unit('prestashop.sale.order', ImportMapper)
+        self.assertIsNone(mapper_source_fields(mapper))
+
+    def test_read_fields(self):
+        """ Only the fields used by the importer are read """
+        importer = self._get_unit('prestashop.delivery.carrier',
+                                  PrestashopImporter)
+        self.assertEqual(['active', 'id', 'id_reference', 'name'],
+                         importer._read_fields())
+        adapter = self._get_unit('prestashop.delivery.carrier',
+                                 GenericAdapter)
+        with mock.patch.object(adapter.client, 'get') as get_mock:
+            get_mock.return_value = {'carriers': {'carrier': {
+                'id': '2', 'name': 'My carrier',
+            }}}
+            record = adapter.read(2, fields=['id', 'name'])
+            get_mock.assert_called_once_with(
+                'carriers',
+                options={'filter[id]': '[2]', 'display': '[id,name]'},
+            )
+        self.assertEqual({'id': '2', 'name': 'My carrier'}, record)
+
+    def test_read_fields_missing(self):
+        """ A record missing from the listing is not found """
+        adapter = self._get_unit('prestashop.delivery.carrier',
+                                 GenericAdapter)
+        with mock.patch.object(adapter.client, 'get') as get_mock:
+            get_mock.return_value = {'carriers': ''}
+            with self.assertRaises(PrestaShopWebServiceError) as cm:
+                adapter.read(3, fields=['id', 'name'])
+            self.assertEqual(404, cm.exception.error_code)
+            # the missing record is not read again
+            with self.assertRaises(PrestaShopWebServiceError):
+                adapter.read(3, fields=['id', 'name'])
+            self.assertEqual(1, get_mock.call_count)
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import mock
+
+from openerp.tools import config
+from openerp.addons.connector_prestashop.unit.importer import (
+    BatchImporter,
+    PrestashopImporter,
+    import_records,
+)
+
+from .common import PrestashopTransactionCase
+
+
+class BatchImporterCase(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(BatchImporterCase, self).setUp()
+        env = self.backend_record.get_environment(
+            'prestashop.res.partner', session=self.conn_session
+        )
+        self.importer = env.get_connector_unit(BatchImporter)
+        self.importer.page_size = 2
+
+    def _run(self, pages, filters=None, **kwargs):
+        """ Run the batch importer on a listing returning ``pages``,
+        return the filters of the pages read and the ids imported
+
+        A page which is an exception is raised when it is read.
+        """
+        read_filters = []
+
+        def iter_search(filters):
+            read_filters.append(dict(filters))
+            page = pages[len(read_filters) - 1]
+            if isinstance(page, Exception):
+                raise page
+            return iter(page)
+
+        record_job_path = ('openerp.addons.connector_prestashop.unit'
+                           '.importer.import_record')
+        with mock.patch.object(self.importer.backend_adapter,
+                               'iter_search') as search_mock, \
+                mock.patch(record_job_path) as import_record_mock:
+            search_mock.side_effect = iter_search
+            self.importer.run(filters=filters, **kwargs)
+        imported = [call[0][3] for call
+                    in import_record_mock.delay.call_args_list]
+        return read_filters, imported
+
+    def _cursor(self):
+        return self.env['prestashop.batch.cursor'].search(
+            [('backend_id', '=', self.backend_record.id)]
+        )
+
+
+class TestBatchImporter(BatchImporterCase):
+
+    def test_keyset_pagination(self):
+        """ The pages start after the last id of the previous page """
+        filters = {'filter[date_upd]': '>[2016-09-01 00:00:00]'}
+        read_filters, imported = self._run([[1, 3], [4, 8], [9]],
+                                           filters=filters)
+        self.assertEqual([1, 3, 4, 8, 9], imported)
+        self.assertEqual([
+            {'filter[date_upd]': '>[2016-09-01 00:00:00]',
+             'sort': '[id_ASC]', 'limit': '2'},
+            {'filter[date_upd]': '>[2016-09-01 00:00:00]',
+             'sort': '[id_ASC]', 'limit': '2', 'filter[id]': '>[3]'},
+            {'filter[date_upd]': '>[2016-09-01 00:00:00]',
+             'sort': '[id_ASC]', 'limit': '2', 'filter[id]': '>[8]'},
+        ], read_filters)
+        # the filters of the caller are not modified
+        self.assertEqual({'filter[date_upd]': '>[2016-09-01 00:00:00]'},
+                         filters)
+
+    def test_keyset_full_last_page(self):
+        """ A full last page is followed by an empty page """
+        read_filters, imported = self._run([[1, 2], []])
+        self.assertEqual([1, 2], imported)
+        self.assertEqual(2, len(read_filters))
+
+    def test_offset_pagination(self):
+        """ The pages are read with offsets without keyset pagination """
+        self.importer.keyset_pagination = False
+        read_filters, imported = self._run([[1, 3], [4]])
+        self.assertEqual([1, 3, 4], imported)
+        self.assertEqual([{'limit': '0,2'}, {'limit': '2,2'}],
+                         read_filters)
+
+    def test_sorted_by_caller(self):
+        """ The pages are read with offsets when the caller sorts them """
+        read_filters, __ = self._run([[3, 1], []],
+                                     filters={'sort': '[id_DESC]'})
+        self.assertEqual([{'sort': '[id_DESC]', 'limit': '0,2'},
+                          {'sort': '[id_DESC]', 'limit': '2,2'}],
+                         read_filters)
+
+    def test_not_resumable_outside_job(self):
+        """ The transaction of a batch run outside of a job is not
+        committed """
+        with mock.patch.object(self.conn_session, 'commit') as commit_mock:
+            __, imported = self._run([[1, 3], [4]], resumable=True)
+        self.assertEqual([1, 3, 4], imported)
+        self.assertFalse(commit_mock.called)
+        self.assertFalse(self._cursor())
+
+    def test_chunks(self):
+        """ The records are delayed by chunks """
+        self.importer.chunk_size = 3
+        records_job_path = ('openerp.addons.connector_prestashop.unit'
+                            '.importer.import_records')
+        with mock.patch(records_job_path) as import_records_mock:
+            read_filters, imported = self._run([[1, 2], [3, 4], [5]])
+        self.assertFalse(imported)
+        chunks = [call[0][3] for call
+                  in import_records_mock.delay.call_args_list]
+        self.assertEqual([[1, 2], [3, 4], [5]], chunks)
+
+    def test_chunk_size_option(self):
+        """ The chunk size is set per binding model in the configuration """
+        with mock.patch.dict(config.options, {
+                'prestashop_import_chunk_sizes':
+                'prestashop.res.partner:50, prestashop.address:20'}):
+            self.assertEqual(50, self.importer._chunk_size())
+        self.assertEqual(1, self.importer._chunk_size())
+
+    def test_listed_records(self):
+        """ The records read in the listing are handed to the jobs """
+        self.backend_record.listed_records = True
+        records = [{'id': '1', 'firstname': 'John'},
+                   {'id': '3', 'firstname': 'Jane'}]
+        record_job_path = ('openerp.addons.connector_prestashop.unit'
+                           '.importer.import_record')
+        with mock.patch.object(self.importer.backend_adapter,
+                               'iter_listing') as listing_mock, \
+                mock.patch(record_job_path) as import_record_mock:
+            listing_mock.return_value = iter(records)
+            self.importer.run(filters={'date': '1'})
+        self.assertEqual(
+            {'date': '1', 'display': 'full', 'sort': '[id_ASC]',
+             'limit': '2'},
+            listing_mock.call_args_list[0][0][0]
+        )
+        self.assertEqual(
+            [mock.call(mock.ANY, 'prestashop.res.partner',
+                       self.backend_record.id, 1, record=records[0]),
+             mock.call(mock.ANY, 'prestashop.res.partner',
+                       self.backend_record.id, 3, record=records[1])],
+            import_record_mock.delay.call_args_list
+        )
+
+    def test_listed_records_disabled(self):
+        """ Only the ids are listed unless the backend reads the records
+        in the listings """
+        read_filters, imported = self._run([[1]])
+        self.assertEqual([1], imported)
+        self.assertNotIn('display', read_filters[0])
+
+    def test_import_listed_record(self):
+        """ A record handed to its import is not read again """
+        env = self.backend_record.get_environment(
+            'prestashop.delivery.carrier', session=self.conn_session
+        )
+        importer = env.get_connector_unit(PrestashopImporter)
+        record = {'id': '2', 'name': 'My carrier'}
+        with mock.patch.object(type(importer),
+                               '_get_prestashop_data') as read_mock, \
+                mock.patch.object(type(importer), '_import'):
+            importer.run(2, record=record)
+        self.assertFalse(read_mock.called)
+        self.assertEqual(record, importer.prestashop_record)
+
+
+class TestResumableBatchImport(BatchImporterCase):
+
+    def setUp(self):
+        super(TestResumableBatchImport, self).setUp()
+        self.cursor_model = self.env['prestashop.batch.cursor']
+        self.filters = {'date': '1',
+                        'filter[date_upd]': '>[2016-09-01 00:00:00]'}
+        job_uuid_path = ('openerp.addons.connector_prestashop.unit'
+                         '.importer.current_job_uuid')
+        patcher = mock.patch(job_uuid_path, return_value='job-uuid')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(self.conn_session, 'commit')
+        self.commit_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_commit_pages(self):
+        """ Each full page is committed, the cursor is removed at the
+        end of the run """
+        __, imported = self._run([[1, 3], [4, 8], [9]],
+                                 filters=self.filters, resumable=True)
+        self.assertEqual([1, 3, 4, 8, 9], imported)
+        self.assertEqual(2, self.commit_mock.call_count)
+        self.assertFalse(self._cursor())
+
+    def test_interrupted(self):
+        """ The cursor stays after the last page read """
+        with self.assertRaises(IOError):
+            self._run([[1, 3], [4, 8], IOError()],
+                      filters=self.filters, resumable=True)
+        cursor = self._cursor()
+        self.assertEqual(1, len(cursor))
+        self.assertEqual('prestashop.res.partner', cursor.model)
+        self.assertEqual(8, cursor.last_id)
+        self.assertEqual(2, cursor.pages)
+        self.assertEqual(4, cursor.records)
+
+    def test_resume(self):
+        """ A run with the same filters starts after the last id """
+        cursor = self.cursor_model.resume(
+            self.backend_record.id, 'prestashop.res.partner', self.filters
+        )
+        cursor.advance([1, 3])
+        read_filters, imported = self._run([[4, 8], [9]],
+                                           filters=self.filters,
+                                           resumable=True)
+        self.assertEqual([4, 8, 9], imported)
+        self.assertEqual('>[3]', read_filters[0]['filter[id]'])
+        self.assertFalse(self._cursor())
+
+    def test_other_filters(self):
+        """ A run with other filters replaces the cursor """
+        cursor = self.cursor_model.resume(
+            self.backend_record.id, 'prestashop.res.partner', {'date': '1'}
+        )
+        cursor.advance([1, 3])
+        read_filters, __ = self._run([IOError()],
+                                     filters=self.filters, resumable=True)
+        self.assertNotIn('filter[id]', read_filters[0])
+        self.assertFalse(cursor.exists())
+        self.assertEqual(0, self._cursor().last_id)
+
+    def test_watermark(self):
+        """ The next import since a date starts at the beginning of the
+        interrupted run """
+        backend_id = self.backend_record.id
+        models = ['prestashop.res.partner.category', 'prestashop.res.partner']
+        with mock.patch('openerp.fields.Datetime.now') as now_mock:
+            now_mock.return_value = '2016-09-10 08:00:00'
+            self.assertEqual('2016-09-10 08:00:00',
+                             self.cursor_model.watermark(backend_id, models))
+            self.cursor_model.create({
+                'backend_id': backend_id,
+                'model': 'prestashop.res.partner',
+                'filters': '{}',
+                'date_start': '2016-09-09 22:00:00',
+            })
+            now_mock.return_value = '2016-09-10 09:00:00'
+            self.assertEqual('2016-09-09 22:00:00',
+                             self.cursor_model.watermark(backend_id, models))
+
+    def test_cleanup(self):
+        """ The cursors not resumed for days are removed """
+        cursor = self.cursor_model.create({
+            'backend_id': self.backend_record.id,
+            'model': 'prestashop.res.partner',
+            'filters': '{}',
+            'date_start': '2016-09-01 00:00:00',
+        })
+        self.cursor_model._scheduler_cleanup()
+        self.assertFalse(cursor.exists())
+
+
+class TestImportRecords(PrestashopTransactionCase):
+
+    def test_failed_records(self):
+        """ The failed records of a chunk are delayed in their own jobs """
+        categories = self.env['res.partner.category']
+
+        def run(importer, prestashop_id, **kwargs):
+            categories.create({'name': 'category %s' % prestashop_id})
+            if prestashop_id == 2:
+                raise ValueError('invalid record')
+
+        record_job_path = ('openerp.addons.connector_prestashop.unit'
+                           '.importer.import_record')
+        with mock.patch.object(PrestashopImporter, 'run',
+                               autospec=True) as run_mock, \
+                mock.patch(record_job_path) as import_record_mock:
+            run_mock.side_effect = run
+            result = import_records(self.conn_session,
+                                    'prestashop.res.partner.category',
+                                    self.backend_record.id, [1, 2, 3])
+        self.assertEqual(3, run_mock.call_count)
+        import_record_mock.delay.assert_called_once_with(
+            mock.ANY, 'prestashop.res.partner.category',
+            self.backend_record.id, 2
+        )
+        self.assertIn('2 records imported', result)
+        self.assertIn('2: invalid record', result)
+        # the failed record has been rolled back
+        names = categories.search(
+            [('name', 'like', 'category %')]
+        ).mapped('name')
+        self.assertEqual(['category 1', 'category 3'], sorted(names))
+
+    def test_failed_listed_record(self):
+        """ A failed record handed to a chunk is read again by its job """
+        records = [{'id': '1', 'name': 'A'}, {'id': '2', 'name': 'B'}]
+        record_job_path = ('openerp.addons.connector_prestashop.unit'
+                           '.importer.import_record')
+        with mock.patch.object(PrestashopImporter, 'run') as run_mock, \
+                mock.patch(record_job_path) as import_record_mock:
+            run_mock.side_effect = [None, ValueError('invalid record')]
+            import_records(self.conn_session,
+                           'prestashop.res.partner.category',
+                           self.backend_record.id, [1, 2], records=records)
+        self.assertEqual(records[1], run_mock.call_args[1]['record'])
+        import_record_mock.delay.assert_called_once_with(
+            mock.ANY, 'prestashop.res.partner.category',
+            self.backend_record.id, 2
+        )
+
+    def test_orders_not_listed(self):
+        """ The orders are read by their jobs, which can be retried """
+        self.backend_record.listed_records = True
+        env = self.backend_record.get_environment(
+            'prestashop.sale.order', session=self.conn_session
+        )
+        importer = env.get_connector_unit(BatchImporter)
+        self.assertIsNone(importer._listing_display())
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import mock
+
+import openerp.tests.common as common
+
+from openerp.addons.connector_prestashop.benchmarks.replay import (
+    ImportProfiler,
+)
+from openerp.addons.connector_prestashop.benchmarks.sync import regressions
+
+
+class TestBenchmark(common.TransactionCase):
+
+    def test_regressions(self):
+        """ Measures worse than the baseline over the threshold """
+        baseline = {'flows': {'import_products': {
+            'records_per_sec': 100,
+            'http_calls_per_record': 4,
+            'sql_queries_per_record': 50,
+            'peak_memory_mb': 200,
+        }}}
+        results = {'flows': {
+            'import_products': {
+                'records_per_sec': 85,
+                'http_calls_per_record': 5,
+                'sql_queries_per_record': 70,
+                'peak_memory_mb': 150,
+            },
+            # not in the baseline
+            'import_inventory': {
+                'records_per_sec': 1,
+                'http_calls_per_record': 1,
+                'sql_queries_per_record': 1,
+                'peak_memory_mb': 1,
+            },
+        }}
+        self.assertEqual(
+            [('import_products', 'http_calls_per_record', 4, 5),
+             ('import_products', 'sql_queries_per_record', 50, 70)],
+            regressions(results, baseline, 0.2),
+        )
+        self.assertEqual(
+            [('import_products', 'records_per_sec', 100, 85),
+             ('import_products', 'http_calls_per_record', 4, 5),
+             ('import_products', 'sql_queries_per_record', 50, 70)],
+            regressions(results, baseline, 0.1),
+        )
+
+    def test_profiler(self):
+        """ The time of the nested phases is not counted twice """
+        profiler = ImportProfiler()
+        times = [0., 1., 3., 4., 4.5, 5., 5.5, 6.]
+        with mock.patch('time.time', side_effect=times):
+            profiler.enter('other', owner='SaleOrderImporter')
+            profiler.enter('http')
+            profiler.exit()
+            profiler.enter('map')
+            profiler.enter('parse')
+            profiler.exit()
+            profiler.exit()
+            profiler.exit()
+        self.assertEqual(
+            {'SaleOrderImporter': {
+                'http': 2000., 'parse': 500., 'map': 1000., 'orm': 0.,
+                'other': 2500., 'total': 6000., 'runs': 0,
+            }},
+            profiler.report(),
+        )
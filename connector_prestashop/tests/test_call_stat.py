@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import unittest
+
+import mock
+
+from openerp import api
+from openerp.addons.connector_prestashop.models.call_stat.common import (
+    latency_bucket,
+    percentile,
+)
+from openerp.addons.connector_prestashop.models.record_cache.common import (
+    cache_cursor,
+)
+from openerp.addons.connector_prestashop.unit.backend_adapter import (
+    GenericAdapter,
+    counting_calls,
+)
+from openerp.addons.connector_prestashop.unit.job_timing import PhaseTimer
+
+from .common import PrestashopTransactionCase
+
+
+class TestLatencyBuckets(unittest.TestCase):
+
+    def test_bucket(self):
+        """ Durations are counted in their latency bucket """
+        self.assertEqual(0, latency_bucket(0.01))
+        self.assertEqual(3, latency_bucket(0.3))
+        self.assertEqual(7, latency_bucket(12))
+
+    def test_percentile(self):
+        """ Percentiles are estimated from the buckets """
+        buckets = [0, 50, 0, 40, 0, 0, 10, 0]
+        self.assertEqual(100, percentile(buckets, 0.5))
+        self.assertEqual(5000, percentile(buckets, 0.95))
+        self.assertEqual(0, percentile([0] * 8, 0.5))
+
+
+class TestCallStat(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestCallStat, self).setUp()
+        self.stat_model = self.env['prestashop.call.stat']
+        # the statistics are written in their own transactions
+        self.stat_model.flush()
+        with cache_cursor(self.env) as cr:
+            cr.execute("DELETE FROM prestashop_call_stat "
+                       "WHERE backend_id = %s", (self.backend_record.id,))
+            cr.execute("DELETE FROM prestashop_job_timing "
+                       "WHERE backend_id = %s", (self.backend_record.id,))
+
+    def _adapter(self):
+        env = self.backend_record.get_environment(
+            'prestashop.product.template'
+        )
+        return env.get_connector_unit(GenericAdapter)
+
+    def _summary(self):
+        with cache_cursor(self.env) as cr:
+            env = api.Environment(cr, self.env.uid, {})
+            return env['prestashop.call.stat'].summary(
+                self.backend_record.id
+            )
+
+    def test_sampling_off(self):
+        """ Nothing is recorded when the sampling is disabled """
+        adapter = self._adapter()
+        with mock.patch.object(adapter.client, 'get_conditional') as get, \
+                mock.patch.object(type(self.stat_model), 'record') as record:
+            get.return_value = ({'product': {'id': '1'}}, {})
+            adapter.read(1)
+        self.assertFalse(record.called)
+
+    def test_sampled_call(self):
+        """ A sampled call is recorded with its resource and method """
+        self.backend_record.call_stats_sampling = 1
+        adapter = self._adapter()
+        with mock.patch.object(adapter.client, 'get_conditional') as get, \
+                mock.patch.object(type(self.stat_model), 'record') as record:
+            get.return_value = ({'product': {'id': '1'}}, {})
+            adapter.read(1)
+        self.assertEqual(1, record.call_count)
+        args, kwargs = record.call_args
+        self.assertEqual((self.backend_record.id, 'products', 'GET'),
+                         args[:3])
+        self.assertEqual(1., kwargs['weight'])
+
+    def test_summary(self):
+        """ The latencies and the volume per job are summarized """
+        backend_id = self.backend_record.id
+        for duration in (0.04, 0.08, 0.09, 0.3):
+            self.stat_model.record(backend_id, 'products', 'GET', 200,
+                                   1000, duration)
+        self.stat_model.record(backend_id, 'products', 'PUT', 500,
+                               200, 3)
+        timing_model = self.env['prestashop.job.timing']
+        for job_uuid, calls, size in (('job-1', 4, 4000),
+                                      ('job-2', 1, 200)):
+            timer = PhaseTimer()
+            timer.calls, timer.bytes = calls, size
+            timing_model.record(backend_id, 'prestashop.product.template',
+                                'import', timer, job_uuid=job_uuid)
+        # not flushed: the summary writes the pending statistics
+        summary = self._summary()
+        self.assertEqual(100, summary['p50'])
+        self.assertEqual(5000, summary['p95'])
+        self.assertAlmostEqual(2.5, summary['calls_per_job'])
+        self.assertAlmostEqual(2100, summary['bytes_per_job'])
+
+    def test_aggregated(self):
+        """ The calls of the jobs are aggregated in the same row """
+        backend_id = self.backend_record.id
+        for __ in range(3):
+            self.stat_model.record(backend_id, 'products', 'GET', 200,
+                                   1000, 0.1)
+        self.stat_model.flush()
+        with cache_cursor(self.env) as cr:
+            cr.execute("SELECT COUNT(*), SUM(calls) "
+                       "FROM prestashop_call_stat WHERE backend_id = %s",
+                       (backend_id,))
+            self.assertEqual((1, 3), cr.fetchone())
+
+    def test_calls_in_timer(self):
+        """ The sampled calls of a synchronization are counted in its
+        timer, not in the timer of the synchronization depending on it """
+        self.backend_record.call_stats_sampling = 1
+        adapter = self._adapter()
+        timer, dependency_timer = PhaseTimer(), PhaseTimer()
+        with mock.patch.object(adapter.client, 'get_conditional') as get, \
+                mock.patch.object(type(self.stat_model), 'record'):
+            get.return_value = ({'product': {'id': '1'}}, {})
+            with counting_calls(timer):
+                adapter.read(1)
+                with counting_calls(dependency_timer):
+                    adapter.read(2)
+        self.assertEqual(1, timer.calls)
+        self.assertEqual(1, dependency_timer.calls)
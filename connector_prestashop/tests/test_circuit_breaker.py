@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import mock
+import requests
+from prestapyt import PrestaShopWebServiceError
+from requests.exceptions import ConnectionError
+
+from openerp.addons.connector.exception import NetworkRetryableError
+from openerp.addons.connector_prestashop.models.product_image.importer \
+    import set_product_image_variant
+from openerp.addons.connector_prestashop.models.product_template.exporter \
+    import export_inventory, export_product_quantities
+from openerp.addons.connector_prestashop.models.record_cache.common import (
+    cache_cursor,
+)
+from openerp.addons.connector_prestashop.models.product_template.importer \
+    import import_products
+from openerp.addons.connector_prestashop.unit.backend_adapter import (
+    GenericAdapter,
+)
+from openerp.addons.connector_prestashop.unit.importer import import_record
+
+from .common import PrestashopTransactionCase
+
+SLEEP_PATH = ('openerp.addons.connector_prestashop.unit.'
+              'backend_adapter.time.sleep')
+
+# error page of a proxy in front of PrestaShop, not parsable as XML
+PROXY_ERROR_PAGE = ('<html><head><title>503 Service Unavailable</title>'
+                    '</head><body><h1>Service Unavailable</h1><hr>'
+                    '</body></html>')
+
+
+def http_response(status_code, content):
+    """ Response of PrestaShop, or of a proxy in front of it """
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+class TestRetry(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestRetry, self).setUp()
+        env = self.backend_record.get_environment(
+            'prestashop.product.template'
+        )
+        self.adapter = env.get_connector_unit(GenericAdapter)
+
+    def test_read_retried(self):
+        """ A read failing with a transient error is done again """
+        with mock.patch.object(self.adapter.client,
+                               'get_conditional') as get_mock, \
+                mock.patch(SLEEP_PATH) as sleep_mock:
+            get_mock.side_effect = [
+                ConnectionError('Connection refused'),
+                PrestaShopWebServiceError('Service Unavailable', 503),
+                ({'product': {'id': '1'}}, {}),
+            ]
+            self.assertEqual({'id': '1'}, self.adapter.read(1))
+        self.assertEqual(3, get_mock.call_count)
+        self.assertEqual(2, sleep_mock.call_count)
+        first, second = [call[0][0] for call in sleep_mock.call_args_list]
+        self.assertLessEqual(first, self.adapter._retry_backoff)
+        self.assertLessEqual(second, self.adapter._retry_backoff * 2)
+
+    def test_read_retried_proxy_error(self):
+        """ A read answered by the error page of a proxy is done again """
+        with mock.patch.object(self.adapter.client.client,
+                               'request') as request_mock, \
+                mock.patch(SLEEP_PATH):
+            request_mock.side_effect = [
+                http_response(503, PROXY_ERROR_PAGE),
+                http_response(504, ''),
+                http_response(200, '<prestashop><product><id>1</id>'
+                                   '</product></prestashop>'),
+            ]
+            self.assertEqual({'id': '1'}, self.adapter.read(1))
+        self.assertEqual(3, request_mock.call_count)
+
+    def test_read_not_retried(self):
+        """ A read failing with another error is not done again """
+        with mock.patch.object(self.adapter.client,
+                               'get_conditional') as get_mock, \
+                mock.patch(SLEEP_PATH):
+            get_mock.side_effect = PrestaShopWebServiceError(
+                'Internal Server Error', 500
+            )
+            with self.assertRaises(PrestaShopWebServiceError):
+                self.adapter.read(1)
+        self.assertEqual(1, get_mock.call_count)
+
+    def test_write_not_retried(self):
+        """ A write is never done again """
+        with mock.patch.object(self.adapter.client, 'edit') as edit_mock, \
+                mock.patch(SLEEP_PATH):
+            edit_mock.side_effect = ConnectionError('Connection refused')
+            with self.assertRaises(ConnectionError):
+                self.adapter.write(1, {'price': '1.0'})
+        self.assertEqual(1, edit_mock.call_count)
+
+
+class TestCircuitBreaker(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestCircuitBreaker, self).setUp()
+        env = self.backend_record.get_environment(
+            'prestashop.product.template'
+        )
+        self.adapter = env.get_connector_unit(GenericAdapter)
+        self.adapter._retry_attempts = 0
+        self.breaker = self.env['prestashop.circuit.breaker']
+        patcher = mock.patch.object(type(self.breaker), '_threshold')
+        self.addCleanup(patcher.stop)
+        patcher.start().return_value = 2
+
+    def test_open(self):
+        """ The calls fail at once when PrestaShop is unreachable """
+        with mock.patch.object(self.adapter.client,
+                               'get_conditional') as get_mock:
+            get_mock.side_effect = ConnectionError('Connection refused')
+            for __ in range(2):
+                with self.assertRaises(ConnectionError):
+                    self.adapter.read(1)
+            with self.assertRaises(NetworkRetryableError) as cm:
+                self.adapter.read(1)
+        self.assertEqual(2, get_mock.call_count)
+        self.assertTrue(cm.exception.seconds)
+        self.assertTrue(cm.exception.ignore_retry)
+
+    def test_open_on_proxy_errors(self):
+        """ The error pages of the proxies are counted as failures """
+        with mock.patch.object(self.adapter.client.client,
+                               'request') as request_mock:
+            request_mock.return_value = http_response(502, PROXY_ERROR_PAGE)
+            for __ in range(2):
+                with self.assertRaises(PrestaShopWebServiceError) as cm:
+                    self.adapter.read(1)
+                self.assertEqual(502, cm.exception.error_code)
+            with self.assertRaises(NetworkRetryableError):
+                self.adapter.read(1)
+        self.assertEqual(2, request_mock.call_count)
+
+    def test_closed_on_success(self):
+        """ A successful call resets the count of failures """
+        with mock.patch.object(self.adapter.client,
+                               'get_conditional') as get_mock:
+            get_mock.side_effect = [
+                ConnectionError('Connection refused'),
+                ({'product': {'id': '1'}}, {}),
+                ConnectionError('Connection refused'),
+                ({'product': {'id': '1'}}, {}),
+            ]
+            for __ in range(2):
+                with self.assertRaises(ConnectionError):
+                    self.adapter.read(1)
+                self.adapter.read(1)
+        self.assertEqual(4, get_mock.call_count)
+
+    def test_single_probe(self):
+        """ After the cooldown, a single call tries PrestaShop """
+        backend_id = self.backend_record.id
+        with mock.patch.object(self.adapter.client,
+                               'get_conditional') as get_mock:
+            get_mock.side_effect = ConnectionError('Connection refused')
+            for __ in range(2):
+                with self.assertRaises(ConnectionError):
+                    self.adapter.read(1)
+        # end of the cooldown
+        with cache_cursor(self.env) as cr:
+            cr.execute("UPDATE prestashop_circuit_breaker "
+                       "SET open_until = now() at time zone 'UTC' "
+                       "    - interval '1 second' "
+                       "WHERE backend_id = %s", (backend_id,))
+        with mock.patch.object(type(self.breaker), '_refresh_delay',
+                               return_value=0):
+            self.breaker.check(backend_id)
+            # the other calls are postponed during the probe
+            with self.assertRaises(NetworkRetryableError) as cm:
+                self.breaker.check(backend_id)
+            self.assertLessEqual(cm.exception.seconds,
+                                 self.breaker._probe_delay() + 1)
+            self.breaker.success(backend_id)
+            self.breaker.check(backend_id)
+
+    def test_reset(self):
+        """ The calls are resumed after a reset """
+        with mock.patch.object(self.adapter.client,
+                               'get_conditional') as get_mock:
+            get_mock.side_effect = ConnectionError('Connection refused')
+            for __ in range(2):
+                with self.assertRaises(ConnectionError):
+                    self.adapter.read(1)
+            self.backend_record.button_reset_circuit()
+            get_mock.side_effect = None
+            get_mock.return_value = ({'product': {'id': '1'}}, {})
+            self.assertEqual({'id': '1'}, self.adapter.read(1))
+
+    def test_postpone_jobs(self):
+        """ Only the pending jobs of the backend are postponed """
+        self.sync_metadata()
+        self.shop = self.env['prestashop.shop'].search([])
+        backend = self.backend_record
+        other_backend = backend.copy({'name': 'Other PrestaShop'})
+        template = self._create_product_binding(
+            name='Blouse', template_ps_id=2, variant_ps_id=7,
+        ).main_template_id
+        session = self.conn_session
+        postponed = [
+            import_record.delay(session, 'prestashop.res.partner',
+                                backend.id, 42),
+            import_products.delay(session, backend.id),
+            export_inventory.delay(session, 'prestashop.product.template',
+                                   template.id, fields=['quantity']),
+            export_product_quantities.delay(session, backend.id),
+            set_product_image_variant.delay(
+                session, 'prestashop.product.combination', backend.id, [1]
+            ),
+        ]
+        kept = [
+            # the id of the record is the id of the backend
+            import_record.delay(session, 'prestashop.res.partner',
+                                other_backend.id, backend.id),
+            import_products.delay(session, other_backend.id),
+        ]
+        self.breaker._postpone_jobs(self.env.cr, backend.id, '60 seconds')
+        self.env.invalidate_all()
+        jobs = self.env['queue.job']
+        for uuid in postponed:
+            self.assertTrue(jobs.search([('uuid', '=', uuid)]).eta)
+        for uuid in kept:
+            self.assertFalse(jobs.search([('uuid', '=', uuid)]).eta)
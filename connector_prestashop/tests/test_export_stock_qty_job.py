@@ -3,6 +3,14 @@
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
 
 import mock
+from requests.exceptions import ConnectionError
+
+from openerp.addons.connector.exception import (
+    FailedJobError,
+    NetworkRetryableError,
+)
+from openerp.addons.connector_prestashop.models.product_template.common \
+    import ProductInventoryAdapter
 
 from ..models.product_template.exporter import export_inventory
 from .common import (
@@ -72,3 +80,71 @@ class TestExportStockQuantity(ExportStockQuantityCase):
                      'quantity': '0'}.items())
                 .issubset(set(body['prestashop']['stock_available'].items())))
             self.assertDictEqual({}, self.parse_qs(request.uri))
+
+
+class TestExportQuantityShops(ExportStockQuantityCase):
+
+    def setUp(self):
+        super(TestExportQuantityShops, self).setUp()
+        env = self.backend_record.get_environment('_import_stock_available')
+        self.adapter = env.get_connector_unit(ProductInventoryAdapter)
+        self.clients = [('http://main/api', mock.Mock()),
+                        ('http://shop1/api', mock.Mock()),
+                        ('http://shop2/api', mock.Mock())]
+        patcher = mock.patch.object(type(self.adapter), '_shop_clients')
+        self.addCleanup(patcher.stop)
+        patcher.start().return_value = self.clients
+        self.filters = {'filter[id_product]': 1,
+                        'filter[id_product_attribute]': 0}
+
+    def test_all_shops(self):
+        """ The quantity is exported to every shop """
+        with mock.patch.object(type(self.adapter),
+                               'export_quantity_url') as export_mock:
+            self.adapter.export_quantity(self.filters, 42)
+        exported = set(call[1]['client']
+                       for call in export_mock.call_args_list)
+        self.assertEqual(set(client for __, client in self.clients),
+                         exported)
+
+    def test_shop_failure(self):
+        """ A shop failing does not stop the export to the others """
+        failing = self.clients[1][1]
+
+        def export(filters, quantity, client=None):
+            if client is failing:
+                raise ConnectionError('Connection refused')
+
+        with mock.patch.object(type(self.adapter),
+                               'export_quantity_url') as export_mock:
+            export_mock.side_effect = export
+            with self.assertRaises(NetworkRetryableError) as cm:
+                self.adapter.export_quantity(self.filters, 42)
+        self.assertEqual(3, export_mock.call_count)
+        self.assertIn('http://shop1/api', str(cm.exception))
+        self.assertNotIn('http://shop2/api', str(cm.exception))
+
+    def test_shop_error(self):
+        """ Errors which are not transient make the job fail """
+        with mock.patch.object(type(self.adapter),
+                               'export_quantity_url') as export_mock:
+            export_mock.side_effect = ValueError('Bad quantity')
+            with self.assertRaises(FailedJobError):
+                self.adapter.export_quantity(self.filters, 42)
+
+    def test_threads_do_not_read_backend(self):
+        """ The calls made by the threads do not read the backend """
+        for __, client in self.clients:
+            client.search.return_value = [1]
+            client.get.return_value = {
+                'stock_available': {'id': '1', 'quantity': '0'},
+            }
+        self.env.invalidate_all()
+        with mock.patch.object(type(self.backend_record),
+                               '_read_from_database') as read_mock:
+            self.adapter.export_quantity(self.filters, 42)
+        self.assertFalse(read_mock.called)
+        for __, client in self.clients:
+            client.edit.assert_called_once_with('stock_availables', {
+                'stock_available': {'id': '1', 'quantity': 42},
+            })
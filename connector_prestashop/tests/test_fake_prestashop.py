@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+from prestapyt import PrestaShopWebServiceError
+
+from openerp.addons.connector_prestashop.unit.backend_adapter import (
+    GenericAdapter,
+)
+
+from .common import PrestashopTransactionCase
+from .fake_prestashop.generator import generate
+from .fake_prestashop.webservice import FakePrestaShop, serve
+
+
+class TestFakePrestaShop(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestFakePrestaShop, self).setUp()
+        self.dataset = generate(products=30, combinations=2, customers=5,
+                                orders=5)
+        self.shop = FakePrestaShop(self.dataset, webservice_key='KEY')
+        server = serve(self.shop)
+        location = server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        self.backend_record.write({
+            'location': location,
+            'webservice_key': 'KEY',
+        })
+
+    def _get_adapter(self, model_name):
+        env = self.backend_record.get_environment(model_name)
+        return env.get_connector_unit(GenericAdapter)
+
+    def test_listing(self):
+        """ Listings are filtered, sorted and limited """
+        adapter = self._get_adapter('prestashop.product.template')
+        self.assertEqual([6, 7, 8], adapter.search({'limit': '5,3'}))
+        self.assertEqual(
+            [30, 29, 28],
+            adapter.search({'filter[id]': '>[27]', 'sort': '[id_DESC]'}),
+        )
+        self.assertEqual(
+            [12, 13],
+            adapter.search({'filter[reference]': '[REF12|REF13]'}),
+        )
+        records = list(adapter.iter_listing({'display': '[id,reference]',
+                                             'filter[id]': '[2|4]'}))
+        self.assertEqual([{'id': '2', 'reference': 'REF2'},
+                          {'id': '4', 'reference': 'REF4'}], records)
+
+    def test_read(self):
+        """ Records are read alone or in listings """
+        adapter = self._get_adapter('prestashop.product.template')
+        record = adapter.read(3)
+        self.assertEqual(
+            self.dataset.get('products', 3)['name']['language'][0]['value'],
+            record['name']['language']['value'],
+        )
+        records = adapter.read_many([1, 3])
+        self.assertEqual(['1', '3'], sorted(records))
+        with self.assertRaises(PrestaShopWebServiceError) as cm:
+            adapter.read(999)
+        self.assertEqual(404, cm.exception.error_code)
+
+    def test_write(self):
+        """ Records are updated """
+        adapter = self._get_adapter('_import_stock_available')
+        adapter.export_quantity_url({'filter[id_product]': '2'}, 42)
+        for record in self.dataset.records('stock_availables'):
+            if record['id_product'] == '2':
+                self.assertEqual('42', record['quantity'])
+        self.assertEqual(3, self.shop.calls[('PUT', 'stock_availables')])
+
+    def test_injected_errors(self):
+        """ Errors are injected in the responses """
+        self.shop.error_rate = 1
+        self.shop.error_codes = (400,)
+        adapter = self._get_adapter('prestashop.product.template')
+        with self.assertRaises(PrestaShopWebServiceError) as cm:
+            adapter.read(3)
+        self.assertEqual(400, cm.exception.error_code)
+
+    def test_generate(self):
+        """ The same options give the same dataset """
+        options = dict(products=5, combinations=3, languages=2,
+                       category_depth=1, customers=3, orders=4, seed=42)
+        dataset = generate(**options)
+        self.assertEqual(15, dataset.count('combinations'))
+        self.assertEqual(20, dataset.count('stock_availables'))
+        self.assertEqual(12, dataset.count('order_details'))
+        self.assertEqual(5, dataset.count('categories'))
+        product = dataset.get('products', 1)
+        self.assertEqual(2, len(product['name']['language']))
+        for resource in ('products', 'combinations', 'orders'):
+            self.assertEqual(dataset.records(resource),
+                             generate(**options).records(resource))
+        self.assertNotEqual(dataset.records('products'),
+                            generate(**dict(options, seed=1))
+                            .records('products'))
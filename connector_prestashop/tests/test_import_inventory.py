@@ -6,6 +6,7 @@ from collections import namedtuple
 
 import mock
 
+from openerp.tools import config
 from openerp.addons.connector_prestashop.unit.importer import (
     import_record,
 )
@@ -47,8 +48,8 @@ class TestImportInventory(PrestashopTransactionCase):
 
     @assert_no_job_delayed
     def test_import_inventory_batch(self):
-        record_job_path = ('openerp.addons.connector_prestashop.models'
-                           '.product_template.importer.import_record')
+        record_job_path = ('openerp.addons.connector_prestashop.unit'
+                           '.importer.import_record')
         # execute the batch job directly and replace the record import
         # by a mock (individual import is tested elsewhere)
         with recorder.use_cassette('test_import_inventory_batch') as cassette,\
@@ -57,7 +58,8 @@ class TestImportInventory(PrestashopTransactionCase):
             import_inventory(self.conn_session, self.backend_record.id)
             expected_query = {
                 'display': ['[id,id_product,id_product_attribute]'],
-                'limit': ['0,1000'],
+                'limit': ['1000'],
+                'sort': ['[id_ASC]'],
             }
             self.assertEqual(1, len(cassette.requests))
 
@@ -69,6 +71,28 @@ class TestImportInventory(PrestashopTransactionCase):
 
             self.assertEqual(52, import_record_mock.delay.call_count)
 
+    @assert_no_job_delayed
+    def test_import_inventory_batch_chunks(self):
+        """ The stocks are imported by chunks """
+        record_job_path = ('openerp.addons.connector_prestashop.unit'
+                           '.importer.import_record')
+        records_job_path = ('openerp.addons.connector_prestashop.unit'
+                            '.importer.import_records')
+        with recorder.use_cassette('test_import_inventory_batch'), \
+                mock.patch.dict(config.options, {
+                    'prestashop_import_chunk_sizes':
+                    '_import_stock_available:20'}), \
+                mock.patch(record_job_path) as import_record_mock, \
+                mock.patch(records_job_path) as import_records_mock:
+            import_inventory(self.conn_session, self.backend_record.id)
+        self.assertFalse(import_record_mock.delay.called)
+        calls = import_records_mock.delay.call_args_list
+        self.assertEqual([20, 20, 12], [len(call[0][3]) for call in calls])
+        # the records of the listing are handed to the jobs
+        records = calls[0][1]['records']
+        self.assertEqual(20, len(records))
+        self.assertIn('id_product_attribute', records[0])
+
     @assert_no_job_delayed
     def test_import_inventory_record_template(self):
         """ Import the inventory for a template"""
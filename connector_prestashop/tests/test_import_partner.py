@@ -82,7 +82,8 @@ class TestImportPartner(PrestashopTransactionCase):
             )
             expected_query = {
                 'date': ['1'],
-                'limit': ['0,1000'],
+                'limit': ['1000'],
+                'sort': ['[id_ASC]'],
                 'filter[date_upd]': ['>[2016-09-01 00:00:00]'],
             }
             self.assertEqual(2, len(cassette.requests))
@@ -179,7 +180,8 @@ class TestImportPartner(PrestashopTransactionCase):
                 filters={'filter[id_customer]': '1'}
             )
             expected_query = {
-                'limit': ['0,1000'],
+                'limit': ['1000'],
+                'sort': ['[id_ASC]'],
                 'filter[id_customer]': ['1'],
             }
             self.assertEqual(1, len(cassette.requests))
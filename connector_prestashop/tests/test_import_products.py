@@ -110,7 +110,8 @@ class TestImportProduct(PrestashopTransactionCase):
             )
             expected_query = {
                 'date': ['1'],
-                'limit': ['0,1000'],
+                'limit': ['1000'],
+                'sort': ['[id_ASC]'],
                 'filter[date_upd]': ['>[2016-09-01 00:00:00]'],
             }
             self.assertEqual(2, len(cassette.requests))
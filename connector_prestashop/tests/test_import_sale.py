@@ -78,7 +78,8 @@ class TestImportSale(PrestashopTransactionCase):
 
             expected_query = {
                 'date': ['1'],
-                'limit': ['0,1000'],
+                'limit': ['1000'],
+                'sort': ['[id_ASC]'],
                 'filter[date_upd]': ['>[2016-12-01 00:00:00]'],
             }
             self.assertEqual(2, len(cassette.requests))
@@ -90,7 +91,8 @@ class TestImportSale(PrestashopTransactionCase):
 
             expected_query = {
                 'date': ['1'],
-                'limit': ['0,1000'],
+                'limit': ['1000'],
+                'sort': ['[id_ASC]'],
                 'filter[date_add]': ['>[2016-12-01 00:00:00]'],
             }
             request = cassette.requests[1]
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import mock
+
+from openerp import api
+from openerp.addons.connector.session import ConnectorSession
+from openerp.addons.connector_prestashop.models.product_template.exporter \
+    import export_inventory
+from openerp.addons.connector_prestashop.models.record_cache.common import (
+    cache_cursor,
+)
+from openerp.addons.connector_prestashop.unit.importer import import_record
+
+from .common import PrestashopTransactionCase
+
+
+class TestJobIdentity(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestJobIdentity, self).setUp()
+        self.job_model = self.env['queue.job']
+        # the counters are written in their own transactions
+        self._cleanup()
+
+    def tearDown(self):
+        self._cleanup()
+        super(TestJobIdentity, self).tearDown()
+
+    def _cleanup(self):
+        with cache_cursor(self.env) as cr:
+            cr.execute("DELETE FROM prestashop_job_collapse "
+                       "WHERE backend_id = %s", (self.backend_record.id,))
+
+    def _collapsed(self):
+        with cache_cursor(self.env) as cr:
+            env = api.Environment(cr, self.env.uid, {})
+            return env['prestashop.job.collapse'].total(
+                self.backend_record.id
+            )
+
+    def _import_partner(self, prestashop_id, **kwargs):
+        return import_record.delay(self.conn_session,
+                                   'prestashop.res.partner',
+                                   self.backend_record.id, prestashop_id,
+                                   **kwargs)
+
+    def _jobs(self, uuids):
+        return self.job_model.search([('uuid', 'in', uuids)])
+
+    def test_collapse_import(self):
+        """ An import waiting to run is not delayed again """
+        uuid = self._import_partner(42)
+        self.assertEqual(uuid, self._import_partner(42, priority=5))
+        self.assertEqual(1, len(self._jobs([uuid])))
+        self.assertEqual(
+            'import_record(%d, prestashop.res.partner, 42)' %
+            self.backend_record.id,
+            self._jobs([uuid]).prestashop_identity_key
+        )
+        self.assertEqual(1, self._collapsed())
+
+    def test_other_records(self):
+        """ The imports of other records are delayed """
+        uuids = [self._import_partner(42), self._import_partner(43)]
+        self.assertEqual(2, len(self._jobs(uuids)))
+        self.assertEqual(0, self._collapsed())
+
+    def test_started_job(self):
+        """ An import is delayed again once the previous one started """
+        uuid = self._import_partner(42)
+        self._jobs([uuid]).write({'state': 'started'})
+        self.assertNotEqual(uuid, self._import_partner(42))
+
+    def test_listed_record(self):
+        """ The imports carrying their record are collapsed too, the job
+        reads the record again """
+        uuid = self._import_partner(42, record={'id': '42'})
+        self.assertFalse(self._jobs([uuid]).prestashop_collapsed)
+        self.assertEqual(uuid,
+                         self._import_partner(42, record={'id': '42'}))
+        self.assertTrue(self._jobs([uuid]).prestashop_collapsed)
+        self.assertEqual(1, self._collapsed())
+
+    def test_collapsed_job_reads_record(self):
+        """ A job in which imports have been collapsed does not import
+        the record it carries """
+        uuid = self._import_partner(42, record={'id': '42'})
+        self._import_partner(42)
+        importer_path = ('openerp.addons.connector_prestashop.unit.'
+                         'importer.PrestashopImporter.run')
+        job_uuid_path = ('openerp.addons.connector_prestashop.unit.'
+                         'importer.current_job_uuid')
+        with mock.patch(importer_path) as run_mock, \
+                mock.patch(job_uuid_path, return_value=uuid):
+            import_record(self.conn_session, 'prestashop.res.partner',
+                          self.backend_record.id, 42, record={'id': '42'})
+        run_mock.assert_called_once_with(42)
+
+    def test_collapse_export(self):
+        """ An export waiting to run is not delayed again """
+        self.sync_metadata()
+        self.shop = self.env['prestashop.shop'].search([])
+        binding = self._create_product_binding(name='Blouse',
+                                               template_ps_id=2,
+                                               variant_ps_id=7)
+        template = binding.main_template_id
+        uuids = [
+            export_inventory.delay(self.conn_session,
+                                   'prestashop.product.template',
+                                   template.id, fields=['quantity'])
+            for __ in range(3)
+        ]
+        self.assertEqual(1, len(set(uuids)))
+        self.assertEqual(2, self._collapsed())
+
+    def test_export_other_transaction(self):
+        """ An export is not collapsed in a job delayed by another
+        transaction, which could run before this one is committed """
+        self.sync_metadata()
+        self.shop = self.env['prestashop.shop'].search([])
+        binding = self._create_product_binding(name='Blouse',
+                                               template_ps_id=2,
+                                               variant_ps_id=7)
+        template = binding.main_template_id
+        identity_key = 'export_inventory(%d, %s, %d)' % (
+            self.backend_record.id, 'prestashop.product.template',
+            template.id,
+        )
+        with cache_cursor(self.env) as cr:
+            session = ConnectorSession.from_env(
+                api.Environment(cr, self.env.uid, {})
+            )
+            other_uuid = import_record.delay(session,
+                                             'prestashop.res.partner',
+                                             self.backend_record.id, 42)
+            cr.execute("UPDATE queue_job SET prestashop_identity_key = %s "
+                       "WHERE uuid = %s", (identity_key, other_uuid))
+        try:
+            uuid = export_inventory.delay(self.conn_session,
+                                          'prestashop.product.template',
+                                          template.id, fields=['quantity'])
+            self.assertNotEqual(other_uuid, uuid)
+            self.assertEqual(0, self._collapsed())
+        finally:
+            with cache_cursor(self.env) as cr:
+                cr.execute("DELETE FROM queue_job WHERE uuid = %s",
+                           (other_uuid,))
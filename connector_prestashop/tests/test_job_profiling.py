@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import base64
+import marshal
+
+import mock
+
+from openerp import api
+from openerp.addons.connector_prestashop.models.record_cache.common import (
+    cache_cursor,
+)
+from openerp.addons.connector_prestashop.unit.importer import import_record
+
+from .common import recorder, PrestashopTransactionCase
+
+
+class TestJobProfiling(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestJobProfiling, self).setUp()
+        self.sync_metadata()
+        self.base_mapping()
+        self.profiling_model = self.env['prestashop.job.profiling']
+        self.profile_name = 'prestashop-%d-no-job.prof' % (
+            self.backend_record.id
+        )
+        self._cleanup()
+
+    def tearDown(self):
+        self._cleanup()
+        super(TestJobProfiling, self).tearDown()
+
+    def _cleanup(self):
+        # the counters and the profiles are written in their own
+        # transactions
+        with cache_cursor(self.env) as cr:
+            cr.execute("DELETE FROM prestashop_job_profiling "
+                       "WHERE backend_id = %s", (self.backend_record.id,))
+            cr.execute("DELETE FROM ir_attachment WHERE name = %s",
+                       (self.profile_name,))
+
+    def _profiles(self):
+        with cache_cursor(self.env) as cr:
+            env = api.Environment(cr, self.env.uid, {})
+            attachments = env['ir.attachment'].search(
+                [('name', '=', self.profile_name)]
+            )
+            return [(marshal.loads(base64.b64decode(attachment.datas)),
+                     attachment.description)
+                    for attachment in attachments]
+
+    def _import_carrier(self):
+        with recorder.use_cassette('test_import_carrier_record_2'):
+            import_record(self.conn_session, 'prestashop.delivery.carrier',
+                          self.backend_record.id, 2)
+
+    def test_disabled(self):
+        """ No job is profiled by default """
+        self._import_carrier()
+        self.assertFalse(self._profiles())
+
+    def test_sampling(self):
+        """ The profile of a sampled job is attached """
+        self.backend_record.profile_sampling = 1
+        self._import_carrier()
+        profiles = self._profiles()
+        self.assertEqual(1, len(profiles))
+        stats, description = profiles[0]
+        self.assertTrue(any(function == 'run'
+                            for __, __, function in stats))
+        self.assertIn('prestashop.delivery.carrier', description)
+
+    def test_other_model(self):
+        """ Only the jobs of the profiled model are profiled """
+        self.backend_record.write({
+            'profile_sampling': 1,
+            'profile_model_id': self.env.ref(
+                'connector_prestashop.model_prestashop_res_partner').id,
+        })
+        self._import_carrier()
+        self.assertFalse(self._profiles())
+
+    def test_next_jobs(self):
+        """ The next jobs are profiled until the count is reached """
+        backend_id = self.backend_record.id
+        with cache_cursor(self.env) as cr:
+            env = api.Environment(cr, self.env.uid, {})
+            env['prestashop.job.profiling'].set_remaining_jobs(backend_id,
+                                                               2)
+        # the counter is read in the transaction of the job, which does
+        # not see the counter committed after it started
+        with mock.patch.object(type(self.profiling_model),
+                               'remaining_jobs') as remaining_jobs:
+            remaining_jobs.return_value = 2
+            selected = [
+                self.profiling_model.must_profile(
+                    self.backend_record, 'prestashop.delivery.carrier'
+                )
+                for __ in range(3)
+            ]
+        self.assertEqual([True, True, False], selected)
+
+    def test_set_next_jobs(self):
+        """ The count of the next jobs to profile is set on the backend """
+        self.backend_record.profile_next_jobs = 5
+        self.assertEqual(
+            5, self.profiling_model.remaining_jobs(self.backend_record.id)
+        )
+        self.backend_record.invalidate_cache()
+        self.assertEqual(5, self.backend_record.profile_next_jobs)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import unittest
+
+import mock
+
+from openerp import api
+from openerp.addons.connector_prestashop.models.record_cache.common import (
+    cache_cursor,
+)
+from openerp.addons.connector_prestashop.unit.importer import (
+    PrestashopImporter,
+    import_record,
+)
+from openerp.addons.connector_prestashop.unit.job_timing import PhaseTimer
+
+from .common import recorder, PrestashopTransactionCase
+
+
+class TestPhaseTimer(unittest.TestCase):
+
+    def test_phases(self):
+        """ The durations of a phase are accumulated """
+        with mock.patch('time.time') as time_mock:
+            time_mock.side_effect = [10, 10, 11, 12, 12.5, 13, 14, 15]
+            timer = PhaseTimer()
+            with timer.phase('map'):
+                pass
+            with timer.phase('map'):
+                pass
+            with timer.phase('write'):
+                pass
+            self.assertEqual(5, timer.total())
+        self.assertEqual(1.5, timer.durations['map'])
+        self.assertEqual(1, timer.durations['write'])
+        self.assertEqual(0, timer.durations['lock'])
+
+
+class TestJobTiming(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestJobTiming, self).setUp()
+        self.sync_metadata()
+        self.base_mapping()
+        self.timing_model = self.env['prestashop.job.timing']
+        # the timings are written in their own transactions
+        with cache_cursor(self.env) as cr:
+            cr.execute("DELETE FROM prestashop_job_timing "
+                       "WHERE backend_id = %s", (self.backend_record.id,))
+
+    def _timings(self):
+        with cache_cursor(self.env) as cr:
+            cr.execute("SELECT model, direction, prestashop_id, failed, "
+                       "       time_fetch, time_write, time_total "
+                       "FROM prestashop_job_timing "
+                       "WHERE backend_id = %s", (self.backend_record.id,))
+            return cr.fetchall()
+
+    def _report(self):
+        with cache_cursor(self.env) as cr:
+            env = api.Environment(cr, self.env.uid, {})
+            return env['prestashop.job.timing'].report(
+                self.backend_record.id
+            )
+
+    def _import_carrier(self):
+        with recorder.use_cassette('test_import_carrier_record_2'):
+            import_record(self.conn_session, 'prestashop.delivery.carrier',
+                          self.backend_record.id, 2)
+
+    def test_disabled(self):
+        """ Nothing is recorded when the job timings are disabled """
+        with mock.patch.object(type(self.timing_model), 'record') as record:
+            self._import_carrier()
+        self.assertFalse(record.called)
+
+    def test_import(self):
+        """ The phases of an import are recorded """
+        self.backend_record.job_timing = True
+        self._import_carrier()
+        timings = self._timings()
+        self.assertEqual(1, len(timings))
+        model, direction, prestashop_id, failed, fetch, write, total = \
+            timings[0]
+        self.assertEqual(('prestashop.delivery.carrier', 'import', '2'),
+                         (model, direction, prestashop_id))
+        self.assertFalse(failed)
+        self.assertGreater(fetch, 0)
+        self.assertGreater(write, 0)
+        self.assertGreaterEqual(total, fetch + write)
+
+    def test_failed_import(self):
+        """ The timings of a failed import are kept """
+        self.backend_record.job_timing = True
+        with mock.patch.object(PrestashopImporter, '_import') as import_mock:
+            import_mock.side_effect = ValueError
+            with self.assertRaises(ValueError):
+                self._import_carrier()
+        timings = self._timings()
+        self.assertEqual(1, len(timings))
+        self.assertTrue(timings[0][3])
+
+    def test_report(self):
+        """ The phases are averaged per binding model """
+        backend_id = self.backend_record.id
+        for duration in (0.1, 0.3):
+            timer = PhaseTimer()
+            timer.durations['map'] = duration
+            self.timing_model.record(backend_id, 'prestashop.res.partner',
+                                     'import', timer, prestashop_id=1)
+        timer = PhaseTimer()
+        timer.durations['write'] = 1
+        self.timing_model.record(backend_id, 'prestashop.res.partner',
+                                 'export', timer, binding_id=1)
+        report = self._report()
+        self.assertEqual(
+            set([('prestashop.res.partner', 'import'),
+                 ('prestashop.res.partner', 'export')]),
+            set(report)
+        )
+        imports = report[('prestashop.res.partner', 'import')]
+        self.assertEqual(2, imports['count'])
+        self.assertAlmostEqual(200, imports['map'])
+        self.assertEqual(0, imports['write'])
+        exports = report[('prestashop.res.partner', 'export')]
+        self.assertAlmostEqual(1000, exports['write'])
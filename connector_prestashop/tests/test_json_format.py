@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import json
+import unittest
+
+import mock
+from prestapyt import xml2dict
+
+from openerp.addons.connector_prestashop.unit.backend_adapter import (
+    GenericAdapter,
+    PrestaShopWebServiceJSON,
+    client_pool,
+)
+from openerp.addons.connector_prestashop.unit.json_normalizer import (
+    JSONNormalizer,
+)
+
+from .common import PrestashopTransactionCase
+
+PRODUCT_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<prestashop xmlns:xlink="http://www.w3.org/1999/xlink">
+<product>
+    <id><![CDATA[1]]></id>
+    <id_default_combination xlink:href="http://localhost/api/combinations/1"
+        notFilterable="true"><![CDATA[1]]></id_default_combination>
+    <type notFilterable="true"><![CDATA[simple]]></type>
+    <price><![CDATA[16.510000]]></price>
+    <name>
+        <language id="1" xlink:href="http://localhost/api/languages/1">
+            <![CDATA[Faded Short Sleeves T-shirt]]></language>
+        <language id="2" xlink:href="http://localhost/api/languages/2">
+            <![CDATA[T-shirt délavé manches courtes]]></language>
+    </name>
+    <link_rewrite>
+        <language id="1" xlink:href="http://localhost/api/languages/1">
+            <![CDATA[faded-short-sleeves-tshirt]]></language>
+    </link_rewrite>
+    <associations>
+        <categories nodeType="category" api="categories">
+            <category xlink:href="http://localhost/api/categories/2">
+                <id><![CDATA[2]]></id>
+            </category>
+            <category xlink:href="http://localhost/api/categories/5">
+                <id><![CDATA[5]]></id>
+            </category>
+        </categories>
+        <images nodeType="image" api="images">
+            <image xlink:href="http://localhost/api/images/products/1/1">
+                <id><![CDATA[1]]></id>
+            </image>
+        </images>
+        <tags nodeType="tag" api="tags"/>
+    </associations>
+</product>
+</prestashop>
+"""
+
+PRODUCT_JSON = json.dumps({
+    'product': {
+        'id': 1,
+        'id_default_combination': 1,
+        'type': 'simple',
+        'price': '16.510000',
+        'name': [
+            {'id': '1', 'value': 'Faded Short Sleeves T-shirt'},
+            {'id': '2', 'value': u'T-shirt délavé manches courtes'},
+        ],
+        'link_rewrite': [
+            {'id': '1', 'value': 'faded-short-sleeves-tshirt'},
+        ],
+        'associations': {
+            'categories': [{'id': '2'}, {'id': '5'}],
+            'images': [{'id': '1'}],
+            'tags': [],
+        },
+    },
+})
+
+
+class TestJSONNormalizer(unittest.TestCase):
+
+    def _xml(self, content):
+        return xml2dict.xml2dict(content)['prestashop']
+
+    def test_record(self):
+        """ A record in JSON is normalized as it would be in XML """
+        normalizer = JSONNormalizer()
+        self.assertEqual(
+            self._xml(PRODUCT_XML),
+            normalizer.normalize(json.loads(PRODUCT_JSON), 'products'),
+        )
+
+    def test_version_keys(self):
+        """ Association nodes are named after the version keys """
+        normalizer = JSONNormalizer({'category': 'categories'})
+        record = normalizer.normalize(
+            json.loads(PRODUCT_JSON), 'products')['product']
+        self.assertEqual(
+            [{'id': '2'}, {'id': '5'}],
+            record['associations']['categories']['categories'],
+        )
+
+    def test_untranslated(self):
+        """ An empty translation list gets the languages of the other
+        multilingual fields, empty """
+        xml = ('<prestashop><product><id>1</id>'
+               '<name><language id="1">Blouse</language>'
+               '<language id="2">Blouse</language></name>'
+               '<description><language id="1"/><language id="2"/>'
+               '</description></product></prestashop>')
+        content = {'product': {
+            'id': 1,
+            'name': [{'id': '1', 'value': 'Blouse'},
+                     {'id': '2', 'value': 'Blouse'}],
+            'description': [],
+        }}
+        normalizer = JSONNormalizer()
+        self.assertEqual(self._xml(xml),
+                         normalizer.normalize(content, 'products'))
+
+    def test_untranslated_alone(self):
+        """ Without other multilingual field, an empty translation list
+        is an empty node """
+        xml = ('<prestashop><product><id>1</id><description/>'
+               '</product></prestashop>')
+        content = {'product': {'id': 1, 'description': []}}
+        normalizer = JSONNormalizer()
+        self.assertEqual(self._xml(xml),
+                         normalizer.normalize(content, 'products'))
+
+    def test_listing_ids(self):
+        """ A listing without display gives the ids as attributes """
+        xml = ('<prestashop><products><product id="1"/>'
+               '<product id="2"/></products></prestashop>')
+        normalizer = JSONNormalizer()
+        content = {'products': [{'id': 1}, {'id': 2}]}
+        self.assertEqual(
+            self._xml(xml),
+            normalizer.normalize(content, 'products', listing=True),
+        )
+
+    def test_listing_one(self):
+        """ A listing with one record does not give a list """
+        xml = ('<prestashop><products><product><id>1</id>'
+               '<price>3.5</price></product></products></prestashop>')
+        normalizer = JSONNormalizer()
+        content = {'products': [{'id': 1, 'price': '3.5'}]}
+        self.assertEqual(
+            self._xml(xml),
+            normalizer.normalize(content, 'products',
+                                 listing=True, display=True),
+        )
+
+    def test_listing_empty(self):
+        """ An empty listing gives an empty string """
+        xml = '<prestashop><products/></prestashop>'
+        normalizer = JSONNormalizer()
+        self.assertEqual(
+            self._xml(xml),
+            normalizer.normalize([], 'products', listing=True),
+        )
+
+
+class TestJSONAdapter(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestJSONAdapter, self).setUp()
+        client_pool.clear()
+        self.backend_record.webservice_json = True
+        env = self.backend_record.get_environment(
+            'prestashop.product.template'
+        )
+        self.adapter = env.get_connector_unit(GenericAdapter)
+
+    def test_read(self):
+        """ The adapter reads the records in JSON when configured so """
+        self.assertIsInstance(self.adapter.client, PrestaShopWebServiceJSON)
+        with mock.patch.object(self.adapter.client, '_execute') as execute:
+            execute.return_value.content = PRODUCT_JSON
+            execute.return_value.headers = {}
+            record = self.adapter.read(1)
+        url = execute.call_args[0][0]
+        self.assertTrue(url.endswith('products/1?output_format=JSON'))
+        self.assertEqual(self._xml_record(), record)
+
+    def _xml_record(self):
+        return xml2dict.xml2dict(PRODUCT_XML)['prestashop']['product']
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import base64
+import hashlib
+import os
+import uuid
+
+import mock
+
+from openerp import api
+from openerp.addons.connector_prestashop.models.product_image.common import (
+    ProductImageAdapter,
+)
+from openerp.addons.connector_prestashop.models.record_cache.common import (
+    cache_cursor,
+)
+from openerp.addons.connector_prestashop.unit.backend_adapter import (
+    PrestaShopWebServiceImage,
+)
+
+from .common import PrestashopTransactionCase
+
+
+class TestProductImageDownload(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestProductImageDownload, self).setUp()
+        env = self.backend_record.get_environment('prestashop.product.image')
+        self.adapter = env.get_connector_unit(ProductImageAdapter)
+        self.chunks = ['\xff\xd8\xff\xe0', 'JFIF' * 1000, '\xff\xd9']
+        self.content = ''.join(self.chunks)
+
+    def _response(self):
+        response = mock.Mock()
+        response.headers = {'content-type': 'image/jpeg'}
+        response.content = self.content
+        response.iter_content.return_value = iter(self.chunks)
+        return response
+
+    def test_download(self):
+        """ An image is downloaded in an attachment """
+        with mock.patch.object(PrestaShopWebServiceImage,
+                               'get_image_stream') as stream:
+            response = stream.return_value = self._response()
+            record = self.adapter.download(1, 12)
+        stream.assert_called_once_with('products', 1, 12)
+        self.assertTrue(response.close.called)
+        self.assertEqual('image/jpeg', record['type'])
+        self.assertEqual(len(self.content), record['size'])
+        self.assertEqual(hashlib.sha1(self.content).hexdigest(),
+                         record['checksum'])
+        self.assertTrue(record['full_public_url'].endswith('/1/2/12.jpg'))
+        attachment = self.env['ir.attachment'].browse(
+            record['attachment_id']
+        )
+        self.assertEqual(self.content, base64.b64decode(attachment.datas))
+        self.assertEqual(len(self.content), attachment.file_size)
+
+    def test_download_same_content(self):
+        """ Images with the same content share the same file """
+        with mock.patch.object(PrestaShopWebServiceImage,
+                               'get_image_stream') as stream:
+            stream.return_value = self._response()
+            first = self.adapter.download(1, 12)
+            stream.return_value = self._response()
+            second = self.adapter.download(2, 13)
+        self.assertNotEqual(first['attachment_id'], second['attachment_id'])
+        self.assertEqual(first['store_fname'], second['store_fname'])
+
+    def test_download_rolled_back(self):
+        """ The file of an image downloaded by a transaction rolled back
+        is removed """
+        # a content not yet in the filestore
+        self.chunks.append(uuid.uuid4().hex)
+        self.content = ''.join(self.chunks)
+        with mock.patch.object(PrestaShopWebServiceImage,
+                               'get_image_stream') as stream:
+            stream.return_value = self._response()
+            with self.assertRaises(ValueError):
+                with self.env.cr.savepoint():
+                    record = self.adapter.download(1, 12)
+                    raise ValueError
+        full_path = self.env['ir.attachment']._full_path(
+            record['store_fname']
+        )
+        self.assertTrue(os.path.exists(full_path))
+        # the files are listed in their own transactions
+        with cache_cursor(self.env) as cr:
+            env = api.Environment(cr, self.env.uid, {})
+            file_model = env['prestashop.image.file']
+            with mock.patch.object(type(file_model),
+                                   '_gc_delay') as delay_mock:
+                delay_mock.return_value = 0
+                file_model._scheduler_cleanup()
+        self.assertFalse(os.path.exists(full_path))
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import mock
+import requests
+from prestapyt import PrestaShopWebServiceError
+
+from openerp.addons.connector.exception import NetworkRetryableError
+from openerp.addons.connector_prestashop.models.record_cache.common import (
+    cache_cursor,
+)
+from openerp.addons.connector_prestashop.unit.backend_adapter import (
+    GenericAdapter,
+)
+
+from .common import PrestashopTransactionCase
+
+SLEEP_PATH = ('openerp.addons.connector_prestashop.models.'
+              'rate_limit.common.time.sleep')
+
+
+class TestRateLimit(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestRateLimit, self).setUp()
+        self.rate_limit = self.env['prestashop.rate.limit']
+        # the buckets are written in their own transactions
+        with cache_cursor(self.env) as cr:
+            cr.execute("DELETE FROM prestashop_rate_limit "
+                       "WHERE backend_id = %s", (self.backend_record.id,))
+
+    def _limit(self):
+        limits = self.rate_limit.limits(self.backend_record)
+        return self.rate_limit.limit(limits)
+
+    def _rate(self):
+        with cache_cursor(self.env) as cr:
+            cr.execute("SELECT rate FROM prestashop_rate_limit "
+                       "WHERE backend_id = %s", (self.backend_record.id,))
+            return cr.fetchone()[0]
+
+    def test_no_limit(self):
+        """ Without limit, the calls are not delayed """
+        with mock.patch(SLEEP_PATH) as sleep_mock:
+            for __ in range(3):
+                with self._limit():
+                    pass
+        self.assertFalse(sleep_mock.called)
+
+    def test_token_bucket(self):
+        """ Calls exceeding the rate wait for their token """
+        self.backend_record.rate_limit = 1
+        with mock.patch(SLEEP_PATH) as sleep_mock:
+            for __ in range(3):
+                with self._limit():
+                    pass
+        waits = [call[0][0] for call in sleep_mock.call_args_list]
+        self.assertEqual(2, len(waits))
+        self.assertAlmostEqual(1, waits[0], places=1)
+        self.assertAlmostEqual(2, waits[1], places=1)
+
+    def test_max_wait(self):
+        """ A call which would wait too long makes the job retry """
+        self.backend_record.rate_limit = 1
+        with mock.patch.object(type(self.rate_limit), '_max_wait') as max_wait:
+            max_wait.return_value = 0
+            with self._limit():
+                pass
+            with self.assertRaises(NetworkRetryableError):
+                with self._limit():
+                    pass
+
+    def test_throttled(self):
+        """ The rate is halved when PrestaShop is overloaded """
+        self.backend_record.rate_limit = 10
+        with self.assertRaises(PrestaShopWebServiceError):
+            with self._limit():
+                raise PrestaShopWebServiceError('Service Unavailable', 503)
+        self.assertAlmostEqual(5, self._rate())
+        with self._limit():
+            pass
+        self.assertAlmostEqual(5.5, self._rate())
+
+    def test_throttled_response(self):
+        """ The rate is halved when PrestaShop answers 429 without a
+        PrestaShop error in the body """
+        self.backend_record.rate_limit = 10
+        env = self.backend_record.get_environment(
+            'prestashop.product.template'
+        )
+        adapter = env.get_connector_unit(GenericAdapter)
+        adapter._retry_attempts = 0
+        response = requests.Response()
+        response.status_code = 429
+        response._content = 'Too Many Requests'
+        with mock.patch.object(adapter.client.client,
+                               'request') as request_mock:
+            request_mock.return_value = response
+            with self.assertRaises(PrestaShopWebServiceError):
+                adapter.read(1)
+        self.assertAlmostEqual(5, self._rate())
+
+    def test_max_concurrency(self):
+        """ Calls exceeding the concurrency wait for a slot """
+        self.backend_record.max_concurrency = 1
+        with mock.patch.object(type(self.rate_limit), '_max_wait') as max_wait:
+            max_wait.return_value = 0
+            with self._limit():
+                with self.assertRaises(NetworkRetryableError):
+                    with self._limit():
+                        pass
+            # the slot has been released
+            with self._limit():
+                pass
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import mock
+from prestapyt import PrestaShopWebServiceError
+
+from openerp.addons.connector_prestashop.models.record_cache.common import (
+    cache_cursor,
+)
+from openerp.addons.connector_prestashop.unit.backend_adapter import (
+    GenericAdapter,
+)
+from openerp.addons.connector_prestashop.unit.importer import (
+    PrestashopImporter,
+)
+
+from .common import PrestashopTransactionCase
+
+
+class TestRecordCache(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestRecordCache, self).setUp()
+        self.cache = self.env['prestashop.record.cache']
+        self.record = {'id': '1', 'firstname': 'John',
+                       'date_upd': '2016-12-01 10:00:00'}
+        env = self.backend_record.get_environment('prestashop.res.partner')
+        self.importer = env.get_connector_unit(PrestashopImporter)
+        self.importer.prestashop_id = 1
+
+    def test_store_get(self):
+        """ Records are stored and read back """
+        backend_id = self.backend_record.id
+        self.assertEqual((None, None),
+                         self.cache.get_record(backend_id, 'customers', 1))
+        self.cache.store_record(backend_id, 'customers', 1, self.record)
+        record, age = self.cache.get_record(backend_id, 'customers', 1)
+        self.assertEqual(self.record, record)
+        self.assertLess(age, 60)
+
+    def test_prune(self):
+        """ Least recently used records are removed first """
+        backend_id = self.backend_record.id
+        self.cache.store_record(backend_id, 'customers', 1, self.record)
+        self.cache.store_record(backend_id, 'customers', 2, self.record)
+        self.cache.get_record(backend_id, 'customers', 1)
+        self.cache.prune(max_size=len(str(self.record)) + 50)
+        self.assertEqual(
+            (None, None), self.cache.get_record(backend_id, 'customers', 2)
+        )
+        self.assertTrue(self.cache.get_record(backend_id, 'customers', 1)[0])
+
+    def test_read_and_store(self):
+        """ A record not cached is read and stored """
+        adapter = self.importer.backend_adapter
+        with mock.patch.object(adapter, 'read') as read_mock:
+            read_mock.return_value = self.record
+            self.assertEqual(self.record,
+                             self.importer._get_prestashop_data())
+        record, __ = self.cache.get_record(self.backend_record.id,
+                                           'customers', 1)
+        self.assertEqual(self.record, record)
+
+    def test_validated_by_date_upd(self):
+        """ A cached record is used while its date_upd is unchanged """
+        self.cache.store_record(self.backend_record.id, 'customers', 1,
+                                self.record)
+        adapter = self.importer.backend_adapter
+        with mock.patch.object(adapter, 'read') as read_mock, \
+                mock.patch.object(adapter, 'read_many') as read_many_mock:
+            read_many_mock.return_value = {
+                '1': {'id': '1', 'date_upd': '2016-12-01 10:00:00'},
+            }
+            self.assertEqual(self.record,
+                             self.importer._get_prestashop_data())
+            self.assertFalse(read_mock.called)
+            read_many_mock.return_value = {
+                '1': {'id': '1', 'date_upd': '2016-12-02 10:00:00'},
+            }
+            read_mock.return_value = dict(self.record, firstname='Jack')
+            self.assertEqual('Jack',
+                             self.importer._get_prestashop_data()['firstname'])
+
+    def test_trusted_for_dependencies(self):
+        """ Dependencies use a record just read without checking it """
+        self.cache.store_record(self.backend_record.id, 'customers', 1,
+                                self.record)
+        self.importer.trust_cached_record = True
+        adapter = self.importer.backend_adapter
+        with mock.patch.object(adapter, 'read') as read_mock, \
+                mock.patch.object(adapter, 'read_many') as read_many_mock:
+            self.assertEqual(self.record,
+                             self.importer._get_prestashop_data())
+            self.assertFalse(read_mock.called)
+            self.assertFalse(read_many_mock.called)
+
+
+class TestConditionalGet(PrestashopTransactionCase):
+
+    def setUp(self):
+        super(TestConditionalGet, self).setUp()
+        env = self.backend_record.get_environment(
+            'prestashop.product.template'
+        )
+        self.adapter = env.get_connector_unit(GenericAdapter)
+
+    def _response(self, headers):
+        response = mock.Mock()
+        response.status_code = 200
+        response.content = ('<prestashop><product><id>1</id>'
+                            '<price>3.5</price></product></prestashop>')
+        response.headers = headers
+        return response
+
+    def test_not_modified(self):
+        """ An unchanged record is not sent again by PrestaShop """
+        with mock.patch.object(self.adapter.client, '_execute') as execute:
+            execute.return_value = self._response({'etag': '"abc"'})
+            record = self.adapter.read(1)
+            self.assertEqual({}, execute.call_args[1]['add_headers'])
+            execute.return_value = mock.Mock(status_code=304, content='')
+            self.assertEqual(record, self.adapter.read(1))
+            self.assertEqual({'If-None-Match': '"abc"'},
+                             execute.call_args[1]['add_headers'])
+
+    def test_modified(self):
+        """ A changed record is read and its validators updated """
+        with mock.patch.object(self.adapter.client, '_execute') as execute:
+            execute.return_value = self._response(
+                {'last-modified': 'Thu, 01 Dec 2016 10:00:00 GMT'}
+            )
+            self.adapter.read(1)
+            execute.return_value = self._response({'etag': '"def"'})
+            self.assertEqual('3.5', self.adapter.read(1)['price'])
+            self.assertEqual(
+                {'If-Modified-Since': 'Thu, 01 Dec 2016 10:00:00 GMT'},
+                execute.call_args[1]['add_headers']
+            )
+            self.adapter.read(1)
+            self.assertEqual({'If-None-Match': '"def"'},
+                             execute.call_args[1]['add_headers'])
+
+    def test_without_validators(self):
+        """ The records are not stored when PrestaShop gives no
+        validators """
+        with mock.patch.object(self.adapter.client, '_execute') as execute:
+            execute.return_value = self._response({})
+            self.adapter.read(1)
+        self.assertEqual(
+            (None, None),
+            self.env['prestashop.record.cache'].get_record(
+                self.backend_record.id, 'products', 1
+            )
+        )
+
+
+class TestMissingRecord(PrestashopTransactionCase):
+
+    def _saved_calls(self):
+        # the counters are written in their own transactions
+        self.env['prestashop.missing.record'].flush()
+        with cache_cursor(self.env) as cr:
+            cr.execute("SELECT saved_calls FROM prestashop_missing_record "
+                       "WHERE backend_id = %s AND resource = 'products' "
+                       "AND prestashop_id = '999'",
+                       (self.backend_record.id,))
+            return cr.fetchone()[0]
+
+    def test_missing(self):
+        """ A record not found is not read again """
+        env = self.backend_record.get_environment(
+            'prestashop.product.template'
+        )
+        adapter = env.get_connector_unit(GenericAdapter)
+        with mock.patch.object(adapter.client, '_execute') as get_mock:
+            get_mock.side_effect = PrestaShopWebServiceError(
+                'Not Found', 404, ps_error_msg='Product not found'
+            )
+            with self.assertRaises(PrestaShopWebServiceError):
+                adapter.read(999)
+            saved_calls = self._saved_calls()
+            with self.assertRaises(PrestaShopWebServiceError) as cm:
+                adapter.read(999)
+            self.assertEqual(404, cm.exception.error_code)
+            self.assertEqual(1, get_mock.call_count)
+            self.assertEqual(saved_calls + 1, self._saved_calls())
+            # read again after a flush
+            self.backend_record.button_flush_cache()
+            with self.assertRaises(PrestaShopWebServiceError):
+                adapter.read(999)
+            self.assertEqual(2, get_mock.call_count)
+
+    def test_existing_records(self):
+        """ The reads of records not known to be missing do not query
+        the database """
+        missing = self.env['prestashop.missing.record']
+        backend_id = self.backend_record.id
+        self.assertIsNone(missing.get_error(backend_id, 'products', 1))
+        cursor_path = ('openerp.addons.connector_prestashop.models.'
+                       'record_cache.common.cache_cursor')
+        with mock.patch(cursor_path) as cursor_mock:
+            for prestashop_id in range(2, 10):
+                self.assertIsNone(
+                    missing.get_error(backend_id, 'products', prestashop_id)
+                )
+        self.assertFalse(cursor_mock.called)
+
+    def test_refresh(self):
+        """ The records registered by the other workers are known once
+        the missing records are read again """
+        missing = self.env['prestashop.missing.record']
+        backend_id = self.backend_record.id
+        self.assertIsNone(missing.get_error(backend_id, 'products', 999))
+        # registered by another worker
+        with cache_cursor(self.env) as cr:
+            cr.execute("DELETE FROM prestashop_missing_record "
+                       "WHERE backend_id = %s AND resource = 'products' "
+                       "AND prestashop_id = '999'", (backend_id,))
+            cr.execute(
+                "INSERT INTO prestashop_missing_record "
+                "(backend_id, resource, prestashop_id, error, "
+                " expire_date, saved_calls) "
+                "VALUES (%s, 'products', '999', 'Product not found', "
+                "        now() at time zone 'UTC' + interval '1 hour', 0)",
+                (backend_id,)
+            )
+        self.assertIsNone(missing.get_error(backend_id, 'products', 999))
+        with mock.patch.object(type(missing), '_refresh_delay',
+                               return_value=0):
+            self.assertEqual(
+                'Product not found',
+                missing.get_error(backend_id, 'products', 999)
+            )
+
+    def test_other_errors(self):
+        """ Other errors than 'not found' are not remembered """
+        env = self.backend_record.get_environment(
+            'prestashop.product.template'
+        )
+        adapter = env.get_connector_unit(GenericAdapter)
+        with mock.patch.object(adapter.client, '_execute') as get_mock:
+            get_mock.side_effect = PrestaShopWebServiceError(
+                'Internal Server Error', 500
+            )
+            for __ in range(2):
+                with self.assertRaises(PrestaShopWebServiceError):
+                    adapter.read(999)
+            self.assertEqual(2, get_mock.call_count)
@@ -1,17 +1,36 @@
 # -*- coding: utf-8 -*-
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
-from openerp import exceptions, _
+from openerp import exceptions, http, _
+from openerp.tools import config
 from openerp.addons.connector.exception import NetworkRetryableError
 from openerp.addons.connector.unit.backend_adapter import CRUDAdapter
 
+from .cache import reference_cache
+from .json_normalizer import JSONNormalizer
+from .version_key import VersionKey
+
 from contextlib import contextmanager
-from requests.exceptions import HTTPError, RequestException, ConnectionError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import (
+    HTTPError, RequestException, ConnectionError, Timeout,
+)
 import base64
+import httplib
+import json
 import logging
+import random
+import threading
+import time
+import requests
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
 _logger = logging.getLogger(__name__)
 try:
     from prestapyt import PrestaShopWebServiceDict, PrestaShopWebServiceError
+    from prestapyt import xml2dict
 except:
     _logger.debug('Cannot import from `prestapyt`')
 
@@ -48,10 +67,142 @@ def api_handle_errors(message=''):
         )
 
 
-class PrestaShopWebServiceImage(PrestaShopWebServiceDict):
+# answers of PrestaShop (or of the proxies in front of it) telling that
+# the shop is momentarily unavailable
+TRANSIENT_STATUS = (429, 502, 503, 504)
 
-    def get_image(self, resource, resource_id=None, image_id=None,
-                  options=None):
+HTTP_REASONS = dict(httplib.responses)
+HTTP_REASONS[429] = 'Too Many Requests'  # not in httplib
+
+
+def is_transient_error(err):
+    """ Return whether the error of a call to PrestaShop is transient,
+    in which case the call may succeed when done again """
+    if isinstance(err, (ConnectionError, Timeout)):
+        return True
+    if isinstance(err, PrestaShopWebServiceError):
+        return err.error_code in TRANSIENT_STATUS
+    return False
+
+
+# HTTP method of the calls, by name of the method of the client,
+# the other methods are GETs
+HTTP_METHODS = {
+    'add': 'POST',
+    'edit': 'PUT',
+    'delete': 'DELETE',
+    'head': 'HEAD',
+}
+
+# status and size of the responses received during the sampled calls of
+# the current thread, see :meth:`PrestaShopCRUDAdapter._sampled`
+_response_stats = threading.local()
+
+
+def record_response(response, *args, **kwargs):
+    """ Hook of the sessions counting the responses of the sampled calls
+    """
+    stats = getattr(_response_stats, 'current', None)
+    if stats is None:
+        return
+    stats['status'] = response.status_code
+    length = response.headers.get('content-length')
+    if length is None and not kwargs.get('stream'):
+        # the content is read by requests right after the hook anyway
+        length = len(response.content)
+    stats['bytes'] += int(length or 0)
+
+
+# timers of the synchronizations of records running in the current
+# thread, see :func:`counting_calls`
+_sync_timers = threading.local()
+
+
+@contextmanager
+def counting_calls(timer):
+    """ Count the sampled calls made in the context in the ``calls`` and
+    ``bytes`` of ``timer``, a
+    :class:`~connector_prestashop.unit.job_timing.PhaseTimer`
+
+    The calls made in a nested context are only counted in its timer.
+    """
+    previous = getattr(_sync_timers, 'current', None)
+    _sync_timers.current = timer
+    try:
+        yield
+    finally:
+        _sync_timers.current = previous
+
+
+def current_job_uuid():
+    """ UUID of the job run by the current request, if any """
+    try:
+        return http.request.params.get('job_uuid')
+    except (RuntimeError, AttributeError):
+        # not in a request (cron, shell, tests)
+        return None
+
+
+def iter_listing_records(source):
+    """ Parse incrementally a XML listing and yield its elements
+
+    The elements have the same structure as the ones of the listings
+    returned by ``PrestaShopWebServiceDict.get``. Each element is
+    discarded from the tree once yielded, so only one of them is held
+    in memory whatever the size of the listing is.
+
+    :param source: file-like object with the XML response
+    """
+    depth = 0
+    listing = None
+    try:
+        for event, element in ElementTree.iterparse(
+                source, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if depth == 2:
+                    listing = element
+                continue
+            depth -= 1
+            if depth == 2:
+                record = xml2dict._parse_node(element)
+                listing.clear()
+                yield record
+    except ElementTree.ParseError as err:
+        raise PrestaShopWebServiceError(
+            'HTTP XML response is not parsable : %s' % (err,)
+        )
+
+
+class PrestaShopWebServiceStatus(PrestaShopWebServiceDict):
+    """ Webservice client raising the errors with their HTTP status
+
+    prestapyt parses the body of an error before raising its status,
+    but the proxies and PHP-FPM in front of PrestaShop answer with HTML
+    or empty bodies, which fail to parse: the error raised then has no
+    status and an outage is neither retried, nor counted by the circuit
+    breaker, nor slowing down the rate limit. The transient statuses are
+    raised without reading the body, the other errors keep their status
+    when their body is not a PrestaShop error.
+    """
+
+    def _check_status_code(self, status_code, content):
+        reason = HTTP_REASONS.get(status_code, 'Unknown error')
+        if status_code in TRANSIENT_STATUS:
+            raise PrestaShopWebServiceError(reason, status_code)
+        try:
+            return super(PrestaShopWebServiceStatus,
+                         self)._check_status_code(status_code, content)
+        except PrestaShopWebServiceError as err:
+            if err.error_code is not None:
+                raise
+            raise PrestaShopWebServiceError(reason, status_code)
+
+
+class PrestaShopWebServiceImage(PrestaShopWebServiceStatus):
+
+    def _image_url(self, resource, resource_id=None, image_id=None,
+                   options=None):
         full_url = self._api_url + 'images/' + resource
         if resource_id is not None:
             full_url += "/%s" % (resource_id,)
@@ -60,6 +211,32 @@ class PrestaShopWebServiceImage(PrestaShopWebServiceDict):
         if options is not None:
             self._validate_query_options(options)
             full_url += "?%s" % (self._options_to_querystring(options),)
+        return full_url
+
+    def get_image_stream(self, resource, resource_id=None, image_id=None,
+                         options=None):
+        """ Send the request of an image without reading its content
+
+        The caller reads the content with ``response.iter_content()``
+        and closes the response.
+
+        :rtype: :class:`requests.Response`
+        """
+        full_url = self._image_url(resource, resource_id, image_id,
+                                   options=options)
+        response = self.client.get(full_url, stream=True)
+        if response.status_code not in (200, 201):
+            try:
+                self._check_status_code(response.status_code,
+                                        response.content)
+            finally:
+                response.close()
+        return response
+
+    def get_image(self, resource, resource_id=None, image_id=None,
+                  options=None):
+        full_url = self._image_url(resource, resource_id, image_id,
+                                   options=options)
         response = self._execute(full_url, 'GET')
         if response.content:
             image_content = base64.b64encode(response.content)
@@ -85,6 +262,191 @@ class PrestaShopWebServiceImage(PrestaShopWebServiceDict):
         return url
 
 
+class PrestaShopWebServiceConditional(PrestaShopWebServiceStatus):
+    """ Webservice client able to read a record with a conditional GET
+
+    When the validators (``ETag``, ``Last-Modified``) of the previous
+    response are given, PrestaShop, or a cache in front of it, can
+    answer 304 instead of sending the record again.
+    """
+
+    def _record_url(self, resource, resource_id):
+        return self._api_url + resource + "/%s" % (resource_id,)
+
+    def _parse_record(self, response, resource):
+        return self._parse(response.content)['prestashop']
+
+    def _check_status_code(self, status_code, content):
+        if status_code == 304:
+            # not an error, the body is empty
+            return True
+        return super(PrestaShopWebServiceConditional,
+                     self)._check_status_code(status_code, content)
+
+    def get_conditional(self, resource, resource_id, etag=None,
+                        last_modified=None):
+        """ Retrieve a record unless it is unchanged
+
+        :return: ``(content, validators)``, ``content`` is None when
+                 the record is unchanged, ``validators`` is a dict with
+                 the ``etag`` and ``last_modified`` of the response
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        url = self._record_url(resource, resource_id)
+        response = self._execute(url, 'GET', add_headers=headers)
+        if response.status_code == 304:
+            return None, {'etag': etag, 'last_modified': last_modified}
+        validators = {
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+        }
+        return self._parse_record(response, resource), validators
+
+
+class PrestaShopWebServiceJSON(PrestaShopWebServiceConditional):
+    """ Webservice client reading the records in JSON
+
+    The records are requested with ``output_format=JSON``, which is
+    lighter to transfer and to parse than the XML output. The responses
+    are normalized to the structure of the XML ones so the importers and
+    mappers get the same records whatever the output format is.
+
+    Only the reads use JSON, the records are still written in XML.
+
+    :param version_keys: names of the association nodes for the version
+                         of PrestaShop, as a tuple of ``(key, name)``
+    """
+
+    def __init__(self, api_url, api_key, debug=False, session=None,
+                 version_keys=()):
+        super(PrestaShopWebServiceJSON, self).__init__(
+            api_url, api_key, debug=debug, session=session)
+        self.normalizer = JSONNormalizer(dict(version_keys))
+
+    def _parse_json(self, content):
+        if not content:
+            raise PrestaShopWebServiceError('HTTP response is empty')
+        try:
+            return json.loads(content)
+        except ValueError as err:
+            raise PrestaShopWebServiceError(
+                'HTTP JSON response is not parsable : %s. %s' %
+                (err, content[:512])
+            )
+
+    def _parse_error(self, content):
+        try:
+            errors = json.loads(content).get('errors')
+        except (ValueError, AttributeError):
+            return super(PrestaShopWebServiceJSON, self)._parse_error(
+                content)
+        error = errors[0] if errors else {}
+        return (error.get('code'), error.get('message'))
+
+    def _record_url(self, resource, resource_id):
+        url = super(PrestaShopWebServiceJSON, self)._record_url(
+            resource, resource_id)
+        return url + '?output_format=JSON'
+
+    def _parse_record(self, response, resource):
+        content = self._parse_json(response.content)
+        return self.normalizer.normalize(content, resource)
+
+    def get(self, resource, resource_id=None, options=None):
+        options = dict(options or {})
+        full_url = self._api_url + resource
+        if resource_id is not None:
+            full_url += "/%s" % (resource_id,)
+        self._validate_query_options(options)
+        options['output_format'] = 'JSON'
+        full_url += "?%s" % (self._options_to_querystring(options),)
+        content = self._parse_json(self._execute(full_url, 'GET').content)
+        return self.normalizer.normalize(
+            content, resource,
+            listing=resource_id is None,
+            display='display' in options,
+        )
+
+
+class PrestaShopClientPool(object):
+    """ Process-wide pool of PrestaShop webservice clients
+
+    The clients are shared by all the adapters working with the same
+    PrestaShop location and webservice key, so the HTTP connections of
+    their ``requests.Session`` are kept alive from one connector unit to
+    the other instead of being opened again for each of them.
+
+    :param pool_size: maximum number of connections kept alive per client
+    :param idle_timeout: number of seconds after which a client not used
+                         anymore is closed and removed from the pool
+    """
+
+    def __init__(self, pool_size=10, idle_timeout=300):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self):
+        session = requests.Session()
+        # large records and listings are much smaller compressed, the
+        # responses are decompressed by requests
+        session.headers['Accept-Encoding'] = 'gzip, deflate'
+        session.hooks['response'].append(record_response)
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _evict_idle(self, now):
+        for key, (client, last_used) in self._clients.items():
+            if now - last_used > self.idle_timeout:
+                del self._clients[key]
+                client.client.close()
+
+    def get(self, api_url, webservice_key, client_class=None, **kwargs):
+        """ Return a client for the location and key, create it if needed
+
+        :param client_class: class of the client, by default
+                             ``PrestaShopWebServiceConditional``
+        :param kwargs: additional (hashable) arguments for the client,
+                       clients with different arguments are not shared
+        """
+        if client_class is None:
+            client_class = PrestaShopWebServiceConditional
+        key = (api_url, webservice_key, client_class,
+               tuple(sorted(kwargs.iteritems())))
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(key)
+            if entry is None:
+                client = client_class(api_url, webservice_key,
+                                      session=self._new_session(),
+                                      **kwargs)
+                entry = self._clients[key] = [client, now]
+            entry[1] = now
+            return entry[0]
+
+    def clear(self):
+        """ Close and remove all the clients of the pool """
+        with self._lock:
+            for client, __ in self._clients.itervalues():
+                client.client.close()
+            self._clients.clear()
+
+
+client_pool = PrestaShopClientPool(
+    pool_size=int(config.get('prestashop_pool_size', 10)),
+    idle_timeout=int(config.get('prestashop_pool_idle_timeout', 300)),
+)
+
+
 class PrestaShopLocation(object):
 
     def __init__(self, location, webservice_key):
@@ -100,6 +462,12 @@ class PrestaShopLocation(object):
 class PrestaShopCRUDAdapter(CRUDAdapter):
     """ External Records Adapter for PrestaShop """
 
+    # number of times an idempotent call failing with a transient error
+    # is done again, see :meth:`_call_idempotent`
+    _retry_attempts = int(config.get('prestashop_retry_attempts', 3))
+    # delay before the first retry in seconds, doubled for each retry
+    _retry_backoff = float(config.get('prestashop_retry_backoff', 0.5))
+
     def __init__(self, environment):
         """
 
@@ -111,11 +479,126 @@ class PrestaShopCRUDAdapter(CRUDAdapter):
             self.backend_record.location.encode(),
             self.backend_record.webservice_key
         )
-        self.client = PrestaShopWebServiceDict(
+        self.client = self._get_client()
+        # the calls only use plain values of the backend, so they can be
+        # made from threads, see :meth:`_call`
+        self._backend_id = self.backend_record.id
+        self._rate_limits = self.env['prestashop.rate.limit'].limits(
+            self.backend_record
+        )
+        # ratio of the calls recorded in the statistics
+        self._stats_sampling = self.backend_record.call_stats_sampling
+
+    def _get_client(self):
+        """ Return the client used to call the webservice
+
+        When the backend is configured to read the records in JSON, the
+        client needs the names of the association nodes for the version
+        of PrestaShop to rebuild the structure of the XML responses.
+        """
+        if not self.backend_record.webservice_json:
+            return client_pool.get(
+                self.prestashop.api_url,
+                self.prestashop.webservice_key,
+            )
+        env = self.backend_record.get_environment('_prestashop.version.key')
+        version_key = env.get_connector_unit(VersionKey)
+        return client_pool.get(
             self.prestashop.api_url,
             self.prestashop.webservice_key,
+            client_class=PrestaShopWebServiceJSON,
+            version_keys=tuple(sorted(version_key.keys.iteritems())),
         )
 
+    def _rate_limited(self):
+        """ Context manager to wrap every call to PrestaShop, it applies
+        the rate limit of the backend, see
+        :meth:`~connector_prestashop.models.rate_limit.common.\
+PrestashopRateLimit.limit`
+        """
+        return self.env['prestashop.rate.limit'].limit(self._rate_limits)
+
+    def _call(self, method, *args, **kwargs):
+        """ Call a method of the client within the rate limit
+
+        The call fails at once when the circuit breaker of the backend is
+        open, see :class:`~connector_prestashop.models.circuit_breaker.\
+common.PrestashopCircuitBreaker`.
+
+        The call does not read the backend record, the rate limit and the
+        circuit breaker use their own cursors: it can be made from other
+        threads than the one of the job.
+        """
+        breaker = self.env['prestashop.circuit.breaker']
+        breaker.check(self._backend_id)
+        try:
+            with self._rate_limited(), self._sampled(method, args):
+                result = method(*args, **kwargs)
+        except Exception as err:
+            if is_transient_error(err):
+                breaker.failure(self._backend_id)
+            raise
+        breaker.success(self._backend_id)
+        return result
+
+    @contextmanager
+    def _sampled(self, method, args):
+        """ Record the call in the statistics when it is sampled, see
+        :class:`~connector_prestashop.models.call_stat.common.\
+PrestashopCallStat`
+        """
+        sampling = self._stats_sampling
+        if not sampling or random.random() >= sampling:
+            yield
+            return
+        name = getattr(method, '__name__', '')
+        if name == '_execute':
+            http_method = args[1]
+        else:
+            http_method = HTTP_METHODS.get(name, 'GET')
+        resource = (getattr(self, '_prestashop_model', None) or
+                    getattr(self, '_prestashop_image_model', None) or
+                    self._model_name)
+        stats = _response_stats.current = {'status': 0, 'bytes': 0}
+        start = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start
+            _response_stats.current = None
+            self.env['prestashop.call.stat'].record(
+                self._backend_id, resource, http_method,
+                stats['status'], stats['bytes'], duration,
+                weight=1. / sampling,
+            )
+            timer = getattr(_sync_timers, 'current', None)
+            if timer is not None:
+                timer.calls += 1. / sampling
+                timer.bytes += stats['bytes'] / sampling
+
+    def _call_idempotent(self, method, *args, **kwargs):
+        """ Same as :meth:`_call` for the calls which can safely be done
+        again (GET, HEAD), they are retried when they fail with a
+        transient error
+
+        The delay before a retry grows exponentially and is randomized
+        ("full jitter") so the workers failing together do not retry
+        together.
+        """
+        attempt = 0
+        while True:
+            try:
+                return self._call(method, *args, **kwargs)
+            except Exception as err:
+                if (attempt >= self._retry_attempts or
+                        not is_transient_error(err)):
+                    raise
+                delay = random.uniform(0, self._retry_backoff * 2 ** attempt)
+                attempt += 1
+                _logger.info('call to PrestaShop failed (%s), retry %d '
+                             'in %.2f seconds', err, attempt, delay)
+                time.sleep(delay)
+
     def search(self, filters=None):
         """ Search records according to some criterias
         and returns a list of ids """
@@ -161,6 +644,42 @@ class GenericAdapter(PrestaShopCRUDAdapter):
     # _export_node_name="manufacturers"
     # _export_node_name_res = "manufacturer"
     _export_node_name_res = ''
+    # maximum length of the ``filter[id]`` value sent by ``read_many``
+    # in one request, keeps the URLs under the web servers' limits
+    _read_many_max_filter_length = 1500
+    # number of seconds the results of ``search`` and ``read`` are
+    # kept in cache, for the resources which rarely change such as
+    # the languages or the countries; 0 disables the cache
+    _cache_ttl = 0
+
+    @staticmethod
+    def _freeze(options):
+        """ Hashable version of the options of a request """
+        if not options:
+            return ()
+        return tuple(sorted((key, unicode(value))
+                            for key, value in options.iteritems()))
+
+    def _cached(self, key, func, *args, **kwargs):
+        """ Return the result of the call from the cache if possible
+
+        The cache key contains the backend and its cache generation,
+        which is incremented by the "Flush Cache" button, so a flush
+        is seen by all the workers.
+        """
+        if not self._cache_ttl:
+            return func(*args, **kwargs)
+        key = (self.backend_record.id,
+               self.backend_record.cache_generation,
+               self._prestashop_model) + key
+        found, result = reference_cache.get(key)
+        if found:
+            _logger.debug('cache hit, model %s, key %s',
+                          self._prestashop_model, key)
+            return result
+        result = func(*args, **kwargs)
+        reference_cache.set(key, result, self._cache_ttl)
+        return result
 
     def search(self, filters=None):
         """ Search records according to some criterias
@@ -171,26 +690,217 @@ class GenericAdapter(PrestaShopCRUDAdapter):
         _logger.debug(
             'method search, model %s, filters %s',
             self._prestashop_model, unicode(filters))
-        return self.client.search(self._prestashop_model, filters)
+        return self._cached(('search', self._freeze(filters)),
+                            self._call_idempotent, self.client.search,
+                            self._prestashop_model, filters)
 
-    def read(self, id, attributes=None):
+    def iter_search(self, filters=None):
+        """ Search records according to some criterias and yield
+        their ids as soon as they are read from the response
+
+        :rtype: generator of int
+        """
+        if self._cache_ttl:
+            # small listings, better served from the cache
+            for record_id in self.search(filters):
+                yield record_id
+            return
+        for record in self.iter_listing(filters):
+            yield int(record['attrs']['id'])
+
+    def iter_listing(self, options=None):
+        """ Yield the elements of a listing while the response is read
+
+        The XML response is streamed and parsed incrementally, so the
+        elements can be processed before the end of the response has
+        been received, and the memory used does not grow with the size
+        of the listing. The elements have the same structure as in the
+        response of ``client.get``.
+
+        :param options: options of the listing such as ``filter[...]``,
+                        ``display`` or ``limit``
+        :rtype: generator of dict
+        """
+        _logger.debug(
+            'method iter_listing, model %s, options %s',
+            self._prestashop_model, unicode(options))
+        client = self.client
+        if isinstance(client, PrestaShopWebServiceJSON):
+            # the JSON output cannot be parsed incrementally
+            res = self._call_idempotent(client.get, self._prestashop_model,
+                                        options=options)
+            for record in self._listing_records(res):
+                yield record
+            return
+        url = client._api_url + self._prestashop_model
+        if options is not None:
+            options = dict(options)
+            client._validate_query_options(options)
+            url += "?%s" % (client._options_to_querystring(options),)
+        # the rate limit only covers the request, not the reading of
+        # the response during which the caller may call PrestaShop
+        response = self._call_idempotent(self._open_listing, url)
+        try:
+            client._check_version(response.headers.get('psws-version'))
+            response.raw.decode_content = True
+            for record in iter_listing_records(response.raw):
+                yield record
+        finally:
+            response.close()
+
+    def _open_listing(self, url):
+        """ Send the request of a listing, return the streamed response """
+        client = self.client
+        response = client.client.get(url, stream=True)
+        if response.status_code not in (200, 201):
+            try:
+                client._check_status_code(response.status_code,
+                                          response.content)
+            finally:
+                response.close()
+        return response
+
+    def read(self, id, attributes=None, fields=None):
         """ Returns the information of a record
 
+        :param fields: list of the fields to read, including ``id``, all
+                       the fields when None; the record is then read with
+                       a listing filtered on its id (``display=[id,name]``)
+        :rtype: dict
+        """
+        _logger.debug(
+            'method read, model %s id %s, attributes %s, fields %s',
+            self._prestashop_model, str(id), unicode(attributes), fields)
+        missing = self.env['prestashop.missing.record']
+        error = missing.get_error(self.backend_record.id,
+                                  self._prestashop_model, id)
+        if error is not None:
+            # PrestaShop already told us the record does not exist
+            raise PrestaShopWebServiceError('Not Found', 404,
+                                            ps_error_msg=error)
+        try:
+            return self._cached(('read', str(id), self._freeze(attributes),
+                                 tuple(fields or ())),
+                                self._read_record, id, attributes, fields)
+        except PrestaShopWebServiceError as err:
+            if err.error_code == 404:
+                missing.register(self.backend_record.id,
+                                 self._prestashop_model, id,
+                                 err.ps_error_msg or err.msg)
+            raise
+
+    def _read_record(self, id, attributes=None, fields=None):
+        """ Read a record from PrestaShop
+
+        A complete record is read with a conditional GET when the
+        validators of a previous response are stored: if PrestaShop
+        answers it is unchanged, the stored record is returned.
+        """
+        if fields is not None:
+            records = self.read_many([id], display='[%s]' % ','.join(fields))
+            if str(id) not in records:
+                raise PrestaShopWebServiceError('Not Found', 404)
+            return records[str(id)]
+        client = self.client
+        if attributes is not None or \
+                not isinstance(client, PrestaShopWebServiceConditional):
+            res = self._call_idempotent(client.get, self._prestashop_model,
+                                        id, options=attributes)
+            return res[res.keys()[0]]
+        store = self.env['prestashop.record.cache']
+        record, validators = store.get_validators(
+            self.backend_record.id, self._prestashop_model, id
+        )
+        res, new_validators = self._call_idempotent(
+            client.get_conditional, self._prestashop_model, id,
+            **(validators or {})
+        )
+        if res is None:
+            _logger.debug('record not modified, model %s, id %s',
+                          self._prestashop_model, id)
+            return record
+        res = res[res.keys()[0]]
+        if validators or any(new_validators.values()):
+            store.store_record(self.backend_record.id,
+                               self._prestashop_model, id, res,
+                               validators=new_validators)
+        return res
+
+    def _chunk_ids(self, ids):
+        """ Split the ids in groups fitting in a ``filter[id]`` value """
+        chunk = []
+        length = 0
+        for record_id in ids:
+            # +1 for the '|' separator
+            id_length = len(record_id) + 1
+            if chunk and length + id_length > \
+                    self._read_many_max_filter_length:
+                yield chunk
+                chunk = []
+                length = 0
+            chunk.append(record_id)
+            length += id_length
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _listing_records(response):
+        """ Returns the records of a listing response as a list
+
+        The response of a listing looks like::
+
+            {'order_details': {'order_detail': [{...}, {...}]}}
+
+        When only one record is found, it is not wrapped in a list and
+        when no record is found, the response is ``{'order_details': ''}``.
+        """
+        records = response[response.keys()[0]]
+        if not records:
+            return []
+        records = records[records.keys()[0]]
+        if isinstance(records, dict):
+            return [records]
+        return records
+
+    def read_many(self, ids, display='full'):
+        """ Returns the information of several records
+
+        The records are read with as few requests as possible, using
+        listings filtered with ``filter[id]=[1|2|3]``.
+
+        :param ids: list of ids of the records to read
+        :param display: fields to read, either ``full`` or a list of
+                        fields such as ``[id,name]``
+        :return: the records keyed by their id (as string), the records
+                 which are not found are missing from the result
         :rtype: dict
         """
         _logger.debug(
-            'method read, model %s id %s, attributes %s',
-            self._prestashop_model, str(id), unicode(attributes))
-        res = self.client.get(self._prestashop_model, id, options=attributes)
-        first_key = res.keys()[0]
-        return res[first_key]
+            'method read_many, model %s ids %s, display %s',
+            self._prestashop_model, unicode(ids), display)
+        unique_ids = []
+        for record_id in map(str, ids):
+            if record_id not in unique_ids:
+                unique_ids.append(record_id)
+        records = {}
+        for chunk in self._chunk_ids(unique_ids):
+            options = {
+                'filter[id]': '[%s]' % '|'.join(chunk),
+                'display': display,
+            }
+            res = self._call_idempotent(self.client.get,
+                                        self._prestashop_model,
+                                        options=options)
+            for record in self._listing_records(res):
+                records[record['id']] = record
+        return records
 
     def create(self, attributes=None):
         """ Create a record on the external system """
         _logger.debug(
             'method create, model %s, attributes %s',
             self._prestashop_model, unicode(attributes))
-        res = self.client.add(self._prestashop_model, {
+        res = self._call(self.client.add, self._prestashop_model, {
             self._export_node_name: attributes
         })
         if self._export_node_name_res:
@@ -205,8 +915,8 @@ class GenericAdapter(PrestaShopCRUDAdapter):
             self._prestashop_model,
             unicode(attributes)
         )
-        res = self.client.edit(
-            self._prestashop_model, {self._export_node_name: attributes})
+        res = self._call(self.client.edit, self._prestashop_model,
+                         {self._export_node_name: attributes})
         if self._export_node_name_res:
             return res['prestashop'][self._export_node_name_res]['id']
         return res
@@ -215,8 +925,10 @@ class GenericAdapter(PrestaShopCRUDAdapter):
         _logger.debug('method delete, model %s, ids %s',
                       resource, unicode(ids))
         # Delete a record(s) on the external system
-        return self.client.delete(resource, ids)
+        return self._call(self.client.delete, resource, ids)
 
     def head(self, id=None):
         """ HEAD """
-        return self.client.head(self._prestashop_model, resource_id=id)
+        return self._call_idempotent(self.client.head,
+                                     self._prestashop_model,
+                                     resource_id=id)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+import copy
+import threading
+import time
+
+
+class TTLCache(object):
+    """ In-memory cache whose entries expire after a given time
+
+    The cache is shared by the threads of a process. The keys start
+    with the id of the backend so the entries of a backend can be
+    removed at once.
+
+    The values are copied when they are stored and when they are
+    returned so the callers can modify them freely.
+
+    :param max_size: maximum number of entries, the entries closest to
+                     their expiration are removed first when it is
+                     reached
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """ Return a tuple ``(found, value)`` """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expire, value = entry
+            if expire < time.time():
+                del self._entries[key]
+                return False, None
+        return True, copy.deepcopy(value)
+
+    def set(self, key, value, ttl):
+        """ Store the value for ``ttl`` seconds """
+        value = copy.deepcopy(value)
+        now = time.time()
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._prune(now)
+            self._entries[key] = (now + ttl, value)
+
+    def _prune(self, now):
+        for key, (expire, __) in self._entries.items():
+            if expire < now:
+                del self._entries[key]
+        excess = len(self._entries) - self.max_size + 1
+        if excess > 0:
+            by_expiration = sorted(self._entries,
+                                   key=lambda key: self._entries[key][0])
+            for key in by_expiration[:excess]:
+                del self._entries[key]
+
+    def clear(self, backend_id=None):
+        """ Remove the entries of a backend, or all of them """
+        with self._lock:
+            if backend_id is None:
+                self._entries.clear()
+                return
+            for key in self._entries.keys():
+                if key[0] == backend_id:
+                    del self._entries[key]
+
+
+reference_cache = TTLCache()
@@ -5,6 +5,8 @@ from openerp.tools.translate import _
 from openerp.addons.connector.queue.job import job
 from openerp.addons.connector.unit.synchronizer import Deleter
 
+from .job_identity import backend_argument, related_backend
+
 
 class PrestashopDeleter(Deleter):
     """ Base deleter for PrestaShop """
@@ -19,6 +21,7 @@ class PrestashopDeleter(Deleter):
             external_id, resource)
 
 
+@related_backend(backend_argument)
 @job(default_channel='root.prestashop')
 def export_delete_record(
         session, model_name, backend_id, external_id, resource):
@@ -12,6 +12,14 @@ from openerp.addons.connector.queue.job import job
 from openerp.addons.connector.queue.job import related_action
 from openerp.addons.connector.unit.synchronizer import Exporter
 from openerp.addons.connector.exception import RetryableJobError
+from .job_identity import (
+    binding_backend,
+    deduplicate,
+    export_identity,
+    related_backend,
+)
+from .job_profiler import job_profiler
+from .job_timing import PhaseTimer, job_timing
 from .mapper import TranslationPrestashopExportMapper
 
 
@@ -36,6 +44,7 @@ class PrestashopBaseExporter(Exporter):
         super(PrestashopBaseExporter, self).__init__(environment)
         self.prestashop_id = None
         self.binding_id = None
+        self.timer = PhaseTimer()
 
     def _get_binding(self):
         """ Return the raw Odoo data for ``self.binding_id`` """
@@ -47,15 +56,19 @@ class PrestashopBaseExporter(Exporter):
         :param binding_id: identifier of the binding record to export
         """
         self.binding_id = binding_id
-        self.binding = self._get_binding()
-        self.prestashop_id = self.binder.to_backend(self.binding)
-        result = self._run(*args, **kwargs)
-
-        self.binder.bind(self.prestashop_id, self.binding)
-        # commit so we keep the external ID if several cascading exports
-        # are called and one of them fails
-        self.session.commit()
-        self._after_export()
+        with job_timing(self, 'export') as timer:
+            with timer.phase('fetch'):
+                self.binding = self._get_binding()
+                self.prestashop_id = self.binder.to_backend(self.binding)
+            result = self._run(*args, **kwargs)
+
+            with timer.phase('bind'):
+                self.binder.bind(self.prestashop_id, self.binding)
+                # commit so we keep the external ID if several cascading
+                # exports are called and one of them fails
+                self.session.commit()
+            with timer.phase('after'):
+                self._after_export()
         return result
 
     def _run(self, *args, **kwargs):
@@ -282,32 +295,37 @@ class PrestashopExporter(PrestashopBaseExporter):
         if self._has_to_skip():
             return
 
+        timer = self.timer
         # export the missing linked resources
-        self._export_dependencies()
+        with timer.phase('dependencies'):
+            self._export_dependencies()
 
         # prevent other jobs to export the same record
         # will be released on commit (or rollback)
-        self._lock()
+        with timer.phase('lock'):
+            self._lock()
 
-        map_record = self._map_data()
+        with timer.phase('map'):
+            map_record = self._map_data()
+            if self.prestashop_id:
+                record = map_record.values()
+            else:
+                record = map_record.values(for_create=True)
+        if not record:
+            return _('Nothing to export.')
 
-        if self.prestashop_id:
-            record = map_record.values()
-            if not record:
-                return _('Nothing to export.')
-            # special check on data before export
-            self._validate_data(record)
-            self._update(record)
-        else:
-            record = map_record.values(for_create=True)
-            if not record:
-                return _('Nothing to export.')
-            # special check on data before export
+        # special check on data before export
+        with timer.phase('validate'):
             self._validate_data(record)
-            self.prestashop_id = self._create(record)
-            if self.prestashop_id == 0:
-                raise exceptions.Warning(
-                    _("Record on PrestaShop have not been created"))
+
+        with timer.phase('write'):
+            if self.prestashop_id:
+                self._update(record)
+            else:
+                self.prestashop_id = self._create(record)
+                if self.prestashop_id == 0:
+                    raise exceptions.Warning(
+                        _("Record on PrestaShop have not been created"))
 
         message = _('Record exported with ID %s on PrestaShop.')
         return message % self.prestashop_id
@@ -340,6 +358,8 @@ def related_action_record(session, job):
     return action
 
 
+@related_backend(binding_backend)
+@deduplicate(export_identity, transaction_only=True)
 @job(default_channel='root.prestashop')
 @related_action(action=related_action_record)
 def export_record(session, model_name, binding_id, fields=None, **kwargs):
@@ -349,4 +369,5 @@ def export_record(session, model_name, binding_id, fields=None, **kwargs):
     record = session.env[model_name].browse(binding_id)
     env = record.backend_id.get_environment(model_name, session=session)
     exporter = env.get_connector_unit(PrestashopExporter)
-    return exporter.run(binding_id, fields=fields, **kwargs)
+    with job_profiler(record.backend_id, model_name):
+        return exporter.run(binding_id, fields=fields, **kwargs)
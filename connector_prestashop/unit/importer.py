@@ -5,7 +5,8 @@ import logging
 from contextlib import closing, contextmanager
 
 import openerp
-from openerp import _
+from openerp import _, tools
+from openerp.tools import config
 
 from openerp.addons.connector.queue.job import job
 from openerp.addons.connector.unit.synchronizer import Importer
@@ -15,6 +16,17 @@ from openerp.addons.connector.exception import (
     RetryableJobError,
     FailedJobError,
 )
+from .backend_adapter import current_job_uuid
+from .job_identity import (
+    backend_argument,
+    deduplicate,
+    import_identity,
+    is_collapsed,
+    related_backend,
+)
+from .job_profiler import job_profiler
+from .job_timing import PhaseTimer, job_timing
+from .mapper import mapper_source_fields
 
 
 _logger = logging.getLogger(__name__)
@@ -55,12 +67,22 @@ class PrestashopBaseImporter(Importer):
         binder = self.binder_for(binding_model)
         if always or not binder.to_odoo(prestashop_id):
             importer = self.unit_for(importer_class, model=binding_model)
+            # the record has probably just been read by another job
+            importer.trust_cached_record = True
             importer.run(prestashop_id, **kwargs)
 
 
 class PrestashopImporter(PrestashopBaseImporter):
     """ Base importer for PrestaShop """
 
+    # share the records read from PrestaShop with the other jobs through
+    # ``prestashop.record.cache``, only for the resources having a
+    # ``date_upd``
+    _record_cache = False
+    # fields of the records used by the importer besides the fields
+    # used by the mapper, see ``_read_fields``
+    _extra_source_fields = ()
+
     def __init__(self, environment):
         """
         :param environment: current environment (backend, session, ...)
@@ -69,10 +91,57 @@ class PrestashopImporter(PrestashopBaseImporter):
         super(PrestashopImporter, self).__init__(environment)
         self.prestashop_id = None
         self.prestashop_record = None
+        self.trust_cached_record = False
+        self.timer = PhaseTimer()
 
     def _get_prestashop_data(self):
-        """ Return the raw prestashop data for ``self.prestashop_id`` """
-        return self.backend_adapter.read(self.prestashop_id)
+        """ Return the raw prestashop data for ``self.prestashop_id``
+
+        When the importer uses the record cache, a cached record is used
+        if its ``date_upd`` is still the one on PrestaShop, which is
+        checked with a light request. When the record is imported as a
+        dependency, a record read a few seconds ago is used without
+        checking.
+
+        Otherwise, only the fields used by the importer are read when
+        they are known (see ``_read_fields``).
+        """
+        adapter = self.backend_adapter
+        if not self._record_cache:
+            return adapter.read(self.prestashop_id,
+                                fields=self._read_fields())
+        cache = self.env['prestashop.record.cache']
+        backend_id = self.backend_record.id
+        resource = adapter._prestashop_model
+        record, age = cache.get_record(backend_id, resource,
+                                       self.prestashop_id)
+        if record is not None:
+            if self.trust_cached_record and age <= cache._trust_delay():
+                return record
+            current = adapter.read_many([self.prestashop_id],
+                                        display='[id,date_upd]')
+            current = current.get(str(self.prestashop_id), {})
+            if current.get('date_upd') == record.get('date_upd'):
+                return record
+        record = adapter.read(self.prestashop_id)
+        if record.get('date_upd'):
+            cache.store_record(backend_id, resource,
+                               self.prestashop_id, record)
+        return record
+
+    def _read_fields(self):
+        """ Return the fields of the record to read, None for all
+
+        The fields are the ones used by the mapper, when it declares them
+        (see :py:func:`~.mapper.mapper_source_fields`), and the ones
+        listed in ``_extra_source_fields``.
+        """
+        fields = mapper_source_fields(self.mapper)
+        if fields is None:
+            return None
+        fields |= set(self._extra_source_fields)
+        fields.add('id')
+        return sorted(fields)
 
     def _has_to_skip(self):
         """ Return True if the import can be skipped """
@@ -226,36 +295,54 @@ class PrestashopImporter(PrestashopBaseImporter):
                     ignore_retry=True
                 )
 
-    def run(self, prestashop_id, **kwargs):
+    def run(self, prestashop_id, record=None, **kwargs):
         """ Run the synchronization
 
         :param prestashop_id: identifier of the record on PrestaShop
+        :param record: record already read from PrestaShop, for instance
+                       in the listing of a batch import, it is then not
+                       read again
         """
         self.prestashop_id = prestashop_id
+        if record is not None:
+            self.prestashop_record = record
+            if self._record_cache and record.get('date_upd'):
+                self.env['prestashop.record.cache'].store_record(
+                    self.backend_record.id,
+                    self.backend_adapter._prestashop_model,
+                    prestashop_id,
+                    record,
+                )
         lock_name = 'import({}, {}, {}, {})'.format(
             self.backend_record._name,
             self.backend_record.id,
             self.model._name,
             self.prestashop_id,
         )
-        # Keep a lock on this import until the transaction is committed
-        self.advisory_lock_or_retry(lock_name,
-                                    retry_seconds=RETRY_ON_ADVISORY_LOCK)
-        if not self.prestashop_record:
-            self.prestashop_record = self._get_prestashop_data()
+        with job_timing(self, 'import') as timer:
+            # Keep a lock on this import until the transaction is
+            # committed
+            with timer.phase('lock'):
+                self.advisory_lock_or_retry(
+                    lock_name, retry_seconds=RETRY_ON_ADVISORY_LOCK
+                )
+            with timer.phase('fetch'):
+                if not self.prestashop_record:
+                    self.prestashop_record = self._get_prestashop_data()
 
-        binding = self._get_binding()
-        if not binding:
-            self._check_in_new_connector_env()
+                binding = self._get_binding()
+                if not binding:
+                    self._check_in_new_connector_env()
 
-        skip = self._has_to_skip()
-        if skip:
-            return skip
+            skip = self._has_to_skip()
+            if skip:
+                return skip
 
-        # import the missing linked resources
-        self._import_dependencies()
+            # import the missing linked resources
+            with timer.phase('dependencies'):
+                self._import_dependencies()
 
-        self._import(binding, **kwargs)
+            self._import(binding, **kwargs)
 
     def _import(self, binding, **kwargs):
         """ Import the external record.
@@ -265,24 +352,30 @@ class PrestashopImporter(PrestashopBaseImporter):
 
         """
 
-        map_record = self._map_data()
+        timer = self.timer
+        with timer.phase('map'):
+            map_record = self._map_data()
 
-        if binding:
-            record = self._update_data(map_record)
-        else:
-            record = self._create_data(map_record)
+            if binding:
+                record = self._update_data(map_record)
+            else:
+                record = self._create_data(map_record)
 
         # special check on data before import
-        self._validate_data(record)
+        with timer.phase('validate'):
+            self._validate_data(record)
 
-        if binding:
-            self._update(binding, record)
-        else:
-            binding = self._create(record)
+        with timer.phase('write'):
+            if binding:
+                self._update(binding, record)
+            else:
+                binding = self._create(record)
 
-        self.binder.bind(self.prestashop_id, binding)
+        with timer.phase('bind'):
+            self.binder.bind(self.prestashop_id, binding)
 
-        self._after_import(binding)
+        with timer.phase('after'):
+            self._after_import(binding)
 
 
 class BatchImporter(Importer):
@@ -291,14 +384,41 @@ class BatchImporter(Importer):
     the import of each item separately.
     """
     page_size = 1000
+    # page on the ids (``filter[id]=>[last id]``, ``sort=[id_ASC]``)
+    # rather than on offsets: the pages are as fast to read at the end
+    # of a large table as at its start, and no record is skipped nor
+    # read twice when records are created during the import
+    keyset_pagination = False
+    # the importer of the records accepts the records read in the
+    # listings: when the backend reads the records in the listings, the
+    # pages are read with the fields used by the importer, and each
+    # record is handed to its import, which does not read it again
+    _listed_records = False
+
+    def run(self, filters=None, resumable=False, **kwargs):
+        """ Run the synchronization
 
-    def run(self, filters=None, **kwargs):
-        """ Run the synchronization """
-        if filters is None:
-            filters = {}
+        :param resumable: when the pages are read on the ids in a job,
+                          each page is committed with the imports it
+                          delayed and the last id is kept in a
+                          ``prestashop.batch.cursor``: when the job dies,
+                          its next run with the same filters starts after
+                          the last page read
+        """
+        # the filters of the caller may be shared by several batches
+        filters = dict(filters or {})
         if 'limit' in filters:
             self._run_page(filters, **kwargs)
             return
+        if (self.keyset_pagination and 'filter[id]' not in filters and
+                'sort' not in filters):
+            # outside of a job, there is nothing to resume and the
+            # transaction of the caller must not be committed
+            if resumable and current_job_uuid():
+                self._run_resumable(filters, **kwargs)
+            else:
+                self._run_keyset(filters, **kwargs)
+            return
         page_number = 0
         filters['limit'] = '%d,%d' % (
             page_number * self.page_size, self.page_size)
@@ -309,11 +429,73 @@ class BatchImporter(Importer):
                 page_number * self.page_size, self.page_size)
             record_ids = self._run_page(filters, **kwargs)
 
-    def _run_page(self, filters, **kwargs):
-        record_ids = self.backend_adapter.search(filters)
+    def _run_keyset(self, filters, **kwargs):
+        """ Read the pages ordered by id, each one starting after the
+        last id of the previous one, until a page is not full """
+        filters.update({
+            'sort': '[id_ASC]',
+            'limit': str(self.page_size),
+        })
+        while True:
+            record_ids = self._run_page(filters, **kwargs)
+            if len(record_ids) < self.page_size:
+                break
+            filters['filter[id]'] = '>[%d]' % max(
+                int(record_id) for record_id in record_ids
+            )
+
+    def _run_resumable(self, filters, **kwargs):
+        """ Read the pages ordered by id from the last id of the cursor
+        of the run, committing the cursor after each page """
+        cursor = self.env['prestashop.batch.cursor'].resume(
+            self.backend_record.id, self.model._name, filters
+        )
+        filters.update({
+            'sort': '[id_ASC]',
+            'limit': str(self.page_size),
+        })
+        if cursor.last_id:
+            _logger.info('Batch import of %s resumed after the id %d '
+                         '(%d pages read)', self.model._name,
+                         cursor.last_id, cursor.pages)
+            filters['filter[id]'] = '>[%d]' % cursor.last_id
+        while True:
+            record_ids = self._run_page(filters, **kwargs)
+            if len(record_ids) < self.page_size:
+                break
+            cursor.advance(record_ids)
+            # the imports delayed for the page are kept with the cursor
+            self.session.commit()
+            filters['filter[id]'] = '>[%d]' % cursor.last_id
+        cursor.unlink()
+
+    def _listing_display(self):
+        """ Return the ``display`` of the listings when the records are
+        read in the listings, None when only the ids are listed """
+        if not (self._listed_records and
+                self.backend_record.listed_records):
+            return None
+        fields = self.unit_for(PrestashopImporter)._read_fields()
+        if fields:
+            return '[%s]' % ','.join(fields)
+        return 'full'
 
-        for record_id in record_ids:
+    def _run_page(self, filters, **kwargs):
+        # the imports are dispatched while the listing is still read
+        record_ids = []
+        display = None if 'display' in filters else self._listing_display()
+        if display:
+            listing = self.backend_adapter.iter_listing(
+                dict(filters, display=display)
+            )
+            for record in listing:
+                record_id = int(record['id'])
+                self._import_record(record_id, record=record, **kwargs)
+                record_ids.append(record_id)
+            return record_ids
+        for record_id in self.backend_adapter.iter_search(filters):
             self._import_record(record_id, **kwargs)
+            record_ids.append(record_id)
         return record_ids
 
     def _import_record(self, record):
@@ -355,17 +537,88 @@ class DirectBatchImporter(BatchImporter):
         )
 
 
+def import_chunk_sizes():
+    """ Return the number of records imported per job of the binding
+    models set in the ``prestashop_import_chunk_sizes`` option of the
+    server configuration, such as
+    ``_import_stock_available:100,prestashop.res.partner:20`` """
+    sizes = {}
+    option = config.get('prestashop_import_chunk_sizes') or ''
+    for item in option.split(','):
+        if ':' not in item:
+            continue
+        model_name, size = item.rsplit(':', 1)
+        sizes[model_name.strip()] = int(size)
+    return sizes
+
+
 class DelayedBatchImporter(BatchImporter):
-    """ Delay import of the records """
+    """ Delay import of the records
+
+    Each job imports ``chunk_size`` records (see :func:`import_records`),
+    or a single one with :func:`import_record` when it is 1. The size can
+    be changed per binding model with the server configuration, see
+    :func:`import_chunk_sizes`.
+    """
     _model_name = None
+    keyset_pagination = True
+    chunk_size = 1
+
+    # ids and records of the current chunk, None when the records are
+    # not imported by chunks
+    _chunk = None
+
+    def _chunk_size(self):
+        return import_chunk_sizes().get(self.model._name, self.chunk_size)
+
+    def _run_page(self, filters, **kwargs):
+        if self._chunk_size() <= 1:
+            return super(DelayedBatchImporter, self)._run_page(filters,
+                                                               **kwargs)
+        self._chunk = []
+        try:
+            record_ids = super(DelayedBatchImporter, self)._run_page(
+                filters, **kwargs
+            )
+            self._delay_chunk(**kwargs)
+        finally:
+            self._chunk = None
+        return record_ids
 
-    def _import_record(self, record, **kwargs):
-        """ Delay the import of the records"""
+    def _import_record(self, record_id, record=None, **kwargs):
+        """ Delay the import of the records
+
+        :param record: record already read from PrestaShop, given to the
+                       importer
+        """
+        if self._chunk is not None:
+            self._chunk.append((record_id, record))
+            if len(self._chunk) >= self._chunk_size():
+                self._delay_chunk(**kwargs)
+            return
+        if record is not None:
+            kwargs['record'] = record
         import_record.delay(
             self.session,
             self.model._name,
             self.backend_record.id,
-            record,
+            record_id,
+            **kwargs
+        )
+
+    def _delay_chunk(self, **kwargs):
+        """ Delay the import of the records of the current chunk """
+        chunk, self._chunk = self._chunk, []
+        if not chunk:
+            return
+        records = [record for __, record in chunk]
+        if any(record is not None for record in records):
+            kwargs['records'] = records
+        import_records.delay(
+            self.session,
+            self.model._name,
+            self.backend_record.id,
+            [record_id for record_id, __ in chunk],
             **kwargs
         )
 
@@ -476,7 +729,8 @@ class TranslatableRecordImporter(PrestashopImporter):
 
         """
         # split prestashop data for every lang
-        split_record = self._split_per_language(self.prestashop_record)
+        with self.timer.phase('map'):
+            split_record = self._split_per_language(self.prestashop_record)
         if self._default_language in split_record:
             self.main_lang_data = split_record[self._default_language]
             self.main_lang = self._default_language
@@ -498,20 +752,76 @@ class TranslatableRecordImporter(PrestashopImporter):
             ).write(map_record.values())
 
 
+@related_backend(backend_argument)
 @job(default_channel='root.prestashop')
 def import_batch(session, model_name, backend_id, filters=None, **kwargs):
     """ Prepare a batch import of records from PrestaShop """
     backend = session.env['prestashop.backend'].browse(backend_id)
     env = backend.get_environment(model_name, session=session)
     importer = env.get_connector_unit(BatchImporter)
-    return importer.run(filters=filters, **kwargs)
+    with job_profiler(backend, model_name):
+        return importer.run(filters=filters, **kwargs)
 
 
+@related_backend(backend_argument)
+@deduplicate(import_identity)
 @job(default_channel='root.prestashop')
 def import_record(
         session, model_name, backend_id, prestashop_id, **kwargs):
     """ Import a record from PrestaShop """
+    if (kwargs.get('record') is not None and
+            is_collapsed(session, current_job_uuid())):
+        # the record carried has been read before the imports collapsed
+        # in this job were delayed, it may be outdated
+        del kwargs['record']
     backend = session.env['prestashop.backend'].browse(backend_id)
     env = backend.get_environment(model_name, session=session)
     importer = env.get_connector_unit(PrestashopImporter)
-    return importer.run(prestashop_id, **kwargs)
+    with job_profiler(backend, model_name):
+        return importer.run(prestashop_id, **kwargs)
+
+
+@related_backend(backend_argument)
+@job(default_channel='root.prestashop')
+def import_records(session, model_name, backend_id, prestashop_ids,
+                   records=None, **kwargs):
+    """ Import a chunk of records from PrestaShop
+
+    Each record is imported in a savepoint, the records whose import
+    fails are rolled back and imported again in their own
+    :func:`import_record` job, so a failure does not prevent the import
+    of the other records of the chunk.
+
+    :param records: records already read from PrestaShop, in the order
+                    of ``prestashop_ids``
+    """
+    backend = session.env['prestashop.backend'].browse(backend_id)
+    env = backend.get_environment(model_name, session=session)
+    if records is None:
+        records = [None] * len(prestashop_ids)
+    failed = []
+    with job_profiler(backend, model_name):
+        for prestashop_id, record in zip(prestashop_ids, records):
+            record_kwargs = dict(kwargs)
+            if record is not None:
+                record_kwargs['record'] = record
+            importer = env.get_connector_unit(PrestashopImporter)
+            try:
+                with session.env.cr.savepoint():
+                    importer.run(prestashop_id, **record_kwargs)
+            except Exception as err:
+                _logger.info('Import of %s %s failed, delayed in its own '
+                             'job: %s', model_name, prestashop_id, err)
+                session.env.invalidate_all()
+                failed.append((prestashop_id, record_kwargs, err))
+    for prestashop_id, record_kwargs, __ in failed:
+        # the job reads the record again, it may have changed when it runs
+        record_kwargs.pop('record', None)
+        import_record.delay(session, model_name, backend_id, prestashop_id,
+                            **record_kwargs)
+    result = _('%d records imported.') % (len(prestashop_ids) - len(failed))
+    if failed:
+        result += '\n' + _('Failed, delayed in their own jobs:') + '\n'
+        result += '\n'.join(u'%s: %s' % (prestashop_id, tools.ustr(err))
+                             for prestashop_id, __, err in failed)
+    return result
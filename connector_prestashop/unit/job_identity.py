@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import functools
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# states of the jobs which have not started yet: a new job would do
+# the same work
+WAITING_STATES = ('pending', 'enqueued')
+
+
+def import_identity(session, model_name, backend_id, prestashop_id,
+                    *args, **kwargs):
+    """ Identity of an import of a record
+
+    The record read from PrestaShop carried by the job is not part of
+    it: a job in which other imports have been collapsed reads the
+    record again, see :func:`is_collapsed`.
+    """
+    return (backend_id, model_name, prestashop_id)
+
+
+def is_collapsed(session, uuid):
+    """ Return whether other jobs have been collapsed in the job """
+    if not uuid:
+        return False
+    session.env.cr.execute(
+        "SELECT prestashop_collapsed FROM queue_job WHERE uuid = %s",
+        (uuid,)
+    )
+    row = session.env.cr.fetchone()
+    return bool(row and row[0])
+
+
+def export_identity(session, model_name, binding_id, *args, **kwargs):
+    """ Identity of an export of a binding """
+    return (binding_backend(session, model_name, binding_id),
+            model_name, binding_id)
+
+
+def backend_argument(session, model_name, backend_id, *args, **kwargs):
+    """ Backend of a job on a binding model of a backend """
+    return backend_id
+
+
+def backend_first_argument(session, backend_id, *args, **kwargs):
+    """ Backend of a job on a backend """
+    return backend_id
+
+
+def binding_backend(session, model_name, binding_id, *args, **kwargs):
+    """ Backend of a job on a binding """
+    return session.env[model_name].browse(binding_id).backend_id.id
+
+
+def odoo_record_backend(session, model_name, record_id, *args, **kwargs):
+    """ Backend of a job on an Odoo record, the one of its first binding
+    of ``model_name`` """
+    binding = session.env[model_name].search([('odoo_id', '=', record_id)],
+                                             limit=1)
+    return binding.backend_id.id
+
+
+def related_backend(backend_of):
+    """ Decorator of a job: the backend returned by ``backend_of``,
+    called with the arguments of ``delay``, is stored on the jobs it
+    delays (``queue_job.prestashop_backend_id``), so the pending jobs of
+    a backend can be found, for instance to postpone them when its
+    circuit breaker opens.
+
+    Apply it on a function already decorated by ``job``.
+    """
+    def decorator(func):
+        delay = func.delay
+
+        @functools.wraps(delay)
+        def delay_on_backend(session, *args, **kwargs):
+            uuid = delay(session, *args, **kwargs)
+            session.env.cr.execute(
+                "UPDATE queue_job SET prestashop_backend_id = %s "
+                "WHERE uuid = %s",
+                (backend_of(session, *args, **kwargs) or None, uuid)
+            )
+            return uuid
+
+        func.delay = delay_on_backend
+        return func
+    return decorator
+
+
+def deduplicate(identity, transaction_only=False):
+    """ Decorator of a job: its ``delay`` returns the job waiting to run
+    with the same identity instead of creating another one
+
+    The identity key of a job is its function with the backend, the
+    binding model and the id of the record returned by ``identity``,
+    which is called with the arguments of ``delay``. The jobs collapsed
+    are counted in ``prestashop.job.collapse`` and the job they are
+    collapsed in is flagged (``queue_job.prestashop_collapsed``).
+
+    The delays of the same identity are serialized with an advisory lock
+    held until the end of the transaction, so concurrent transactions do
+    not both create a job.
+
+    :param transaction_only: collapse only in the jobs delayed by the
+                             current transaction, which cannot start
+                             before it is committed: an export collapsed
+                             in a job already visible to the workers
+                             could run without the changes of the
+                             transaction
+
+    Apply it on a function already decorated by ``job``.
+    """
+    def decorator(func):
+        delay = func.delay
+
+        @functools.wraps(delay)
+        def delay_unique(session, *args, **kwargs):
+            key = identity(session, *args, **kwargs)
+            if key is None:
+                return delay(session, *args, **kwargs)
+            backend_id, model_name, record_id = key
+            identity_key = '%s(%s, %s, %s)' % (func.__name__, backend_id,
+                                               model_name, record_id)
+            cr = session.env.cr
+            cr.execute("SELECT pg_advisory_xact_lock(hashtext(%s))",
+                       (identity_key,))
+            query = ("SELECT uuid FROM queue_job "
+                     "WHERE prestashop_identity_key = %s AND state IN %s ")
+            if transaction_only:
+                # rows inserted by the current transaction (not by its
+                # savepoints, the job is then delayed again)
+                query += ("AND xmin::text::bigint = "
+                          "txid_current() %% 4294967296 ")
+            cr.execute(query + "LIMIT 1", (identity_key, WAITING_STATES))
+            row = cr.fetchone()
+            if row:
+                _logger.debug('%s collapsed in the job %s',
+                              identity_key, row[0])
+                cr.execute(
+                    "UPDATE queue_job SET prestashop_collapsed = true "
+                    "WHERE uuid = %s AND prestashop_collapsed IS NOT TRUE",
+                    (row[0],)
+                )
+                session.env['prestashop.job.collapse'].count(
+                    backend_id, func.__name__, model_name
+                )
+                return row[0]
+            uuid = delay(session, *args, **kwargs)
+            cr.execute(
+                "UPDATE queue_job SET prestashop_identity_key = %s "
+                "WHERE uuid = %s",
+                (identity_key, uuid)
+            )
+            return uuid
+
+        func.delay = delay_unique
+        return func
+    return decorator
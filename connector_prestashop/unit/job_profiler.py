@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import cProfile
+from contextlib import contextmanager
+
+from .backend_adapter import current_job_uuid
+
+
+@contextmanager
+def job_profiler(backend, model_name):
+    """ Profile the job run in the context if the *Profiling* settings
+    of the backend select it, see ``prestashop.job.profiling`` """
+    profiling = backend.env['prestashop.job.profiling']
+    if not profiling.must_profile(backend, model_name):
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiling.save(profiler, backend.id, model_name,
+                       job_uuid=current_job_uuid())
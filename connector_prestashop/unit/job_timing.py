@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import time
+from contextlib import contextmanager
+
+from .backend_adapter import counting_calls, current_job_uuid
+
+# phases of the synchronization of a record, ``after`` is the
+# ``_after_import`` or ``_after_export``
+PHASES = ('lock', 'fetch', 'dependencies', 'map', 'validate', 'write',
+          'bind', 'after')
+
+
+class PhaseTimer(object):
+    """ Accumulate the time spent in the phases of a synchronization and
+    the calls to PrestaShop sampled, see
+    :func:`~.backend_adapter.counting_calls` """
+
+    def __init__(self):
+        self.started = time.time()
+        self.durations = dict.fromkeys(PHASES, 0.)
+        self.calls = 0.
+        self.bytes = 0.
+
+    @contextmanager
+    def phase(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.time() - start
+
+    def total(self):
+        return time.time() - self.started
+
+
+@contextmanager
+def job_timing(connector_unit, direction):
+    """ Time the synchronization of a record by an importer or exporter
+
+    A new :class:`PhaseTimer` is set in ``connector_unit.timer`` and
+    yielded. When the *Job Timings* of the backend are enabled, the
+    durations are written in ``prestashop.job.timing`` at the end of the
+    synchronization, including when it fails.
+
+    :param direction: ``import`` or ``export``
+    """
+    timer = connector_unit.timer = PhaseTimer()
+    backend = connector_unit.backend_record
+    enabled = backend.job_timing
+    failed = True
+    try:
+        with counting_calls(timer):
+            yield timer
+        failed = False
+    finally:
+        if enabled:
+            connector_unit.env['prestashop.job.timing'].record(
+                backend.id,
+                connector_unit.model._name,
+                direction,
+                timer,
+                failed=failed,
+                prestashop_id=connector_unit.prestashop_id,
+                binding_id=getattr(connector_unit, 'binding_id', None),
+                job_uuid=current_job_uuid(),
+            )
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+""" Normalization of the PrestaShop webservice JSON responses
+
+The importers and mappers work on the structure produced by ``xml2dict``
+from the XML responses. The JSON output of the webservice holds the
+same data in a different shape, :class:`JSONNormalizer` converts it to
+the structure ``xml2dict`` would have given for the same record.
+"""
+
+# key of the association in the record: key given to
+# :meth:`~connector_prestashop.unit.version_key.VersionKey.get_key`
+# to know the name of the nodes of the association
+ASSOCIATION_NODES = {
+    'categories': 'category',
+    'combinations': 'combinations',
+    'groups': 'group',
+    'images': 'image',
+    'order_rows': 'order_row',
+    'order_slip_details': 'order_slip_detail',
+    'product_features': 'product_features',
+    'product_option_values': 'product_option_value',
+    'tags': 'tag',
+    'taxes': 'tax',
+}
+
+# fields having a ``notFilterable`` attribute in the XML output,
+# which ``xml2dict`` returns as ``{'attrs': {...}, 'value': ...}``
+NOT_FILTERABLE_FIELDS = {
+    'category': ('nb_products_recursive',),
+    'order': ('shipping_number',),
+    'product': ('manufacturer_name', 'quantity', 'type',
+                'id_default_image', 'id_default_combination',
+                'position_in_category'),
+}
+
+
+def singular(name):
+    """ Name of the node of one element of a listing
+
+    ``products`` -> ``product``, ``categories`` -> ``category``,
+    ``addresses`` -> ``address``, ``taxes`` -> ``tax``
+    """
+    if name.endswith('ies'):
+        return name[:-3] + 'y'
+    if name.endswith(('sses', 'xes')):
+        return name[:-2]
+    if name.endswith('s'):
+        return name[:-1]
+    return name
+
+
+class JSONNormalizer(object):
+    """ Convert the JSON responses to the ``xml2dict`` structure
+
+    :param version_keys: names of the association nodes for the
+                         version of PrestaShop, as in
+                         :attr:`~connector_prestashop.unit.version_key.\
+VersionKey.keys`
+    """
+
+    def __init__(self, version_keys=None):
+        self.version_keys = version_keys or {}
+
+    def normalize(self, content, resource, listing=False, display=False):
+        """ Normalize a decoded JSON response
+
+        :param content: the decoded JSON response
+        :param resource: name of the resource (``products``, ...)
+        :param listing: whether the response is a listing (no id given)
+        :param display: whether the listing has been requested with a
+                        ``display`` option; without it, the elements of
+                        the listing only have an id, which ``xml2dict``
+                        gives as ``{'attrs': {'id': '1'}, 'value': ''}``
+        """
+        if not content:
+            # empty listings are returned as [] by the webservice
+            return {resource: ''}
+        root = content.keys()[0]
+        if not listing:
+            return {root: self._record(content[root], root)}
+        node = singular(root)
+        elements = content[root]
+        if not elements:
+            return {root: ''}
+        if isinstance(elements, dict):
+            elements = [elements]
+        if display:
+            elements = [self._record(element, node) for element in elements]
+        else:
+            elements = [{'attrs': {'id': self._value(element['id'])},
+                         'value': ''}
+                        for element in elements]
+        return {root: {node: self._one_or_list(elements)}}
+
+    @staticmethod
+    def _one_or_list(elements):
+        """ ``xml2dict`` does not use a list when there is one element """
+        if len(elements) == 1:
+            return elements[0]
+        return elements
+
+    @staticmethod
+    def _value(value):
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return '1' if value else '0'
+        if isinstance(value, (int, long, float)):
+            return str(value)
+        return value
+
+    @staticmethod
+    def _is_translation(value):
+        return (isinstance(value, list) and value and
+                all(isinstance(item, dict) and
+                    set(item) == set(['id', 'value'])
+                    for item in value))
+
+    def _translation(self, value):
+        languages = [{'attrs': {'id': self._value(language['id'])},
+                      'value': self._value(language['value'])}
+                     for language in value]
+        return {'language': self._one_or_list(languages)}
+
+    def _untranslated(self, language_ids):
+        """ Normalize an empty translation list
+
+        The JSON output gives ``[]`` for a multilingual field without
+        any translation, the XML output one empty ``language`` node per
+        language, which are the ones of the other multilingual fields
+        of the record. Without any of them, the field is an empty node.
+        """
+        if not language_ids:
+            return ''
+        return self._translation([{'id': language_id, 'value': ''}
+                                  for language_id in language_ids])
+
+    def _associations(self, associations):
+        result = {}
+        for name, elements in associations.iteritems():
+            key = ASSOCIATION_NODES.get(name) or singular(name)
+            node = self.version_keys.get(key) or key
+            association = {'attrs': {'nodeType': singular(name),
+                                     'api': name}}
+            if elements:
+                elements = [dict((field, self._value(value))
+                                 for field, value in element.iteritems())
+                            for element in elements]
+                association[node] = self._one_or_list(elements)
+            else:
+                association['value'] = ''
+            result[name] = association
+        return result
+
+    def _record(self, record, node):
+        not_filterable = NOT_FILTERABLE_FIELDS.get(node, ())
+        language_ids = next(([language['id'] for language in value]
+                             for value in record.itervalues()
+                             if self._is_translation(value)), None)
+        result = {}
+        for field, value in record.iteritems():
+            if field == 'associations':
+                value = self._associations(value or {})
+            elif self._is_translation(value):
+                value = self._translation(value)
+            elif value == []:
+                value = self._untranslated(language_ids)
+            else:
+                value = self._value(value)
+            if field in not_filterable:
+                value = {'attrs': {'notFilterable': 'true'}, 'value': value}
+            result[field] = value
+        return result
@@ -5,6 +5,55 @@ from openerp.addons.connector.unit.mapper import ExportMapper
 from openerp.addons.connector.unit.mapper import mapping
 
 
+def source_fields(*fields):
+    """ Declare the fields of the PrestaShop record used by a mapping
+
+    Usage::
+
+        @source_fields('id_order')
+        @mapping
+        def order_id(self, record):
+            ...
+
+    A mapping using no field of the record is declared with
+    ``@source_fields()``.
+    """
+    def decorator(func):
+        func.source_fields = fields
+        return func
+    return decorator
+
+
+def mapper_source_fields(mapper):
+    """ Return the fields of the PrestaShop records used by an import mapper
+
+    The fields are either declared in the ``_source_fields`` attribute of
+    the mapper, or derived from its ``direct`` mappings and from its
+    ``@mapping`` methods decorated with :py:func:`source_fields`.
+
+    :return: set of fields, or None when they cannot be known (modifiers
+             in ``direct``, methods not decorated, children), the records
+             have then to be read completely
+    """
+    declared = getattr(mapper, '_source_fields', None)
+    if declared is not None:
+        return set(declared)
+    if mapper.children:
+        return None
+    fields = set()
+    for from_attr, __ in mapper.direct:
+        if not isinstance(from_attr, basestring):
+            return None
+        fields.add(from_attr)
+    for method_name in mapper._map_methods:
+        method_fields = getattr(getattr(mapper, method_name),
+                                'source_fields', None)
+        if method_fields is None:
+            return None
+        fields.update(method_fields)
+    return fields
+
+
 class PrestashopExportMapper(ExportMapper):
 
     def _map_direct(self, record, from_attr, to_attr):
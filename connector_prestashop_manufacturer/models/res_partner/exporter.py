@@ -8,6 +8,9 @@ from openerp.addons.connector_prestashop.backend import prestashop
 from openerp.addons.connector_prestashop.unit.exporter import (
     PrestashopExporter
 )
+from openerp.addons.connector_prestashop.unit.job_identity import (
+    related_backend,
+)
 from openerp.addons.connector_prestashop.unit.mapper import (
     PrestashopExportMapper,
 )
@@ -128,13 +131,20 @@ class AddressExportMapper(PrestashopExportMapper):
         return {}
 
 
+def default_backend(session, *args, **kwargs):
+    """ Backend of the exports of the manufacturers """
+    return session.env['prestashop.backend'].search([], limit=1).id
+
+
+@related_backend(default_backend)
 @job(default_channel='root.prestashop')
 def export_manufacturer(session, partner_record_id, fields=None, **kwargs):
     """ Export supplier partner as manufacturer. """
 
     binding_model = 'prestashop.manufacturer'
-    # get default backend
-    backend = session.env['prestashop.backend'].search([], limit=1)
+    backend = session.env['prestashop.backend'].browse(
+        default_backend(session)
+    )
     env = backend.get_environment(binding_model, session=session)
     exporter = env.get_connector_unit(ManufacturerExporter)
     binding = exporter._get_or_create_binding(
@@ -15,6 +15,10 @@ from openerp.addons.connector_prestashop.unit.importer import (
     import_batch,
     DelayedBatchImporter,
 )
+from openerp.addons.connector_prestashop.unit.job_identity import (
+    backend_first_argument,
+    related_backend,
+)
 from openerp.addons.connector_prestashop.backend import prestashop
 
 from openerp.tools import DEFAULT_SERVER_DATETIME_FORMAT
@@ -62,6 +66,7 @@ class ManufacturerBatchImport(DelayedBatchImporter):
     _model_name = 'prestashop.manufacturer'
 
 
+@related_backend(backend_first_argument)
 @job(default_channel='root.prestashop')
 def import_manufacturers(session, backend_id, since_date):
     filters = None